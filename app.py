@@ -11,8 +11,11 @@ Routes:
 - Session management → services.core.session_handler
 """
 
+import asyncio
 import logging
+import logging.handlers
 import json
+import queue
 import redis
 import re
 from typing import Optional, Dict
@@ -21,7 +24,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
+from services.ai.embeddings import get_embedding_model
 
 # Import handlers (business logic is in these modules)
 from services.core.login_handler import handle_login
@@ -51,8 +54,21 @@ logging.basicConfig(
     level=logging.DEBUG,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-logger.info(f"Loaded Embedding Model: {embedding_model}")
+# Hand log records to a background thread so handler I/O never blocks the event loop.
+# Started on app startup, not at import: PDF extraction workers are spawned processes that
+# re-import this module, and they must not start threads of their own.
+log_listener = None
+
+
+def _start_log_listener():
+    global log_listener
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    log_listener = logging.handlers.QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    log_listener.start()
+
+
 # Redis connection
 redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
 
@@ -88,7 +104,7 @@ async def login(userId: str = Query(...), role: str = Query(...), userToken: str
             role=role,
             user_token=userToken,
             redis_client=redis_client,
-            embedding_model=embedding_model
+            embedding_model=get_embedding_model()
         )
         return result
 
@@ -107,7 +123,7 @@ def get_user_session(userId: str):
     """
     Get user session data from Redis
 
-    Returns user info, policies, and embeddings
+    Returns user info and policies (embeddings live in their own binary key)
     """
     session_data = get_user_session_data(redis_client, userId)
 
@@ -165,7 +181,9 @@ async def chat(message: Message):
             user_prompt=user_prompt,
             user_role=user_role,
             session_id=session_id,
-            conversation_context=conversation_context
+            conversation_context=conversation_context,
+            user_data_raw=user_data_raw,
+            user_data=user_data
         )
 
         # Add manager-specific formatting if needed
@@ -185,9 +203,9 @@ async def chat(message: Message):
         # Save messages to chat history if session_id is provided
         if session_id:
             try:
-                add_message_to_history(user_id, session_id, "user", user_prompt)
+                await add_message_to_history(user_id, session_id, "user", user_prompt)
                 if result.get("response"):
-                    add_message_to_history(user_id, session_id, "assistant", result["response"])
+                    await add_message_to_history(user_id, session_id, "assistant", result["response"])
             except Exception as e:
                 logger.error(f"Error saving messages to history: {e}")
 
@@ -204,14 +222,14 @@ async def chat(message: Message):
 # Session Management APIs
 # -----------------------------
 @app.post("/sessions/create")
-def create_new_session(request: SessionRequest):
+async def create_new_session(request: SessionRequest):
     """
     Create a new conversation session for user
 
     Delegates to session_handler for business logic
     """
     try:
-        result = create_new_conversation_session(
+        result = await create_new_conversation_session(
             user_id=request.userId,
             session_name=request.sessionName
         )
@@ -223,23 +241,48 @@ def create_new_session(request: SessionRequest):
 
 
 @app.get("/sessions/{userId}")
-def get_sessions(userId: str):
+async def get_sessions(userId: str):
     """
     Get all conversation sessions for a user
 
     Delegates to session_handler for business logic
     """
-    return get_all_user_sessions(userId)
+    return await get_all_user_sessions(userId)
 
 
 @app.get("/sessions/{userId}/{sessionId}/history")
-def get_session_history(userId: str, sessionId: str):
+async def get_session_history(userId: str, sessionId: str):
     """
     Get chat history for a specific session
 
     Delegates to session_handler for business logic
     """
-    return get_session_chat_history(userId, sessionId)
+    return await get_session_chat_history(userId, sessionId)
+
+@app.on_event("startup")
+async def startup():
+    """Start the log listener and load the embedding model before serving so the first request doesn't pay for it"""
+    from services.ai._warmup import warm_up
+    _start_log_listener()
+    # uvicorn's default loop="auto" picks uvloop when it is installed
+    logger.info(f"Event loop: {type(asyncio.get_running_loop()).__module__}")
+    await warm_up()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Release pooled MCP, Node API and Redis connections, stop PDF workers and flush queued log records"""
+    from services.core.policy import shutdown_extraction_pool
+    from services.integration.mcp_client import close_http_sessions
+    from services.integration.node_api_client import node_api_client
+    from services.operations.conversation_state import close_redis
+    from storage.embedding_storage import close_embedding_storage
+    await close_http_sessions()
+    shutdown_extraction_pool()
+    await node_api_client.aclose()
+    await close_redis()
+    await close_embedding_storage()
+    if log_listener is not None:
+        log_listener.stop()
 
 @app.get("/")
 def root():
@@ -259,4 +302,4 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # -----------------------------
 if __name__ == '__main__':
     import uvicorn
-    uvicorn.run(app, host='0.0.0.0', port=8080)
+    uvicorn.run(app, host='0.0.0.0', port=8080, loop="auto")  # uvloop where available
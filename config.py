@@ -17,3 +17,6 @@ EMPLOYEE_URL = os.getenv("EMPLOYEE_URL", "https://apiserver.zimyo.com/apiv1/v1/o
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
+# Unix socket path when Redis runs on the same host (skips the TCP loopback stack)
+REDIS_UNIX_SOCKET = os.getenv("REDIS_UNIX_SOCKET")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 64))
@@ -0,0 +1,34 @@
+"""
+Warm-up - loads the heavy AI runtimes once at process start
+
+Importing sentence-transformers/torch and loading the MiniLM model takes
+seconds. Doing it on the startup hook (in a worker thread) keeps that cost
+off the first request and off the event loop.
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _preload():
+    """Import the embedding stack, load the model and run one encode to initialise the runtime"""
+    import faiss  # noqa: F401 - only needed for large policy sets, but import it while we're warming up
+    from services.ai.embeddings import get_embedding_model
+
+    embedding_model = get_embedding_model()
+    embedding_model.encode(["warm-up"])
+    return embedding_model
+
+
+async def warm_up():
+    """Preload AI models without blocking the event loop"""
+    start = time.perf_counter()
+    try:
+        embedding_model = await asyncio.to_thread(_preload)
+        logger.info(f"🔥 Loaded Embedding Model: {embedding_model} ({time.perf_counter() - start:.1f}s)")
+    except Exception as e:
+        # Requests still load the model lazily on first use
+        logger.exception(f"❌ AI warm-up failed: {e}")
@@ -107,7 +107,7 @@ def get_openai_compatible_client() -> OpenAI:
             print(f"🤖 Using DeepSeek API (Model: {DEEPSEEK_MODEL})")
     return _openai_client
 
-def get_chat_response(role: str, prompt: str) -> str:
+def get_chat_response(role: str, prompt: str, timeout: float = None) -> str:
     """
     Sends a message to LLM API (Gemini, DeepSeek, or OpenAI) and returns the response text.
 
@@ -119,6 +119,7 @@ def get_chat_response(role: str, prompt: str) -> str:
     Args:
         role: User role ("employee" or "manager") - determines system prompt
         prompt: User's query/message
+        timeout: Request timeout in seconds, enforced by the provider SDK (default: SDK default)
 
     Returns:
         AI-generated response text
@@ -135,7 +136,8 @@ def get_chat_response(role: str, prompt: str) -> str:
             # Combine system prompt with user prompt for Gemini
             full_prompt = f"{system_prompt}\n\nUser Query: {prompt}"
 
-            response = model.generate_content(full_prompt)
+            request_options = {"timeout": timeout} if timeout else None
+            response = model.generate_content(full_prompt, request_options=request_options)
             return response.text
 
         else:
@@ -145,7 +147,9 @@ def get_chat_response(role: str, prompt: str) -> str:
             # Choose model based on provider
             model = OPENAI_MODEL if LLM_PROVIDER == "openai" else DEEPSEEK_MODEL
 
-            # Direct API call
+            # Direct API call (per-request timeout only when asked, otherwise the client default)
+            if timeout:
+                client = client.with_options(timeout=timeout)
             response = client.chat.completions.create(
                 model=model,
                 messages=[
@@ -1,10 +1,32 @@
+import threading
+
 import numpy as np
-import faiss
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Above this many policies an HNSW graph beats scoring every row
+ANN_MIN_POLICIES = 5000
+HNSW_NEIGHBORS = 32
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+def get_embedding_model():
+    """Load the sentence embedding model once per process (preloaded by services.ai._warmup)"""
+    global _embedding_model
+    if _embedding_model is None:
+        # A request racing the warm-up thread waits for it instead of loading a second copy
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                from sentence_transformers import SentenceTransformer
+                _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _embedding_model
 
 def generate_embeddings(model, text):
     return model.encode([text])[0]
 
 def create_faiss_index(embeddings_dict:dict):
+    import faiss
     if not embeddings_dict:
         raise ValueError("Cannot create FAISS index: embeddings_dict is empty")
     dimension = next(iter(embeddings_dict.values())).shape[0]
@@ -13,10 +35,70 @@ def create_faiss_index(embeddings_dict:dict):
     index.add(vectors)
     return index
 
+def quantize_embedding(embedding):
+    """Symmetric int8 quantization: returns (int8 values as a list, scale) with embedding ≈ values * scale"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    max_abs = float(np.abs(vector).max()) if vector.size else 0.0
+    scale = max_abs / 127 if max_abs else 1.0
+    return np.round(vector / scale).astype(np.int8).tolist(), scale
+
+def stack_embeddings(embeddings_dict:dict, scales:dict=None):
+    """
+    Stack {name: vector} into an L2-normalized float32 (N, D) matrix plus its row names.
+
+    Pass the per-vector `scales` from quantize_embedding when the vectors are int8.
+    """
+    if not embeddings_dict:
+        raise ValueError("Cannot stack embeddings: embeddings_dict is empty")
+    names = list(embeddings_dict.keys())
+    matrix = np.asarray(list(embeddings_dict.values()), dtype=np.float32)
+    if scales:
+        matrix *= np.asarray([scales.get(name, 1.0) for name in names], dtype=np.float32)[:, None]
+    return _normalize_rows(matrix), names
+
+def stack_quantized(vectors, scales):
+    """L2-normalized float32 matrix from an int8 (N, D) block and its per-row scales"""
+    return _normalize_rows(vectors.astype(np.float32) * scales[:, None])
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms)
+
+def build_ann_index(matrix):
+    """HNSW inner-product index over a stacked matrix, or None when a linear scan is cheaper"""
+    if matrix.shape[0] < ANN_MIN_POLICIES:
+        return None
+    import faiss
+    index = faiss.IndexHNSWFlat(matrix.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+    index.add(matrix)
+    return index
+
 def similarity_search(model, query, embeddings, k=2):
-    query_embedding = generate_embeddings(model, query)
-    index = create_faiss_index(embeddings)
-    distances, indices = index.search(np.array([query_embedding]), k)
-    policy_names = list(embeddings.keys())
-    return [policy_names[i] for i in indices[0]]
+    """
+    Return the names of the k policies closest to the query.
+
+    `embeddings` is either a {name: vector} dict or a (matrix, names) pair
+    from stack_embeddings, which callers can cache across queries. A third
+    element from build_ann_index switches the search to the HNSW graph.
+    """
+    if isinstance(embeddings, dict):
+        embeddings = stack_embeddings(embeddings)
+    matrix, policy_names = embeddings[0], embeddings[1]
+    ann_index = embeddings[2] if len(embeddings) > 2 else None
+
+    query_embedding = np.asarray(generate_embeddings(model, query), dtype=np.float32)
+    norm = np.linalg.norm(query_embedding)
+    if norm:
+        query_embedding /= norm
+
+    if ann_index is not None:
+        distances, indices = ann_index.search(query_embedding.reshape(1, -1), min(k, len(policy_names)))
+        return [policy_names[i] for i in indices[0] if i >= 0]
 
+    # Rows are unit length, so one GEMV gives cosine scores; partial sort for the top k
+    scores = matrix @ query_embedding
+    k = min(k, len(policy_names))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [policy_names[i] for i in top]
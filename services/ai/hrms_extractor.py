@@ -20,11 +20,20 @@ Author: Zimyo AI Team
 
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Pre-filter keywords that decide the intent without (or before) an AI call
+ONDUTY_KEYWORDS = ('on duty', 'onduty', 'on-duty', 'wfh', 'work from home')
+REGULARIZATION_KEYWORDS = ('regularize', 'regularization', 'forgot to punch', 'missed punch', 'forgot punch')
+HOLIDAY_KEYWORDS = ('holiday', 'holidays', 'upcoming holiday', 'chutti list')
+BALANCE_KEYWORDS = ('leave balance', 'balance', 'remaining leave')
+
+# Hard ceiling on model output per call - a batched prompt must not ask for more than the provider allows
+MAX_OUTPUT_TOKENS = 8192
+
 
 # ============================================================================
 # MAIN AI FUNCTION
@@ -33,7 +42,8 @@ logger = logging.getLogger(__name__)
 def detect_intent_and_extract(
     user_message: str,
     user_context: Dict = None,
-    available_leave_types: list = None
+    available_leave_types: list = None,
+    ai_response: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
     Use AI to detect user intent and extract structured information.
@@ -45,6 +55,8 @@ def detect_intent_and_extract(
         user_message: What user typed (e.g., "apply leave for 5 nov")
         user_context: Previous conversation data (optional)
         available_leave_types: List of leave types for this user (optional)
+        ai_response: Raw model output already fetched for this message (optional,
+            used by the intent batcher so the model isn't called again)
 
     Returns:
         Dictionary with:
@@ -79,14 +91,14 @@ def detect_intent_and_extract(
 
     # Priority 1: On-duty detection (WFH, client site, field work)
     # Trigger if: (1) Keywords found OR (2) Already in on-duty conversation
-    if in_onduty_flow or any(keyword in message_lower for keyword in ['on duty', 'onduty', 'on-duty', 'wfh', 'work from home']):
+    if in_onduty_flow or any(keyword in message_lower for keyword in ONDUTY_KEYWORDS):
         logger.info("🎯 Pre-filter: Detected ON-DUTY intent")
 
         # Get previous context
         prev_data = user_context.get('extracted_data', {})
 
         # Try AI extraction first
-        ai_response = _call_ai_model(_build_ai_prompt(user_message, user_context, available_leave_types))
+        ai_response = _get_ai_response(ai_response, user_message, user_context, available_leave_types)
 
         # Force intent to apply_onduty if AI got it wrong
         if ai_response.get('intent') != 'apply_onduty':
@@ -185,14 +197,14 @@ def detect_intent_and_extract(
 
     # Priority 2: Regularization detection
     # Trigger if: (1) Keywords found OR (2) Already in regularization conversation
-    if in_regularization_flow or any(keyword in message_lower for keyword in ['regularize', 'regularization', 'forgot to punch', 'missed punch', 'forgot punch']):
+    if in_regularization_flow or any(keyword in message_lower for keyword in REGULARIZATION_KEYWORDS):
         logger.info("🎯 Pre-filter: Detected REGULARIZATION intent")
 
         # Get previous context
         prev_data = user_context.get('extracted_data', {})
 
         # Try AI extraction
-        ai_response = _call_ai_model(_build_ai_prompt(user_message, user_context, available_leave_types))
+        ai_response = _get_ai_response(ai_response, user_message, user_context, available_leave_types)
 
         # Force intent if AI missed it
         if ai_response.get('intent') != 'apply_regularization':
@@ -281,7 +293,7 @@ def detect_intent_and_extract(
         return _validate_ai_response(ai_response)
 
     # Priority 3: Holiday query detection
-    if any(keyword in message_lower for keyword in ['holiday', 'holidays', 'upcoming holiday', 'chutti list']):
+    if any(keyword in message_lower for keyword in HOLIDAY_KEYWORDS):
         logger.info("🎯 Pre-filter: Detected HOLIDAY intent")
         return {
             'intent': 'get_holidays',
@@ -293,7 +305,7 @@ def detect_intent_and_extract(
         }
 
     # Priority 4: Leave balance query (simple, no AI needed)
-    if any(keyword in message_lower for keyword in ['leave balance', 'balance', 'remaining leave']):
+    if any(keyword in message_lower for keyword in BALANCE_KEYWORDS):
         logger.info("🎯 Pre-filter: Detected BALANCE query")
         return {
             'intent': 'check_leave_balance',
@@ -309,7 +321,7 @@ def detect_intent_and_extract(
         logger.info("🎯 Pre-filter: Detected SALARY SLIP intent")
 
         # Try to extract month and year from message using AI
-        ai_response = _call_ai_model(_build_ai_prompt(user_message, user_context, available_leave_types))
+        ai_response = _get_ai_response(ai_response, user_message, user_context, available_leave_types)
 
         # Force intent to get_salary_slip
         extracted_data = ai_response.get('extracted_data', {})
@@ -353,20 +365,64 @@ def detect_intent_and_extract(
         }
 
     # For all other intents, use AI normally
-    # Build AI prompt
-    prompt = _build_ai_prompt(user_message, user_context, available_leave_types)
-
-    # Get AI response
-    ai_response = _call_ai_model(prompt)
+    ai_response = _get_ai_response(ai_response, user_message, user_context, available_leave_types)
 
     # Validate and return
     return _validate_ai_response(ai_response)
 
 
+def needs_ai_call(user_message: str, user_context: Dict = None) -> bool:
+    """
+    Whether detect_intent_and_extract will call the AI model for this message.
+
+    Mirrors the pre-filter order above: holiday and balance queries are
+    answered from keywords alone unless an on-duty/regularization flow is active.
+    """
+    message_lower = user_message.lower()
+    previous_intent = (user_context or {}).get('intent')
+
+    if previous_intent in ('apply_onduty', 'apply_regularization'):
+        return True
+    if any(keyword in message_lower for keyword in ONDUTY_KEYWORDS + REGULARIZATION_KEYWORDS):
+        return True
+    return not any(keyword in message_lower for keyword in HOLIDAY_KEYWORDS + BALANCE_KEYWORDS)
+
+
+def fetch_ai_responses(items: list) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get raw model output for several (user_message, context, leave_types) requests in one call.
+
+    A single request uses the regular prompt. Returns None when the batched
+    answer doesn't line up with the requests, so the caller can retry them one by one.
+    """
+    if len(items) == 1:
+        return [_call_ai_model(_build_ai_prompt(*items[0]))]
+
+    batch_response = _call_ai_model(_build_batch_ai_prompt(items), batch_size=len(items))
+    results = batch_response.get('results') if isinstance(batch_response, dict) else None
+    if not isinstance(results, list) or len(results) != len(items):
+        logger.warning(f"⚠️ Batched AI response did not match {len(items)} requests")
+        return None
+
+    return [result if isinstance(result, dict) else _get_fallback_response("Invalid response type") for result in results]
+
+
 # ============================================================================
 # HELPER FUNCTIONS (Internal use only)
 # ============================================================================
 
+def _get_ai_response(
+    ai_response: Optional[Dict[str, Any]],
+    user_message: str,
+    context: Dict,
+    leave_types: list
+) -> Dict[str, Any]:
+    """Use the pre-fetched model output if there is one, otherwise call the model"""
+    if ai_response is not None:
+        return ai_response
+    return _call_ai_model(_build_ai_prompt(user_message, context, leave_types))
+
+
 def _build_ai_prompt(
     user_message: str,
     context: Dict,
@@ -400,7 +456,43 @@ YEAR: {current_year}
 TODAY: {current_date}
 TYPES: {leave_types_str}
 
-TASK: Extract ALL fields in ONE pass. Handle typos, Hindi+English, shortcuts (SL/CL/EL), all date formats.
+""" + _build_ai_instructions(current_year, current_date)
+
+
+def _build_batch_ai_prompt(items: list) -> str:
+    """
+    Build one prompt covering several (user_message, context, leave_types) requests.
+
+    The instructions and examples are shared; each request keeps its own
+    message, previous data and leave types. The model answers with
+    {"results": [...]} holding one OUTPUT object per request, in order.
+    """
+    current_year = datetime.now().year
+    current_date = datetime.now().strftime("%Y-%m-%d")
+
+    request_lines = []
+    for index, (user_message, context, leave_types) in enumerate(items, 1):
+        leave_type_names = [lt.get('name', '') for lt in leave_types]
+        leave_types_str = ', '.join(leave_type_names) if leave_type_names else 'None available'
+        line = f'[{index}] MSG: "{user_message}" | TYPES: {leave_types_str}'
+        prev_data = context.get('extracted_data', {})
+        if prev_data:
+            line += f" | Previous conversation data: {json.dumps(prev_data)}"
+        request_lines.append(line)
+
+    return f"""HRMS AI: Extract intent+data for EACH request below independently.
+
+YEAR: {current_year}
+TODAY: {current_date}
+REQUESTS ({len(items)}):
+""" + "\n".join(request_lines) + "\n\n" + _build_ai_instructions(current_year, current_date) + f"""
+
+BATCH OUTPUT: Return {{"results": [...]}} with exactly {len(items)} OUTPUT objects, one per request, in request order."""
+
+
+def _build_ai_instructions(current_year: int, current_date: str) -> str:
+    """Shared task rules and examples for single and batched prompts"""
+    return f"""TASK: Extract ALL fields in ONE pass. Handle typos, Hindi+English, shortcuts (SL/CL/EL), all date formats.
 
 INTENTS (keywords - MATCH THESE FIRST!):
 - apply_leave: "apply/aply" + "leave/leav/chutti" (NOT attendance/duty)
@@ -514,13 +606,13 @@ CRITICAL RULES - HANDLE TYPOS & NEVER CLASSIFY AS "unknown":
 BE SMART: Extract everything you can from the message. Don't ask for information that's already provided. Return ONLY valid JSON."""
 
 
-def _call_ai_model(prompt: str) -> Dict[str, Any]:
+def _call_ai_model(prompt: str, batch_size: int = 1) -> Dict[str, Any]:
     """
     Call AI model with optimized configuration.
 
     Optimizations:
     - Lower temperature (0.1) for more consistent extraction
-    - Reduced max_tokens (500) since responses are structured
+    - Reduced max_tokens (500 per request) since responses are structured
     - Better error handling
     """
     from services.ai.chat import (
@@ -555,7 +647,7 @@ def _call_ai_model(prompt: str) -> Dict[str, Any]:
                 generation_config={
                     "response_mime_type": "application/json",
                     "temperature": 0.1,  # Very low for consistent extraction
-                    "max_output_tokens": 2000  # Sufficient for complete JSON responses
+                    "max_output_tokens": min(2000 * batch_size, MAX_OUTPUT_TOKENS)  # Sufficient for complete JSON responses
                 },
                 safety_settings=safety_settings
             )
@@ -574,7 +666,7 @@ def _call_ai_model(prompt: str) -> Dict[str, Any]:
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=500,
+                max_tokens=min(500 * batch_size, MAX_OUTPUT_TOKENS),
                 response_format={"type": "json_object"}
             )
             return json.loads(response.choices[0].message.content)
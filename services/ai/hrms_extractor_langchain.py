@@ -209,7 +209,7 @@ def _handle_onduty_with_langchain(user_message: str, context: Dict, leave_types:
     if not extracted.get('from_time') or not extracted.get('to_time'):
         import re
         time_pattern = r'(\d{1,2}):?(\d{2})?\s*(am|pm)?\s*(?:to|till|-)\s*(\d{1,2}):?(\d{2})?\s*(am|pm)?'
-        match = re.search(time_pattern, user_message.lower(), re.IGNORECASE)
+        match = re.search(time_pattern, user_message, re.IGNORECASE)
 
         if match:
             from_hour = int(match.group(1))
@@ -293,7 +293,7 @@ def _handle_regularization_with_langchain(user_message: str, context: Dict, leav
     if not extracted.get('from_time') or not extracted.get('to_time'):
         import re
         time_pattern = r'(\d{1,2}):?(\d{2})?\s*(am|pm)?\s*(?:to|till|-)\s*(\d{1,2}):?(\d{2})?\s*(am|pm)?'
-        match = re.search(time_pattern, user_message.lower(), re.IGNORECASE)
+        match = re.search(time_pattern, user_message, re.IGNORECASE)
 
         if match:
             from_hour = int(match.group(1))
@@ -0,0 +1,91 @@
+"""
+Intent Batcher - coalesces concurrent intent extraction requests
+
+Requests are only ever batched with other requests from the same conversation
+(batch_key, e.g. "<user_id>:<session_id>"), so one user's message, previous
+data and leave types never end up in a prompt built for someone else. The
+first request for a key goes to the model straight away; messages from that
+conversation arriving while it is in flight (double submits, rapid follow-ups)
+are sent together in the next call. Messages the keyword pre-filter answers
+without AI skip the queue entirely.
+
+Usage:
+    from services.ai.intent_batcher import intent_batcher
+    result = await intent_batcher.submit(user_message, context, leave_types, batch_key=f"{user_id}:{session_id}")
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Set
+
+from services.ai.hrms_extractor import detect_intent_and_extract, fetch_ai_responses, needs_ai_call
+
+logger = logging.getLogger(__name__)
+
+# Batched output has to fit in the capped model output budget (see hrms_extractor._call_ai_model)
+INTENT_BATCH_MAX_SIZE = int(os.getenv("INTENT_BATCH_MAX_SIZE", "4"))
+
+
+class IntentBatcher:
+    """Collects intent extraction requests per conversation and resolves them with batched model calls"""
+
+    def __init__(self, max_size: int = INTENT_BATCH_MAX_SIZE):
+        self.max_size = max(1, max_size)
+        self._pending: Dict[str, List[tuple]] = {}  # batch key -> requests waiting for a model call
+        self._draining: Set[asyncio.Task] = set()
+        self._busy_keys: Set[str] = set()
+
+    async def submit(self, user_message: str, context: Dict, leave_types: list, batch_key: str) -> Dict[str, Any]:
+        """Detect intent and extract data for one message, sharing the model call with concurrent requests of the same conversation"""
+        if not needs_ai_call(user_message, context):
+            return detect_intent_and_extract(user_message, context, leave_types)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(batch_key, []).append((user_message, context, leave_types, future))
+
+        # No waiting window: an idle conversation is sent to the model on the next loop tick
+        if batch_key not in self._busy_keys:
+            self._busy_keys.add(batch_key)
+            task = asyncio.create_task(self._drain(batch_key))
+            self._draining.add(task)
+            task.add_done_callback(self._draining.discard)
+
+        return await future
+
+    async def _drain(self, batch_key: str):
+        """Send this conversation's queued requests to the model, up to max_size per call, until none are left"""
+        try:
+            while self._pending.get(batch_key):
+                queue = self._pending[batch_key]
+                batch, self._pending[batch_key] = queue[:self.max_size], queue[self.max_size:]
+                await self._process(batch)
+        finally:
+            self._pending.pop(batch_key, None)
+            self._busy_keys.discard(batch_key)
+
+    async def _process(self, batch: List[tuple]):
+        """Call the model once for the batch and resolve each caller's future"""
+        items = [(user_message, context, leave_types) for user_message, context, leave_types, _ in batch]
+        try:
+            if len(items) > 1:
+                logger.info(f"📦 Batching {len(items)} intent requests into one AI call")
+
+            responses = await asyncio.to_thread(fetch_ai_responses, items)
+            if responses is None:
+                singles = await asyncio.gather(*(asyncio.to_thread(fetch_ai_responses, [item]) for item in items))
+                responses = [single[0] for single in singles]
+
+            for (user_message, context, leave_types, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(detect_intent_and_extract(user_message, context, leave_types, ai_response=response))
+
+        except Exception as e:
+            logger.exception(f"❌ Intent batch of {len(batch)} failed: {e}")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# Shared batcher (one per process)
+intent_batcher = IntentBatcher()
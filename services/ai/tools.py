@@ -144,6 +144,9 @@ class HRMSToolkit:
             ))
 
             if result.get("status") == "success":
+                # Balance just changed - drop the cached leave types/balance
+                from services.operations.hrms_handlers.shared import invalidate_leave_types
+                self._run_async(invalidate_leave_types(self.user_id))
                 return f"✅ Leave applied successfully: {leave_type_name} from {from_date} to {to_date}"
             else:
                 return f"❌ Failed to apply leave: {result.get('message', 'Unknown error')}"
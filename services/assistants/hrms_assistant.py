@@ -11,6 +11,7 @@ from typing import Dict, Any, Optional, Tuple, List
 from dataclasses import dataclass
 from enum import Enum
 import numpy as np
+from rapidfuzz import fuzz, process
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -515,7 +516,7 @@ class IntentClassifier:
         if user_id:
             try:
                 import asyncio
-                from services.integration.mcp_integration import mcp_client
+                from services.integration.mcp_integration import get_hrms_adapter
 
                 # Create event loop if needed
                 try:
@@ -526,7 +527,7 @@ class IntentClassifier:
 
                 # Fetch organization's leave types
                 result = loop.run_until_complete(
-                    mcp_client.call_tool("get_leave_types", {"user_id": user_id})
+                    get_hrms_adapter().call_tool("get_leave_types", {"user_id": user_id})
                 )
 
                 if result.get("status") == "success":
@@ -534,28 +535,31 @@ class IntentClassifier:
 
                     if available_leave_types:
                         # Use fuzzy matching to find leave type in text
-                        from fuzzywuzzy import fuzz
-
                         text_lower = text.lower()
                         best_match = None
                         best_score = 0
 
-                        for leave_type in available_leave_types:
-                            leave_name = leave_type.get("name", "").lower()
+                        leave_names = [leave_type.get("name", "") for leave_type in available_leave_types]
+                        names_lower = [name.lower() for name in leave_names]
 
-                            # Try exact match first
-                            if leave_name in text_lower:
-                                entities['leave_type'] = leave_type.get("name")
-                                logger.info(f"✅ Exact match found: {leave_type.get('name')}")
+                        # Try exact match first
+                        for name, name_lower in zip(leave_names, names_lower):
+                            if name_lower in text_lower:
+                                entities['leave_type'] = name
+                                logger.info(f"✅ Exact match found: {name}")
                                 return entities
 
-                            # Try fuzzy matching for each word in text
-                            for word in text_lower.split():
-                                if len(word) > 2:  # Skip short words
-                                    score = fuzz.ratio(word, leave_name)
-                                    if score > best_score and score >= 70:  # 70% similarity threshold
-                                        best_score = score
-                                        best_match = leave_type.get("name")
+                        # Try fuzzy matching for each word in text - rapidfuzz scores the word
+                        # against every leave name in C and skips names below the cutoff
+                        for word in text_lower.split():
+                            if len(word) > 2:  # Skip short words
+                                match = process.extractOne(
+                                    word, names_lower, scorer=fuzz.ratio,
+                                    score_cutoff=max(best_score, 70)  # 70% similarity threshold
+                                )
+                                if match and match[1] > best_score:
+                                    best_score = match[1]
+                                    best_match = leave_names[match[2]]
 
                         if best_match:
                             entities['leave_type'] = best_match
@@ -18,7 +18,8 @@ from typing import Dict, Any
 from .auth import get_partner_token
 from .employee import retrieve_user_data
 from .policy import extract_policies, process_pdfs_concurrently
-from services.ai.embeddings import generate_embeddings
+from services.ai.embeddings import generate_embeddings, quantize_embedding
+from storage.embedding_storage import set_policy_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -90,12 +91,13 @@ async def handle_login(
 
     # Step 5: Generate embeddings for each policy
     logger.debug(f"🧮 Generating embeddings for policies")
+    # Stored as int8 + per-policy scale: ~4x smaller to store and load per chat
     policy_embeddings = {}
+    policy_embedding_scales = {}
     for policy_name, policy_text in policy_files_text.items():
         embedding = generate_embeddings(embedding_model, policy_text)
         if embedding is not None:
-            # Convert numpy array to list for JSON serialization
-            policy_embeddings[policy_name] = embedding.tolist()
+            policy_embeddings[policy_name], policy_embedding_scales[policy_name] = quantize_embedding(embedding)
 
     logger.info(f"✅ Policy data processed for user {user_id}: {len(policy_embeddings)} policies")
 
@@ -105,11 +107,12 @@ async def handle_login(
         "role": role,
         "user_info": user_data,
         "token": user_token,
-        "user_policies": policy_files_text,
-        "policy_embeddings": policy_embeddings
+        "user_policies": policy_files_text
     }
 
     # Step 7: Store session in Redis
+    # Embeddings go first, in their own binary key, so chat never pairs a new session with old vectors
+    await set_policy_embeddings(user_id, policy_embeddings, policy_embedding_scales)
     redis_client.set(user_id, json.dumps(session_obj))
     logger.info(f"💾 Session stored in Redis for user {user_id}")
 
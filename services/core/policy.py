@@ -1,11 +1,14 @@
 # services/policy_service.py
+import gc
 import logging
+import multiprocessing
 
 
 from datetime import date,timedelta
 import requests, pdfplumber
+import fitz  # PyMuPDF
 from io import BytesIO
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import concurrent.futures
 
 logger = logging.getLogger(__name__)
@@ -31,39 +34,122 @@ def extract_policies(policyLists:list)->list:
     return policies
 
 
-def download_and_extract_pdf(item:dict)->dict:
-    policy_extracted_data = {}
+# Force a collection every N pages to counter pdfminer heap fragmentation on long PDFs
+GC_EVERY_PAGES = 50
+
+
+# Text-only extraction: leave image/drawing processing off so MuPDF skips the
+# path/paint operators that dominate graphics-heavy policy templates
+PDF_TEXT_FLAGS = (fitz.TEXTFLAGS_TEXT | fitz.TEXT_DEHYPHENATE) & ~fitz.TEXT_PRESERVE_IMAGES
+
+
+def _iter_pdfplumber_pages(pdf_bytes:bytes):
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        for page_index, page in enumerate(pdf.pages):
+            # No layout analysis or flow re-sorting, plain text is all we store
+            yield page_index, page.extract_text(layout=False, use_text_flow=False) or ""
+            # Drop the parsed layout objects cached on the page
+            page.flush_cache()
+            if page_index and page_index % GC_EVERY_PAGES == 0:
+                gc.collect()
+
+
+def iter_pdf_pages(pdf_bytes:bytes):
+    """Yield (page_index, page_text) one page at a time so only a single page is held in memory."""
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    except Exception as e:
+        # MuPDF rejected the file, pdfminer is more lenient with broken streams
+        logger.warning(f"PyMuPDF could not open PDF, falling back to pdfplumber: {e}")
+        yield from _iter_pdfplumber_pages(pdf_bytes)
+        return
+
+    try:
+        for page_index, page in enumerate(doc):
+            yield page_index, page.get_text("text", flags=PDF_TEXT_FLAGS)
+    finally:
+        doc.close()
+
+
+def _download_pdf(item:dict):
+    """Download a policy PDF, returning (policy_name, pdf_bytes) or None on failure."""
     try:
         response = requests.get(item['policy_url'])
         response.raise_for_status()
-        pdf_content = BytesIO(response.content)
-        pdf_content.seek(0)
-        
-        text = ""
-        with pdfplumber.open(pdf_content) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-                text += "\n"
-        
-        policy_extracted_data[item['policy_name']] = text
-        print("PDF file downloaded and text extracted:", item['policy_name'])
-        
+        return item['policy_name'], response.content
     except requests.exceptions.RequestException as e:
         print(f"Request error downloading PDF file {item['policy_name']}: {e}")
+        return None
+
+
+def _extract_pdf_text(policy_name:str, pdf_bytes:bytes)->dict:
+    """Pure extraction step, kept picklable so it can run in a worker process."""
+    policy_extracted_data = {}
+    try:
+        # Join once at the end instead of repeated string concatenation per page
+        text = "".join(page_text + "\n" for _, page_text in iter_pdf_pages(pdf_bytes))
+        policy_extracted_data[policy_name] = text
+        print("PDF file downloaded and text extracted:", policy_name)
     except Exception as e:
-        print(f"Error processing PDF file {item['policy_name']}: {e}")
-        
+        print(f"Error processing PDF file {policy_name}: {e}")
     return policy_extracted_data
 
-def process_pdfs_concurrently(policies_file_data, max_workers=3):
+
+def download_and_extract_pdf(item:dict)->dict:
+    downloaded = _download_pdf(item)
+    if downloaded is None:
+        return {}
+    return _extract_pdf_text(*downloaded)
+
+
+# PDF parsing is CPU-bound and serialised by the GIL, so it runs in worker
+# processes while downloads stay on threads. Created lazily and reused across logins.
+PDF_WORKERS = 3
+_extraction_pool = None
+
+
+def _get_extraction_pool() -> ProcessPoolExecutor:
+    global _extraction_pool
+    if _extraction_pool is None:
+        # Spawned, not forked: the server process already runs model/log threads and
+        # holds the embedding model, which a forked child would inherit mid-state.
+        # Each spawned worker re-imports the entry module, so keep the pool small and
+        # fixed - as many workers as downloads run at once.
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _extraction_pool
+
+
+def shutdown_extraction_pool():
+    """Stop the PDF extraction workers, if they were ever started (called on app shutdown)"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown()
+        _extraction_pool = None
+
+
+def process_pdfs_concurrently(policies_file_data, max_workers=PDF_WORKERS):
     results = {}
+    extraction_pool = _get_extraction_pool()
+    extract_futures = []
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(download_and_extract_pdf, item) for item in policies_file_data]
-        for future in concurrent.futures.as_completed(futures):
+        download_futures = [executor.submit(_download_pdf, item) for item in policies_file_data]
+        # Hand each PDF to the process pool as soon as its download finishes
+        for future in concurrent.futures.as_completed(download_futures):
             try:
-                result = future.result()
-                results.update(result)
+                downloaded = future.result()
+                if downloaded is not None:
+                    extract_futures.append(extraction_pool.submit(_extract_pdf_text, *downloaded))
             except Exception as e:
                 print(f"An error occurred: {e}")
                 continue
-    return results
\ No newline at end of file
+
+    for future in concurrent.futures.as_completed(extract_futures):
+        try:
+            result = future.result()
+            results.update(result)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+            continue
+    return results
@@ -48,7 +48,7 @@ def get_user_session_data(redis_client, user_id: str) -> Optional[Dict[str, Any]
         return None
 
 
-def create_new_conversation_session(user_id: str, session_name: Optional[str] = None) -> Dict[str, Any]:
+async def create_new_conversation_session(user_id: str, session_name: Optional[str] = None) -> Dict[str, Any]:
     """
     Create a new conversation session for a user.
 
@@ -69,7 +69,7 @@ def create_new_conversation_session(user_id: str, session_name: Optional[str] =
     """
     logger.info(f"🆕 Creating new session for user {user_id}")
 
-    session_id = create_session(user_id, session_name)
+    session_id = await create_session(user_id, session_name)
 
     if not session_id:
         raise Exception("Failed to create session")
@@ -83,7 +83,7 @@ def create_new_conversation_session(user_id: str, session_name: Optional[str] =
     }
 
 
-def get_all_user_sessions(user_id: str) -> Dict[str, Any]:
+async def get_all_user_sessions(user_id: str) -> Dict[str, Any]:
     """
     Get all conversation sessions for a user.
 
@@ -100,7 +100,7 @@ def get_all_user_sessions(user_id: str) -> Dict[str, Any]:
     """
     logger.debug(f"📋 Fetching all sessions for user {user_id}")
 
-    sessions = get_user_sessions(user_id)
+    sessions = await get_user_sessions(user_id)
 
     return {
         "userId": user_id,
@@ -109,7 +109,7 @@ def get_all_user_sessions(user_id: str) -> Dict[str, Any]:
     }
 
 
-def get_session_chat_history(user_id: str, session_id: str) -> Dict[str, Any]:
+async def get_session_chat_history(user_id: str, session_id: str) -> Dict[str, Any]:
     """
     Get chat history for a specific session.
 
@@ -128,7 +128,7 @@ def get_session_chat_history(user_id: str, session_id: str) -> Dict[str, Any]:
     """
     logger.debug(f"💬 Fetching chat history for user {user_id}, session {session_id}")
 
-    history = get_chat_history(user_id, session_id)
+    history = await get_chat_history(user_id, session_id)
 
     return {
         "userId": user_id,
@@ -3,16 +3,30 @@ HRMS AI Assistant Integration Layer
 Connects the new AI system with existing backend services
 """
 
+import asyncio
 import json
 import logging
+import os
 from typing import Dict, Any, Optional
 from services.assistants.hrms_assistant import HRMSAIAssistant, Intent
 
 logger = logging.getLogger(__name__)
 
+# Admission control for assistant calls so load spikes don't oversubscribe the CPU
+_AI_SEMAPHORE = asyncio.Semaphore(int(os.getenv("AI_MAX_CONCURRENCY", str((os.cpu_count() or 1) * 2))))
+
+# Error responses are built once and shallow-copied per request
+_ERROR_RESPONSE_GENERIC = {"response": "I'm sorry, I encountered an error processing your request. Please try again.", "status": "error"}
+_ERROR_RESPONSE_LEAVE = {"response": "Error processing leave application. Please try again.", "status": "error"}
+_ERROR_RESPONSE_ATTENDANCE = {"response": "Error processing attendance request. Please try again.", "status": "error"}
+_ERROR_RESPONSE_BALANCE = {"response": "Error checking leave balance. Please try again.", "status": "error"}
+_ERROR_RESPONSE_POLICY = {"response": "Error searching policies. Please try again.", "status": "error"}
+
 class HRMSIntegrationLayer:
     """Integration layer for HRMS AI Assistant with existing backend"""
 
+    __slots__ = ("ai_assistant", "redis_client")
+
     def __init__(self, redis_client):
         self.ai_assistant = HRMSAIAssistant(redis_client)
         self.redis_client = redis_client
@@ -24,7 +38,8 @@ class HRMSIntegrationLayer:
         """
         try:
             # Process query using AI assistant
-            ai_result = await self.ai_assistant.process_query(user_id, query)
+            async with _AI_SEMAPHORE:
+                ai_result = await self.ai_assistant.process_query(user_id, query)
 
             # Handle different result types
             if ai_result.get("error"):
@@ -38,10 +53,7 @@ class HRMSIntegrationLayer:
 
         except Exception as e:
             logger.error(f"Error in integration layer: {e}")
-            return {
-                "response": "I'm sorry, I encountered an error processing your request. Please try again.",
-                "status": "error"
-            }
+            return dict(_ERROR_RESPONSE_GENERIC)
 
     def _format_clarification_response(self, ai_result: Dict[str, Any], session_id: Optional[str]) -> Dict[str, Any]:
         """Format clarification responses"""
@@ -141,10 +153,7 @@ class HRMSIntegrationLayer:
 
         except Exception as e:
             logger.error(f"Error routing to existing leave system: {e}")
-            return {
-                "response": "Error processing leave application. Please try again.",
-                "status": "error"
-            }
+            return dict(_ERROR_RESPONSE_LEAVE)
 
     async def _handle_existing_attendance_system(self, ai_result: Dict[str, Any], user_id: str, query: str, session_id: Optional[str]) -> Dict[str, Any]:
         """Route to existing attendance system"""
@@ -165,10 +174,7 @@ class HRMSIntegrationLayer:
 
         except Exception as e:
             logger.error(f"Error routing to existing attendance system: {e}")
-            return {
-                "response": "Error processing attendance request. Please try again.",
-                "status": "error"
-            }
+            return dict(_ERROR_RESPONSE_ATTENDANCE)
 
     async def _handle_existing_balance_system(self, ai_result: Dict[str, Any], user_id: str, query: str, session_id: Optional[str]) -> Dict[str, Any]:
         """Route to existing balance system"""
@@ -189,10 +195,7 @@ class HRMSIntegrationLayer:
 
         except Exception as e:
             logger.error(f"Error routing to existing balance system: {e}")
-            return {
-                "response": "Error checking leave balance. Please try again.",
-                "status": "error"
-            }
+            return dict(_ERROR_RESPONSE_BALANCE)
 
     async def _handle_existing_policy_search(self, ai_result: Dict[str, Any], user_id: str, query: str, session_id: Optional[str]) -> Dict[str, Any]:
         """Route to existing policy search system"""
@@ -212,10 +215,7 @@ class HRMSIntegrationLayer:
 
         except Exception as e:
             logger.error(f"Error routing to existing policy search: {e}")
-            return {
-                "response": "Error searching policies. Please try again.",
-                "status": "error"
-            }
+            return dict(_ERROR_RESPONSE_POLICY)
 
 # Convenience function for easy integration
 async def process_hrms_query(redis_client, user_id: str, query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
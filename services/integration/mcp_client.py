@@ -3,16 +3,23 @@ HTTP-based MCP Client for Zimyo HRMS Operations
 Supports both local (stdio subprocess) and remote (HTTP) communication modes
 """
 
-import json
 import logging
 import os
 import asyncio
 import aiohttp
+import orjson
 from typing import Dict, Any, Optional
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Pooled keep-alive sessions keyed by MCP endpoint URL, so every tool call to the
+# same server reuses open connections instead of a fresh TCP/TLS handshake
+_http_sessions: Dict[str, aiohttp.ClientSession] = {}
+_http_sessions_lock = asyncio.Lock()
+# Resolved MCP host addresses are reused for this long when the pool opens new connections
+DNS_CACHE_SECONDS = 300
+
 
 class HTTPMCPClient:
     """
@@ -55,6 +62,9 @@ class HTTPMCPClient:
         # Set timeout
         self.timeout = timeout
 
+        # Server exposes the combined validate_and_apply_leave tool (one round-trip instead of two)
+        self.combined_leave_apply = os.getenv('MCP_COMBINED_LEAVE_APPLY', 'false').lower() == 'true'
+
         # Determine mode
         self.mode = 'http' if self.server_url else 'stdio'
 
@@ -110,6 +120,22 @@ class HTTPMCPClient:
 
             return {"status": "error", "message": str(e)}
 
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Get (or lazily create) the pooled HTTP session for this client's server URL"""
+        session = _http_sessions.get(self.server_url)
+        if session is None or session.closed:
+            async with _http_sessions_lock:
+                session = _http_sessions.get(self.server_url)
+                if session is None or session.closed:
+                    session = aiohttp.ClientSession(
+                        connector=aiohttp.TCPConnector(
+                            limit=100, limit_per_host=20, keepalive_timeout=30,
+                            ttl_dns_cache=DNS_CACHE_SECONDS
+                        )
+                    )
+                    _http_sessions[self.server_url] = session
+        return session
+
     async def _call_tool_http(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
         Call MCP tool via HTTP POST request
@@ -140,46 +166,47 @@ class HTTPMCPClient:
         if self.auth_token:
             headers['Authorization'] = f'Bearer {self.auth_token}'
 
-        # Send HTTP POST request
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                self.server_url,
-                json=request,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=self.timeout)
-            ) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    logger.error(f"HTTP {response.status}: {error_text}")
-                    return {
-                        "status": "error",
-                        "message": f"HTTP {response.status}: {error_text}"
-                    }
-
-                response_data = await response.json()
-
-                # Extract result from MCP response
-                if 'result' in response_data:
-                    content = response_data['result'].get('content', [])
-                    if content and len(content) > 0:
-                        text = content[0].get('text', '{}')
-                        return json.loads(text)
-
-                # If no valid result, check for error
-                if 'error' in response_data:
-                    error = response_data['error']
-                    logger.error(f"MCP Error: {error}")
-                    return {
-                        "status": "error",
-                        "message": error.get('message', 'Unknown error')
-                    }
-
-                logger.error("Invalid MCP response format")
+        # Send HTTP POST request over the pooled session
+        session = await self._get_http_session()
+        async with session.post(
+            self.server_url,
+            data=orjson.dumps(request),
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                logger.error(f"HTTP {response.status}: {error_text}")
+                return {
+                    "status": "error",
+                    "message": f"HTTP {response.status}: {error_text}"
+                }
+
+            # Decode straight from bytes, skips the intermediate str of response.json()
+            response_data = orjson.loads(await response.read())
+
+            # Extract result from MCP response
+            if 'result' in response_data:
+                content = response_data['result'].get('content', [])
+                if content and len(content) > 0:
+                    text = content[0].get('text', '{}')
+                    return orjson.loads(text)
+
+            # If no valid result, check for error
+            if 'error' in response_data:
+                error = response_data['error']
+                logger.error(f"MCP Error: {error}")
                 return {
                     "status": "error",
-                    "message": "Invalid response format from MCP server"
+                    "message": error.get('message', 'Unknown error')
                 }
 
+            logger.error("Invalid MCP response format")
+            return {
+                "status": "error",
+                "message": "Invalid response format from MCP server"
+            }
+
     async def _call_tool_stdio(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
         Call MCP tool via local subprocess (stdio mode)
@@ -203,58 +230,63 @@ class HTTPMCPClient:
         }
 
         # Start the MCP server process
+        # Raise the StreamReader line limit above the 64 KB default so a single
+        # JSON-RPC line carrying a large payload (salary slip PDFs) fits
         process = await asyncio.create_subprocess_exec(
             'node',
             self.server_path,
             stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stderr=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024
         )
 
         # Send request to server
-        request_json = json.dumps(request) + '\n'
+        request_json = orjson.dumps(request) + b'\n'
+
+        # Drain stderr in the background so it never blocks the success path;
+        # it is only awaited when the server fails to answer
+        stderr_task = asyncio.create_task(process.stderr.read())
+        stderr = b''
 
         try:
             # Write request to stdin
-            process.stdin.write(request_json.encode())
+            process.stdin.write(request_json)
             await process.stdin.drain()
             process.stdin.close()
 
-            # Read response with timeout
-            stdout_data = b''
-            stderr_data = b''
-
-            async def read_output():
-                nonlocal stdout_data, stderr_data
-                # Read until we get a complete JSON response
-                # Increased limit to 10MB to handle large responses (salary slips with PDFs)
+            async def read_response():
+                # MCP messages are newline-delimited JSON-RPC, so parse each line
+                # once as it arrives instead of re-scanning the accumulated buffer
                 while True:
-                    line = await process.stdout.read(10 * 1024 * 1024)  # Read up to 10MB at once
+                    line = await process.stdout.readline()
                     if not line:
-                        break
-                    stdout_data += line
-                    # Check if we have a valid JSON-RPC response
-                    decoded = stdout_data.decode().strip()
-                    for response_line in decoded.split('\n'):
-                        if response_line.strip() and '"jsonrpc"' in response_line and '"result"' in response_line:
-                            # We got a valid response, we can stop reading
-                            return
-
-            await asyncio.wait_for(read_output(), timeout=self.timeout)
-
-            # Get any stderr output
-            try:
-                stderr_data = await asyncio.wait_for(process.stderr.read(), timeout=0.5)
-            except asyncio.TimeoutError:
-                pass
+                        return None
+                    line = line.strip()
+                    # Skip empty lines and status messages
+                    if not line or b'"jsonrpc"' not in line:
+                        continue
+                    try:
+                        message = orjson.loads(line)
+                    except orjson.JSONDecodeError as e:
+                        logger.debug(f"Failed to parse line as JSON: {line[:100]}... Error: {e}")
+                        continue
+                    if 'result' in message:
+                        return message
+
+            response = await asyncio.wait_for(read_response(), timeout=self.timeout)
+
+            # Server closed stdout without answering, collect its diagnostics
+            if response is None:
+                try:
+                    stderr = await asyncio.wait_for(stderr_task, timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
 
             # Kill the process since it won't exit on its own
             process.kill()
             await process.wait()
 
-            stdout = stdout_data
-            stderr = stderr_data
-
         except asyncio.TimeoutError:
             process.kill()
             await process.wait()
@@ -271,36 +303,23 @@ class HTTPMCPClient:
                 "status": "error",
                 "message": f"Subprocess error: {str(e)}"
             }
+        finally:
+            if not stderr_task.done():
+                stderr_task.cancel()
 
         # Parse response
-        if stdout:
-            # MCP server may send multiple lines, get the last valid JSON
-            lines = stdout.decode().strip().split('\n')
-            logger.debug(f"MCP stdout lines: {lines}")
-
-            for line in reversed(lines):
-                # Skip empty lines and status messages
-                if not line.strip() or 'MCP Server running' in line or 'Connected to Redis' in line:
-                    continue
-
-                try:
-                    response = json.loads(line)
-                    if 'result' in response:
-                        # Extract text content from MCP response
-                        content = response['result'].get('content', [])
-                        if content and len(content) > 0:
-                            text = content[0].get('text', '{}')
-                            logger.debug(f"MCP response text: {text}")
-                            return json.loads(text)
-                except json.JSONDecodeError as e:
-                    logger.debug(f"Failed to parse line as JSON: {line[:100]}... Error: {e}")
-                    continue
+        if response:
+            # Extract text content from MCP response
+            content = response['result'].get('content', [])
+            if content and len(content) > 0:
+                text = content[0].get('text', '{}')
+                logger.debug(f"MCP response text: {text}")
+                return orjson.loads(text)
 
         # If no valid response found, return error
         stderr_output = stderr.decode() if stderr else ""
-        stdout_output = stdout.decode() if stdout else ""
         error_msg = stderr_output or "No valid response from MCP server"
-        logger.error(f"MCP Error - stderr: {stderr_output}, stdout: {stdout_output[:200]}")
+        logger.error(f"MCP Error - stderr: {stderr_output}")
         return {"status": "error", "message": error_msg}
 
     async def mark_attendance(self, user_id: str, location: str = "") -> Dict[str, Any]:
@@ -356,6 +375,47 @@ class HTTPMCPClient:
             "to_date": to_date
         })
 
+    async def validate_and_apply_leave(
+        self,
+        user_id: str,
+        leave_type_name: str,
+        from_date: str,
+        to_date: str,
+        reasons: str,
+        is_half_day: str = "0"
+    ) -> Dict[str, Any]:
+        """
+        Validate a leave request and apply it if valid
+
+        Uses the server-side validate_and_apply_leave tool when MCP_COMBINED_LEAVE_APPLY
+        is enabled, otherwise falls back to validate_leave_request followed by apply_leave.
+
+        Returns:
+            {"is_valid": bool, "errors": list, "apply_result": dict or None}
+        """
+        arguments = {
+            "user_id": user_id,
+            "leave_type_name": leave_type_name,
+            "from_date": from_date,
+            "to_date": to_date,
+            "reasons": reasons,
+            "is_half_day": is_half_day
+        }
+
+        if self.combined_leave_apply:
+            result = await self.call_tool("validate_and_apply_leave", arguments)
+            if "is_valid" not in result:
+                # Transport or server error, no validation verdict
+                return {"is_valid": False, "errors": [result.get("message", "Unknown error")], "apply_result": None}
+            return result
+
+        validation_result = await self.validate_leave_request(user_id, leave_type_name, from_date, to_date)
+        if not validation_result.get("is_valid", False):
+            return {"is_valid": False, "errors": validation_result.get("errors", []), "apply_result": None}
+
+        apply_result = await self.apply_leave(**arguments)
+        return {"is_valid": True, "errors": [], "apply_result": apply_result}
+
     async def collect_leave_details(
         self,
         user_id: str,
@@ -396,5 +456,14 @@ def get_http_mcp_client() -> HTTPMCPClient:
     return _http_mcp_client
 
 
+async def close_http_sessions() -> None:
+    """Close the pooled HTTP sessions (call on application shutdown)"""
+    sessions = list(_http_sessions.values())
+    _http_sessions.clear()
+    for session in sessions:
+        if not session.closed:
+            await session.close()
+
+
 # Backward compatibility alias
 get_mcp_client = get_http_mcp_client
@@ -4,13 +4,110 @@ MCP Integration service for Zimyo HRMS Operations
 Supports both MCP Protocol and HTTP fallback
 """
 
-import json
+import asyncio
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache, partial
 from typing import Dict, Any, Optional
 
+import ahocorasick
+from rapidfuzz import fuzz, process
+
+from services.ai.chat import get_chat_response
+from services.operations.conversation_state import (
+    clear_conversation_state,
+    get_conversation_state,
+    get_conversation_state_legacy,
+    update_conversation_state,
+)
+from services.operations.hrms_handlers.shared import get_leave_types_result_cached, invalidate_leave_types
+from services.utils.fuzzy_matcher import simple_fuzzy_matcher
+
 logger = logging.getLogger(__name__)
 
+# Date formats accepted in leave messages, matched in a single pass:
+# 2025-08-22 | 22 aug 2025, 22 aug, 6 nov | aug 22 2025, aug 22, nov 6
+_MONTHS_RE = r'jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec'
+_DATE_RE_ANY = re.compile(
+    r'(?P<iso>\d{4}-\d{2}-\d{2})'
+    r'|(?P<dmy>(?P<dmy_day>\d{1,2})\s+(?P<dmy_month>' + _MONTHS_RE + r')(?:\s+(?P<dmy_year>\d{4}))?)'
+    r'|(?P<mdy>(?P<mdy_month>' + _MONTHS_RE + r')\s+(?P<mdy_day>\d{1,2})(?:\s+(?P<mdy_year>\d{4}))?)',
+    re.IGNORECASE
+)
+
+# Words that introduce a leave reason, in priority order ("because" beats a later "for").
+# A trailing "is"/":" ("reason is fever") is consumed too
+_REASON_KEYWORD_RES = tuple(
+    (keyword, re.compile(rf'\b{keyword}\b(?:\s+is\b)?[\s:]*', re.IGNORECASE))
+    for keyword in ("reason", "because", "for", "due to")
+)
+
+_MONTH = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+
+def _extract_leave_dates(user_message: str) -> list:
+    """
+    Extract dates from a leave message as YYYY-MM-DD strings, in the order they appear.
+
+    Dates without a year get the current year, or next year if that date has
+    already passed. Impossible dates (e.g. 31 feb) are skipped.
+    """
+    converted_dates = []
+    # One clock read per message for year inference
+    now = datetime.now()
+    current_year = now.year
+    for match in _DATE_RE_ANY.finditer(user_message):
+        kind = match.lastgroup
+        if kind == 'iso':
+            converted_dates.append(match.group('iso'))
+            continue
+
+        day, month, year = match.group(kind + '_day', kind + '_month', kind + '_year')
+        try:
+            if year:
+                dt = datetime(int(year), _MONTH[month.lower()], int(day))
+            else:
+                # Infer year based on current date
+                dt = datetime(current_year, _MONTH[month.lower()], int(day))
+                # If the inferred date has already passed this year, use next year
+                if dt < now:
+                    dt = dt.replace(year=current_year + 1)
+                logger.info(f"📅 Inferred year for '{match.group(0)}': {dt.strftime('%Y-%m-%d')}")
+        except ValueError:
+            continue
+        converted_dates.append(dt.strftime('%Y-%m-%d'))
+
+    return converted_dates
+
+
+def _extract_keyword_reason(message_lower: str) -> Optional[str]:
+    """
+    Leave reason introduced by a keyword: the text after the keyword's last occurrence,
+    keywords tried in priority order. None if no keyword is followed by a usable,
+    non-date reason.
+    """
+    for keyword, keyword_re in _REASON_KEYWORD_RES:
+        keyword_match = None
+        for keyword_match in keyword_re.finditer(message_lower):
+            pass
+        if keyword_match is None:
+            continue
+
+        reason = message_lower[keyword_match.end():].strip()
+        is_date = _DATE_RE_ANY.search(reason) is not None
+
+        if reason and len(reason) > 2 and not is_date:
+            logger.info(f"Extracted reason with keyword '{keyword}': {reason}")
+            return reason
+    return None
+
+
 # Check which mode to use - MCP or HTTP
 USE_MCP = os.getenv('USE_MCP_PROTOCOL', 'true').lower() == 'true'
 
@@ -29,16 +126,25 @@ class HRMSAdapter:
     Uses MCP Protocol by default, falls back to HTTP if needed
     """
 
+    __slots__ = ("is_connected", "use_mcp", "_client")
+
     def __init__(self):
         self.is_connected = True
         self.use_mcp = USE_MCP
+        # Created on first use; the MCP client pools its HTTP connections per server URL
+        self._client = None
 
-        if self.use_mcp:
-            self.client = get_mcp_client()
-            logger.info("Initialized MCP client")
-        else:
-            self.client = node_api_client
-            logger.info("Initialized HTTP client (fallback)")
+    @property
+    def client(self):
+        """Underlying MCP or HTTP client, created lazily on first tool call"""
+        if self._client is None:
+            if self.use_mcp:
+                self._client = get_mcp_client()
+                logger.info("Initialized MCP client")
+            else:
+                self._client = node_api_client
+                logger.info("Initialized HTTP client (fallback)")
+        return self._client
 
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -63,95 +169,231 @@ class HRMSAdapter:
                 return await self._call_http_fallback(tool_name, arguments)
 
         except Exception as e:
-            logger.error(f"Error calling tool {tool_name}: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            # logger.exception attaches the traceback and only formats it when a handler emits
+            logger.exception(f"Error calling tool {tool_name}: {e}")
             return {"status": "error", "message": f"Tool call failed: {str(e)}"}
 
+    async def validate_and_apply_leave(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate then apply a leave request
+
+        Uses the client's combined validate_and_apply_leave when it has one (MCP client),
+        otherwise issues validate_leave_request and apply_leave separately.
+
+        Returns:
+            {"is_valid": bool, "errors": list, "apply_result": dict or None}
+        """
+        combined = getattr(self.client, "validate_and_apply_leave", None)
+        if combined is not None:
+            try:
+                return await combined(**arguments)
+            except Exception as e:
+                logger.error(f"Error calling validate_and_apply_leave: {e}")
+                return {"is_valid": False, "errors": [f"Tool call failed: {str(e)}"], "apply_result": None}
+
+        validation_result = await self.call_tool("validate_leave_request", {
+            "user_id": arguments["user_id"],
+            "leave_type_name": arguments["leave_type_name"],
+            "from_date": arguments["from_date"],
+            "to_date": arguments["to_date"]
+        })
+        if not validation_result.get("is_valid", False):
+            return {"is_valid": False, "errors": validation_result.get("errors", []), "apply_result": None}
+
+        apply_result = await self.call_tool("apply_leave", arguments)
+        return {"is_valid": True, "errors": [], "apply_result": apply_result}
+
     async def _call_http_fallback(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """HTTP fallback for when MCP is not available"""
         try:
-            if tool_name == "apply_leave":
-                return await self.client.apply_leave(
-                    user_id=arguments["user_id"],
-                    leave_type_name=arguments["leave_type_name"],
-                    from_date=arguments["from_date"],
-                    to_date=arguments["to_date"],
-                    reasons=arguments["reasons"],
-                    is_half_day=arguments.get("is_half_day", "0"),
-                    documents_required=arguments.get("documents_required", "null")
-                )
+            handler = _FALLBACK_DISPATCH.get(tool_name)
+            if handler is None:
+                return {"status": "error", "message": f"Unknown tool: {tool_name}"}
+            return await handler(self.client, arguments)
 
-            elif tool_name == "mark_attendance":
-                return await self.client.mark_attendance(
-                    user_id=arguments["user_id"],
-                    location=arguments.get("location", "")
-                )
+        except Exception as e:
+            logger.exception(f"Error in HTTP fallback for tool {tool_name}: {e}")
+            return {"status": "error", "message": f"HTTP fallback failed: {str(e)}"}
 
-            elif tool_name == "get_leave_balance":
-                return await self.client.get_leave_balance(
-                    user_id=arguments["user_id"]
-                )
 
-            elif tool_name == "get_leave_types":
-                return await self.client.get_leave_types(
-                    user_id=arguments["user_id"]
-                )
+# ===================== HTTP FALLBACK TOOL HANDLERS =====================
 
-            elif tool_name == "collect_leave_details":
-                # This is a helper function that doesn't call external API
-                # Just returns available leave types
-                result = await self.client.get_leave_types(
-                    user_id=arguments["user_id"]
-                )
-                if result.get("status") == "success":
-                    collected_info = arguments.get("collected_info", {})
-                    required_fields = ["leave_type_name", "from_date", "to_date", "reasons"]
-                    missing_fields = [field for field in required_fields if field not in collected_info]
-
-                    return {
-                        "status": "success",
-                        "user_id": arguments["user_id"],
-                        "collected_info": collected_info,
-                        "missing_fields": missing_fields,
-                        "available_leave_types": result.get("leave_types", []),
-                        "leave_balance": result.get("leave_balance", {}),
-                        "next_steps": []
-                    }
-                return result
+async def _fallback_apply_leave(client, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await client.apply_leave(
+        user_id=arguments["user_id"],
+        leave_type_name=arguments["leave_type_name"],
+        from_date=arguments["from_date"],
+        to_date=arguments["to_date"],
+        reasons=arguments["reasons"],
+        is_half_day=arguments.get("is_half_day", "0"),
+        documents_required=arguments.get("documents_required", "null")
+    )
 
-            elif tool_name == "validate_leave_request":
-                return await self.client.validate_leave_request(
-                    user_id=arguments["user_id"],
-                    leave_type_name=arguments["leave_type_name"],
-                    from_date=arguments["from_date"],
-                    to_date=arguments["to_date"]
-                )
 
-            else:
-                return {"status": "error", "message": f"Unknown tool: {tool_name}"}
+async def _fallback_mark_attendance(client, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await client.mark_attendance(
+        user_id=arguments["user_id"],
+        location=arguments.get("location", "")
+    )
+
+
+async def _fallback_get_leave_balance(client, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await client.get_leave_balance(
+        user_id=arguments["user_id"]
+    )
 
-        except Exception as e:
-            logger.error(f"Error in HTTP fallback for tool {tool_name}: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return {"status": "error", "message": f"HTTP fallback failed: {str(e)}"}
 
+async def _fallback_get_leave_types(client, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await client.get_leave_types(
+        user_id=arguments["user_id"]
+    )
 
-# Global client instance - now properly uses MCP or HTTP
-mcp_client = HRMSAdapter()
+
+async def _fallback_collect_leave_details(client, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    # This is a helper function that doesn't call external API
+    # Just returns available leave types
+    result = await client.get_leave_types(
+        user_id=arguments["user_id"]
+    )
+    if result.get("status") == "success":
+        collected_info = arguments.get("collected_info", {})
+        required_fields = ["leave_type_name", "from_date", "to_date", "reasons"]
+        missing_fields = [field for field in required_fields if field not in collected_info]
+
+        return {
+            "status": "success",
+            "user_id": arguments["user_id"],
+            "collected_info": collected_info,
+            "missing_fields": missing_fields,
+            "available_leave_types": result.get("leave_types", []),
+            "leave_balance": result.get("leave_balance", {}),
+            "next_steps": []
+        }
+    return result
+
+
+async def _fallback_validate_leave_request(client, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    return await client.validate_leave_request(
+        user_id=arguments["user_id"],
+        leave_type_name=arguments["leave_type_name"],
+        from_date=arguments["from_date"],
+        to_date=arguments["to_date"]
+    )
+
+
+# tool_name -> handler(client, arguments)
+_FALLBACK_DISPATCH = {
+    "apply_leave": _fallback_apply_leave,
+    "mark_attendance": _fallback_mark_attendance,
+    "get_leave_balance": _fallback_get_leave_balance,
+    "get_leave_types": _fallback_get_leave_types,
+    "collect_leave_details": _fallback_collect_leave_details,
+    "validate_leave_request": _fallback_validate_leave_request,
+}
+
+
+# Global client instance - created on first use so importing this module stays cheap
+mcp_client = None
+
+
+def get_hrms_adapter() -> HRMSAdapter:
+    """Get or create the HRMSAdapter singleton"""
+    global mcp_client
+    if mcp_client is None:
+        mcp_client = HRMSAdapter()
+    return mcp_client
+
+# ===================== LEAVE TYPES =====================
+
+async def _get_leave_types_cached(user_id: str) -> Dict[str, Any]:
+    """
+    Get the get_leave_types tool result (leave types + balance) from the shared
+    leave types cache, with the lookups the handlers below need derived from it.
+    """
+    result = await get_leave_types_result_cached(user_id, get_hrms_adapter())
+    if result.get("status") != "success":
+        return result
+
+    # Derived views go on a copy - the cached result is shared across requests
+    leave_types = [lt for lt in result.get("leave_types", []) if isinstance(lt, dict)]
+    leave_type_names = tuple(lt.get("name", "") for lt in leave_types)
+    return {
+        **result,
+        "leave_types": leave_types,
+        "leave_type_names": leave_type_names,
+        "leave_type_names_lower": tuple(name.lower() for name in leave_type_names),
+        # "casual_leave_balance": 12 -> ("Casual Leave", 12), ready for display
+        "leave_balance_labels": tuple(
+            (key.replace("_balance", "").replace("_", " ").title(), value)
+            for key, value in result.get("leave_balance", {}).items()
+            if "_balance" in key
+        ),
+    }
 
 # ===================== HR ACTION HANDLERS =====================
 
+# Missing leave fields are asked for one at a time in this order
+_LEAVE_FIELD_PRIORITY = ("leave_type_name", "from_date", "to_date", "reasons")
+
+# (language, missing field) -> question; a None field is the generic fallback
+_LEAVE_PROMPTS = {
+    ('hindi', 'leave_type_name'): "🤝 मैं आपकी छुट्टी के लिए आवेदन में मदद करूंगा। आपको किस प्रकार की छुट्टी चाहिए? \n📋 उपलब्ध प्रकार: {types}",
+    ('english', 'leave_type_name'): "🤝 I'll help you apply for leave. What type of leave would you like to apply for? \n📋 Available types: {types}",
+    ('hindi', 'from_date'): "बहुत बढ़िया! अब छुट्टी की शुरुआत की तारीख बताएं। \n📅 (Format: YYYY-MM-DD या '22 Aug 2025')",
+    ('english', 'from_date'): "Great! Now what's the start date for your leave? \n📅 (Format: YYYY-MM-DD or '22 Aug 2025')",
+    ('hindi', 'to_date'): "अच्छा! अब छुट्टी की अंतिम तारीख बताएं। \n📅 (Format: YYYY-MM-DD या '25 Aug 2025')",
+    ('english', 'to_date'): "Perfect! What's the end date for your leave? \n📅 (Format: YYYY-MM-DD or '25 Aug 2025')",
+    ('hindi', 'reasons'): "बहुत अच्छा! अब छुट्टी का कारण बताएं।",
+    ('english', 'reasons'): "Excellent! What's the reason for your leave?",
+    ('hindi', None): "🤝 मैं आपकी छुट्टी के लिए आवेदन में मदद करूंगा।",
+    ('english', None): "🤝 I'll help you apply for leave.",
+}
+
+# Specific leave type keywords (not generic "leave") keyed by what the type name contains.
+# Order matters: a type name only contributes the keywords of its first match.
+_TYPE_NAME_KEYWORDS = (
+    ("earned", ("earned",)),
+    ("sick", ("sick",)),
+    ("casual", ("casual",)),
+    ("emergency", ("emergency",)),
+    ("maternity", ("maternity",)),
+    ("paternity", ("paternity",)),
+    ("comp", ("comp", "compensatory")),  # also covers "compensatory"
+    ("annual", ("annual",)),
+)
+
+
+def _leave_type_keywords(type_names) -> set:
+    """Collect the keywords that identify any of the given leave type names in a message"""
+    keywords = set()
+    for type_name in type_names:
+        type_name = type_name.lower()
+        for probe, probe_keywords in _TYPE_NAME_KEYWORDS:
+            if probe in type_name:
+                keywords.update(probe_keywords)
+                break
+    return keywords
+
+
+def _applying_leave_state(collected_info: Dict, available_types: list, leave_balance: Dict) -> Dict[str, Any]:
+    """Conversation state saved while the leave application is still collecting details"""
+    return {
+        "action": "applying_leave",
+        "leave_info": collected_info,
+        "available_types": available_types,
+        "leave_balance": leave_balance,
+        # Stable for the session - saves re-deriving them from type names on every follow-up message
+        "leave_type_keywords": sorted(_leave_type_keywords(lt.get("name", "") for lt in available_types))
+    }
+
+
 async def handle_leave_application(user_id: str, user_message: str, conversation_context: Dict = None, session_id: str = None) -> Dict[str, Any]:
     """Handle leave application requests"""
     try:
-        from services.operations.conversation_state import get_conversation_state, update_conversation_state, clear_conversation_state
-
         # Get conversation state from Redis or use provided context
         # ALWAYS use Redis if session_id is provided (it's the source of truth)
         if session_id:
-            context = get_conversation_state(user_id, session_id) or {}
+            context = await get_conversation_state(user_id, session_id) or {}
             logger.info(f"🔑 Using conversation state from Redis for session {session_id}")
         elif conversation_context:
             # Use provided context if no session_id
@@ -159,8 +401,7 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
             logger.info(f"📝 Using provided conversation_context (no session_id)")
         else:
             # Legacy behavior - try to find any active session
-            from services.operations.conversation_state import get_conversation_state_legacy
-            context = get_conversation_state_legacy(user_id) or {}
+            context = await get_conversation_state_legacy(user_id) or {}
             logger.info(f"🔍 Using legacy session lookup")
 
         # Extract information from user message or context
@@ -170,18 +411,42 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
         # Parse the current user message for leave details
         message_lower = user_message.lower()
 
-        # Get available leave types for parsing
-        collect_result = await mcp_client.call_tool("get_leave_types", {
-            "user_id": user_id
-        })
+        # Start fetching leave types now so the MCP round-trip overlaps date parsing
+        leave_types_task = asyncio.create_task(_get_leave_types_cached(user_id))
+
+        # Extract dates from message - always check for new dates in current message
+        # This ensures new date requests override any cached dates
+        converted_dates = _extract_leave_dates(user_message)
+
+        # Always update dates if found in current message (override cached dates)
+        if converted_dates:
+            collected_info["from_date"] = converted_dates[0]
+            logger.info(f"🔄 Updated from_date with new date: {converted_dates[0]}")
+
+            if len(converted_dates) > 1:
+                collected_info["to_date"] = converted_dates[1]
+                logger.info(f"🔄 Updated to_date: {converted_dates[1]}")
+            else:
+                collected_info["to_date"] = converted_dates[0]
+                logger.info(f"🔄 Updated to_date (same as from): {converted_dates[0]}")
+
+        # Leave types are needed from here on, wait for the fetch started above
+        collect_result = await leave_types_task
         logging.info(f"collect_result :{collect_result}")
         available_types = collect_result.get("leave_types", []) if collect_result.get("status") == "success" else []
 
         # Extract leave type from message using fuzzy matching (handles typos and languages)
         if "leave_type_name" not in collected_info:
-            from services.utils.fuzzy_matcher import simple_fuzzy_matcher
+            # Most messages name the leave type exactly ("sick leave"), only fall back
+            # to fuzzy matching when no type name appears verbatim
+            match = None
+            for leave_type, type_name in zip(available_types, collect_result.get("leave_type_names_lower", ())):
+                if type_name and type_name in message_lower:
+                    match = (leave_type, 100)
+                    break
 
-            match = simple_fuzzy_matcher.fuzzy_match_leave_type(user_message, available_types)
+            if match is None:
+                match = simple_fuzzy_matcher.fuzzy_match_leave_type(user_message, available_types)
             if match:
                 matched_leave_type, confidence = match
                 collected_info["leave_type_name"] = matched_leave_type.get("name")
@@ -189,102 +454,13 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
             else:
                 logger.info(f"❌ No leave type extracted from message: '{user_message}'. Available types: {[lt.get('name') for lt in available_types]}")
 
-        # Extract dates from message - always check for new dates in current message
-        # This ensures new date requests override any cached dates
-        import re
-        from datetime import datetime
-
-        date_patterns = [
-            r'\d{4}-\d{2}-\d{2}',  # 2025-08-22
-            r'\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(?:\s+\d{4})?',  # 22 aug 2025 or 22 aug or 6 nov
-            r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2}(?:\s+\d{4})?',  # aug 22 2025 or aug 22 or nov 6
-        ]
-
-        for pattern in date_patterns:
-            dates = re.findall(pattern, user_message, re.IGNORECASE)
-            if dates:
-                converted_dates = []
-                for date_str in dates:
-                    try:
-                        if '-' in date_str:
-                            converted_dates.append(date_str)
-                        else:
-                            # Try with year first
-                            try:
-                                dt = datetime.strptime(date_str.lower(), '%d %b %Y')
-                                converted_dates.append(dt.strftime('%Y-%m-%d'))
-                            except ValueError:
-                                try:
-                                    dt = datetime.strptime(date_str.lower(), '%b %d %Y')
-                                    converted_dates.append(dt.strftime('%Y-%m-%d'))
-                                except ValueError:
-                                    # Try without year - infer the year
-                                    try:
-                                        # Try "6 nov" format
-                                        dt_no_year = datetime.strptime(date_str.lower(), '%d %b')
-                                        # Infer year based on current date
-                                        current_date = datetime.now()
-                                        inferred_date = dt_no_year.replace(year=current_date.year)
-                                        # If the inferred date has already passed this year, use next year
-                                        if inferred_date < current_date:
-                                            inferred_date = inferred_date.replace(year=current_date.year + 1)
-                                        converted_dates.append(inferred_date.strftime('%Y-%m-%d'))
-                                        logger.info(f"📅 Inferred year for '{date_str}': {inferred_date.strftime('%Y-%m-%d')}")
-                                    except ValueError:
-                                        # Try "nov 6" format
-                                        dt_no_year = datetime.strptime(date_str.lower(), '%b %d')
-                                        # Infer year based on current date
-                                        current_date = datetime.now()
-                                        inferred_date = dt_no_year.replace(year=current_date.year)
-                                        # If the inferred date has already passed this year, use next year
-                                        if inferred_date < current_date:
-                                            inferred_date = inferred_date.replace(year=current_date.year + 1)
-                                        converted_dates.append(inferred_date.strftime('%Y-%m-%d'))
-                                        logger.info(f"📅 Inferred year for '{date_str}': {inferred_date.strftime('%Y-%m-%d')}")
-                    except ValueError:
-                        continue
-
-                # Always update dates if found in current message (override cached dates)
-                if converted_dates:
-                    collected_info["from_date"] = converted_dates[0]
-                    logger.info(f"🔄 Updated from_date with new date: {converted_dates[0]}")
-
-                    if len(converted_dates) > 1:
-                        collected_info["to_date"] = converted_dates[1]
-                        logger.info(f"🔄 Updated to_date: {converted_dates[1]}")
-                    else:
-                        collected_info["to_date"] = converted_dates[0]
-                        logger.info(f"🔄 Updated to_date (same as from): {converted_dates[0]}")
-                    break
-
         # Extract reason from message (avoid extracting dates as reasons)
         if "reasons" not in collected_info:
-            import re  # Import re module here
-
-            # Date patterns to avoid extracting as reasons
-            date_patterns = [
-                r'\d{4}-\d{2}-\d{2}',  # 2025-11-06
-                r'\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)(?:\s+\d{4})?',  # 6 nov or 6 nov 2025
-                r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2}(?:\s+\d{4})?',  # nov 6 or nov 6 2025
-            ]
-
             # First try to extract reason with keywords
-            reason_keywords = ["reason", "because", "for", "due to"]
-            reason_found = False
-            for keyword in reason_keywords:
-                if keyword in message_lower:
-                    parts = message_lower.split(keyword)
-                    if len(parts) > 1:
-                        reason = parts[-1].strip()
-                        # Clean up the reason
-                        reason = reason.replace("is", "").strip()
-                        is_date = any(re.search(pattern, reason.lower(), re.IGNORECASE) for pattern in date_patterns)
-
-                        if reason and len(reason) > 2 and not is_date:
-                            collected_info["reasons"] = reason
-                            logger.info(f"Extracted reason with keyword '{keyword}': {reason}")
-                            reason_found = True
-                            break
+            reason = _extract_keyword_reason(message_lower)
+            reason_found = reason is not None
+            if reason_found:
+                collected_info["reasons"] = reason
 
             # If no keyword found and we're in a leave application context with leave_type and dates,
             # treat the entire message as reason (if it's not a date or leave type)
@@ -292,9 +468,9 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
             # This prevents extracting dates or leave types as reasons
             if not reason_found and "leave_type_name" in context.get("leave_info", {}) and "from_date" in collected_info and "to_date" in collected_info:
                 # Check if message is not a date
-                is_date = any(re.search(pattern, user_message.lower(), re.IGNORECASE) for pattern in date_patterns)
+                is_date = _DATE_RE_ANY.search(user_message) is not None
                 # Check if message is not a leave type
-                is_leave_type = any(lt.get("name", "").lower() in user_message.lower() for lt in available_types)
+                is_leave_type = any(type_name in message_lower for type_name in collect_result.get("leave_type_names_lower", ()))
                 # Check if message is not asking for more information
                 is_question = any(word in message_lower for word in ["what", "when", "which", "how", "why", "?"])
 
@@ -302,23 +478,24 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
                     collected_info["reasons"] = user_message.strip()
                     logger.info(f"Extracted reason from context: {user_message.strip()}")
 
-        # Get leave types and balance info
-        leave_types_result = await mcp_client.call_tool("get_leave_types", {
-            "user_id": user_id
-        })
-
-        if leave_types_result.get("status") != "success":
-            return {
-                "response": f"Error: {leave_types_result.get('message', 'Failed to process leave request')}",
-                "action_needed": False
-            }
-
         # Check which required fields are missing
         required_fields = ["leave_type_name", "from_date", "to_date", "reasons"]
         missing_fields = [field for field in required_fields if field not in collected_info]
 
         logging.info(f"missing_fields at final {missing_fields}")
         if missing_fields:
+            # Leave types and balance are only needed to ask the next question.
+            # Reuse the fetch from above, retrying only if it failed.
+            leave_types_result = collect_result
+            if leave_types_result.get("status") != "success":
+                leave_types_result = await _get_leave_types_cached(user_id)
+
+            if leave_types_result.get("status") != "success":
+                return {
+                    "response": f"Error: {leave_types_result.get('message', 'Failed to process leave request')}",
+                    "action_needed": False
+                }
+
             # Need more information from user
             available_types = leave_types_result.get("leave_types", [])
             leave_balance = leave_types_result.get("leave_balance", {})
@@ -334,61 +511,30 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
             user_language = detect_user_language(user_message)
 
             # Ask for information one at a time in priority order for better user experience
-            if "leave_type_name" in missing_fields:
-                type_names = [lt.get("name", "") for lt in available_types if isinstance(lt, dict)]
-                if user_language == 'hindi':
-                    response_parts = ["🤝 मैं आपकी छुट्टी के लिए आवेदन में मदद करूंगा। "]
-                    response_parts.append(f"आपको किस प्रकार की छुट्टी चाहिए? \n📋 उपलब्ध प्रकार: {', '.join(type_names)}")
-                else:
-                    response_parts = ["🤝 I'll help you apply for leave. "]
-                    response_parts.append(f"What type of leave would you like to apply for? \n📋 Available types: {', '.join(type_names)}")
-            elif "from_date" in missing_fields:
-                if user_language == 'hindi':
-                    response_parts = [f"बहुत बढ़िया! अब छुट्टी की शुरुआत की तारीख बताएं। \n📅 (Format: YYYY-MM-DD या '22 Aug 2025')"]
-                else:
-                    response_parts = [f"Great! Now what's the start date for your leave? \n📅 (Format: YYYY-MM-DD or '22 Aug 2025')"]
-            elif "to_date" in missing_fields:
-                if user_language == 'hindi':
-                    response_parts = [f"अच्छा! अब छुट्टी की अंतिम तारीख बताएं। \n📅 (Format: YYYY-MM-DD या '25 Aug 2025')"]
-                else:
-                    response_parts = [f"Perfect! What's the end date for your leave? \n📅 (Format: YYYY-MM-DD or '25 Aug 2025')"]
-            elif "reasons" in missing_fields:
-                if user_language == 'hindi':
-                    response_parts = ["बहुत अच्छा! अब छुट्टी का कारण बताएं।"]
-                else:
-                    response_parts = ["Excellent! What's the reason for your leave?"]
+            prompt_language = 'hindi' if user_language == 'hindi' else 'english'
+            next_field = next((field for field in _LEAVE_FIELD_PRIORITY if field in missing_fields), None)
+            if next_field == "leave_type_name":
+                type_names = leave_types_result.get("leave_type_names", ())
+                response_parts = [_LEAVE_PROMPTS[(prompt_language, next_field)].format(types=', '.join(type_names))]
             else:
-                # This shouldn't happen if we have missing fields, but just in case
-                if user_language == 'hindi':
-                    response_parts = ["🤝 मैं आपकी छुट्टी के लिए आवेदन में मदद करूंगा।"]
-                else:
-                    response_parts = ["🤝 I'll help you apply for leave."]
+                response_parts = [_LEAVE_PROMPTS[(prompt_language, next_field)]]
 
             # Show leave balance
             if leave_balance:
-                balance_info = []
-                for key, value in leave_balance.items():
-                    if "_balance" in key:
-                        leave_type = key.replace("_balance", "").replace("_", " ").title()
-                        balance_info.append(f"{leave_type}: {value} days")
+                balance_info = [f"{label}: {days} days" for label, days in leave_types_result.get("leave_balance_labels", ())]
 
                 if balance_info:
                     response_parts.append(f"\n💼 आपका वर्तमान छुट्टी शेष। Your current leave balance: {', '.join(balance_info)}")
 
             # Save conversation state to Redis
             logger.info(f"💾 Saving collected_info to state: {collected_info}")
-            conversation_state = {
-                "action": "applying_leave",
-                "leave_info": collected_info,
-                "available_types": available_types,
-                "leave_balance": leave_balance
-            }
+            conversation_state = _applying_leave_state(collected_info, available_types, leave_balance)
 
             if session_id:
-                update_conversation_state(user_id, session_id, conversation_state)
+                await update_conversation_state(user_id, session_id, conversation_state)
             else:
                 # Legacy behavior - save to any active session
-                update_conversation_state(user_id, "legacy", conversation_state)
+                await update_conversation_state(user_id, "legacy", conversation_state)
 
             return {
                 "response": "".join(response_parts),
@@ -398,31 +544,31 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
 
         else:
             # All information collected, validate and apply
+            # (use leave type as default reason if not provided)
             logger.info(f"🔍 Validating leave request with data: {collected_info}")
-            validation_result = await mcp_client.call_tool("validate_leave_request", {
+            default_reason = f"{collected_info['leave_type_name']} application"
+            combined_result = await get_hrms_adapter().validate_and_apply_leave({
                 "user_id": user_id,
                 "leave_type_name": collected_info["leave_type_name"],
                 "from_date": collected_info["from_date"],
-                "to_date": collected_info["to_date"]
+                "to_date": collected_info["to_date"],
+                "reasons": collected_info.get("reasons", default_reason)
             })
-            logger.info(f"✅ Validation result: {validation_result}")
+            logger.info(f"✅ Validation result: is_valid={combined_result.get('is_valid')}, errors={combined_result.get('errors')}")
 
-            if not validation_result.get("is_valid", False):
-                errors = validation_result.get("errors", [])
+            if not combined_result.get("is_valid", False):
+                errors = combined_result.get("errors", [])
                 logger.error(f"❌ Validation failed with errors: {errors}")
 
                 # Save conversation state for validation failures too
-                conversation_state = {
-                    "action": "applying_leave",
-                    "leave_info": collected_info,
-                    "available_types": leave_types_result.get("leave_types", []),
-                    "leave_balance": leave_types_result.get("leave_balance", {})
-                }
+                conversation_state = _applying_leave_state(
+                    collected_info, collect_result.get("leave_types", []), collect_result.get("leave_balance", {})
+                )
 
                 if session_id:
-                    update_conversation_state(user_id, session_id, conversation_state)
+                    await update_conversation_state(user_id, session_id, conversation_state)
                 else:
-                    update_conversation_state(user_id, "legacy", conversation_state)
+                    await update_conversation_state(user_id, "legacy", conversation_state)
 
                 return {
                     "response": f"❌ {'; '.join(errors)}",
@@ -430,22 +576,17 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
                     "context": conversation_state
                 }
 
-            # Apply leave (use leave type as default reason if not provided)
-            default_reason = f"{collected_info['leave_type_name']} application"
-            apply_result = await mcp_client.call_tool("apply_leave", {
-                "user_id": user_id,
-                "leave_type_name": collected_info["leave_type_name"],
-                "from_date": collected_info["from_date"],
-                "to_date": collected_info["to_date"],
-                "reasons": collected_info.get("reasons", default_reason)
-            })
+            apply_result = combined_result.get("apply_result") or {}
 
             if apply_result.get("status") == "success":
+                # Leave balance changed, don't serve the stale one on the next turn
+                await invalidate_leave_types(user_id)
+
                 # Clear conversation state on successful completion
                 if session_id:
-                    clear_conversation_state(user_id, session_id)
+                    await clear_conversation_state(user_id, session_id)
                 else:
-                    clear_conversation_state(user_id, "legacy")
+                    await clear_conversation_state(user_id, "legacy")
                 return {
                     "response": f"✅ बधाई हो! {apply_result.get('message', 'छुट्टी सफलतापूर्वक लागू हो गई')}। Congratulations! Your {collected_info['leave_type_name']} leave from {collected_info['from_date']} to {collected_info['to_date']} has been submitted for approval.",
                     "action_needed": False
@@ -453,17 +594,14 @@ async def handle_leave_application(user_id: str, user_message: str, conversation
             else:
                 # DON'T clear conversation state on error - preserve it for retry
                 # Save the current state so user can continue
-                conversation_state = {
-                    "action": "applying_leave",
-                    "leave_info": collected_info,
-                    "available_types": collect_result.get("available_leave_types", []),
-                    "leave_balance": collect_result.get("leave_balance", {})
-                }
+                conversation_state = _applying_leave_state(
+                    collected_info, collect_result.get("available_leave_types", []), collect_result.get("leave_balance", {})
+                )
 
                 if session_id:
-                    update_conversation_state(user_id, session_id, conversation_state)
+                    await update_conversation_state(user_id, session_id, conversation_state)
                 else:
-                    update_conversation_state(user_id, "legacy", conversation_state)
+                    await update_conversation_state(user_id, "legacy", conversation_state)
 
                 # Extract the exact API error message
                 error_message = apply_result.get('message', 'Unknown error')
@@ -511,7 +649,7 @@ async def handle_attendance_marking(user_id: str, user_message: str, conversatio
                 location = parts[1].strip()
 
         # Mark attendance using Zimyo API (handles both check-in/check-out automatically)
-        result = await mcp_client.call_tool("mark_attendance", {
+        result = await get_hrms_adapter().call_tool("mark_attendance", {
             "user_id": user_id,
             "location": location
         })
@@ -544,10 +682,13 @@ async def handle_attendance_marking(user_id: str, user_message: str, conversatio
 async def handle_leave_balance_inquiry(user_id: str, user_message: str, conversation_context: Dict = None, session_id: str = None) -> Dict[str, Any]:
     """Handle leave balance inquiries"""
     try:
-        # First, check the leave policy (get leave types with policy information)
-        policy_result = await mcp_client.call_tool("get_leave_types", {
-            "user_id": user_id
-        })
+        # Fetch the leave policy and the balance concurrently, neither depends on the other
+        policy_result, result = await asyncio.gather(
+            _get_leave_types_cached(user_id),
+            get_hrms_adapter().call_tool("get_leave_balance", {
+                "user_id": user_id
+            })
+        )
 
         if policy_result.get("status") != "success":
             return {
@@ -555,11 +696,6 @@ async def handle_leave_balance_inquiry(user_id: str, user_message: str, conversa
                 "action_needed": False
             }
 
-        # Then get the leave balance
-        result = await mcp_client.call_tool("get_leave_balance", {
-            "user_id": user_id
-        })
-
         if result.get("status") == "success":
             leave_balance = result.get("leave_balance", {})
 
@@ -619,47 +755,60 @@ async def handle_hr_policy_inquiry(user_id: str, user_message: str, conversation
 
 # ===================== MAIN INTENT DETECTOR =====================
 
+# Map langdetect codes to readable names; only these profiles are loaded
+_LANG_MAP = {
+    'hi': 'hindi',
+    'en': 'english',
+    'es': 'spanish',
+    'fr': 'french',
+    'de': 'german',
+    'pt': 'portuguese',
+    'it': 'italian',
+    'ja': 'japanese',
+    'ko': 'korean',
+    'zh-cn': 'chinese',
+    'ar': 'arabic',
+    'ru': 'russian'
+}
+
+_lang_detector_factory = None
+
+
+def _get_lang_detector_factory():
+    """Build a langdetect factory with only the profiles in _LANG_MAP instead of all 55"""
+    global _lang_detector_factory
+    if _lang_detector_factory is None:
+        from langdetect.detector_factory import DetectorFactory, PROFILES_DIRECTORY
+
+        profiles = []
+        for code in _LANG_MAP:
+            with open(os.path.join(PROFILES_DIRECTORY, code), encoding='utf-8') as f:
+                profiles.append(f.read())
+        factory = DetectorFactory()
+        factory.load_json_profile(profiles)
+        # Fixed seed so a cached answer matches what a fresh detection would return
+        factory.seed = 0
+        _lang_detector_factory = factory
+    return _lang_detector_factory
+
+
+@lru_cache(maxsize=4096)
 def detect_user_language(user_message: str) -> str:
     """Detect the primary language of user message"""
+    # Plain ASCII text can't be Devanagari/CJK/Arabic etc., skip the model for typical English turns
+    if user_message.isascii():
+        return 'english'
     try:
-        from langdetect import detect
-        detected_lang = detect(user_message)
-
-        # Map language codes to readable names
-        lang_map = {
-            'hi': 'hindi',
-            'en': 'english',
-            'es': 'spanish',
-            'fr': 'french',
-            'de': 'german',
-            'pt': 'portuguese',
-            'it': 'italian',
-            'ja': 'japanese',
-            'ko': 'korean',
-            'zh': 'chinese',
-            'ar': 'arabic',
-            'ru': 'russian'
-        }
-
-        return lang_map.get(detected_lang, 'english')
-    except:
+        detector = _get_lang_detector_factory().create()
+        detector.append(user_message)
+        return _LANG_MAP.get(detector.detect(), 'english')
+    except Exception:
         # Fallback to english if detection fails
         return 'english'
 
-async def detect_hr_intent_with_ai(user_message: str) -> Optional[str]:
-    """Use AI model to detect HR-related intents from user message in ANY language"""
-    logger.info(f"Starting AI intent detection for: '{user_message}'")
-
-    from services.ai.chat import get_chat_response
-
-    # Detect user's language for better contextual understanding
-    user_language = detect_user_language(user_message)
-    logger.info(f"Detected language: {user_language}")
-
-    # Create a more comprehensive language-agnostic prompt for intent detection
-    intent_prompt = f"""You are an advanced multilingual HR intent classifier. Analyze the employee message and determine their intent, regardless of language, dialect, informal expressions, or typos.
-
-Employee Message: "{user_message}"
+# Static classifier instructions, sent ahead of the employee message so the provider can
+# reuse its cached prefix across requests - keep anything per-message out of this block
+_INTENT_CLASSIFIER_PROMPT = """You are an advanced multilingual HR intent classifier. Analyze the employee message given at the end and determine their intent, regardless of language, dialect, informal expressions, or typos.
 
 Analyze for these HR intents:
 
@@ -704,227 +853,375 @@ IMPORTANT:
 
 Respond with EXACTLY one of: apply_leave, mark_attendance, leave_balance, hr_policy, none"""
 
+
+# Intents the classifier may answer with, in priority order
+_AI_INTENTS = ("hr_policy", "leave_balance", "mark_attendance", "apply_leave")
+
+# AI intent classifications keyed by normalized message - intents don't depend on the user,
+# and employees repeat the same few requests ("apply leave", "leave balance") constantly
+_intent_cache = {}  # {normalized_message: {"intent": str | None, "expires_at": datetime}}
+INTENT_CACHE_SECONDS = 3600
+INTENT_CACHE_MAX_ENTRIES = 4096
+_INTENT_KEY_STRIP_RE = re.compile(r'[^\w\s]+')
+
+
+def _intent_cache_key(user_message: str) -> str:
+    """Normalize case, punctuation and whitespace so trivially different messages share an entry"""
+    return " ".join(_INTENT_KEY_STRIP_RE.sub(" ", user_message.lower()).split())
+
+
+def _cache_intent(cache_key: str, intent: Optional[str]) -> None:
+    if len(_intent_cache) >= INTENT_CACHE_MAX_ENTRIES:
+        # Evict the oldest entry (dicts keep insertion order)
+        _intent_cache.pop(next(iter(_intent_cache)))
+    _intent_cache[cache_key] = {
+        "intent": intent,
+        "expires_at": datetime.now() + timedelta(seconds=INTENT_CACHE_SECONDS)
+    }
+
+
+# Wall-clock budget for the intent model. After repeated timeouts the model is skipped
+# for a cooldown period so a slow provider doesn't stall every chat turn
+INTENT_AI_TIMEOUT_SECONDS = float(os.getenv("INTENT_AI_TIMEOUT_SECONDS", "2.0"))
+INTENT_AI_MAX_TIMEOUTS = 3
+INTENT_AI_COOLDOWN_SECONDS = 60
+_intent_ai_health = {"consecutive_timeouts": 0, "skip_until": None}
+
+# Dedicated, bounded threads for the blocking SDK call, so a slow provider can't tie up the
+# default executor that to_thread callers share. The SDK enforces the timeout itself, which
+# frees the thread; wait_for only stops the caller from waiting on a queued call.
+INTENT_AI_MAX_WORKERS = 8
+_intent_ai_executor = ThreadPoolExecutor(max_workers=INTENT_AI_MAX_WORKERS, thread_name_prefix="intent-ai")
+
+
+def _record_intent_ai_timeout() -> None:
+    _intent_ai_health["consecutive_timeouts"] += 1
+    if _intent_ai_health["consecutive_timeouts"] >= INTENT_AI_MAX_TIMEOUTS:
+        _intent_ai_health["skip_until"] = datetime.now() + timedelta(seconds=INTENT_AI_COOLDOWN_SECONDS)
+        _intent_ai_health["consecutive_timeouts"] = 0
+        logger.warning(f"⚠️ Intent model timed out {INTENT_AI_MAX_TIMEOUTS} times in a row, skipping it for {INTENT_AI_COOLDOWN_SECONDS}s")
+
+
+async def detect_hr_intent_with_ai(user_message: str) -> Optional[str]:
+    """Use AI model to detect HR-related intents from user message in ANY language"""
+    cache_key = _intent_cache_key(user_message)
+    cache_entry = _intent_cache.get(cache_key)
+    if cache_entry and datetime.now() < cache_entry["expires_at"]:
+        logger.info(f"📦 Using cached intent for '{user_message}': {cache_entry['intent']}")
+        return cache_entry["intent"]
+
+    logger.info(f"Starting AI intent detection for: '{user_message}'")
+
+    # Static instructions first, the per-message part last
+    intent_prompt = f'{_INTENT_CLASSIFIER_PROMPT}\n\nEmployee Message: "{user_message}"\nIntent:'
+
+    skip_until = _intent_ai_health["skip_until"]
+    cooling_down = skip_until is not None and datetime.now() < skip_until
+
     try:
+        if cooling_down:
+            raise asyncio.TimeoutError("intent model is cooling down after repeated timeouts")
+
         logger.info("Calling AI model for intent classification...")
-        response = get_chat_response(role="employee", prompt=intent_prompt)
+        # Run the blocking SDK call off the event loop and give up once the budget is spent
+        response = await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(
+                _intent_ai_executor,
+                partial(get_chat_response, role="employee", prompt=intent_prompt, timeout=INTENT_AI_TIMEOUT_SECONDS)
+            ),
+            timeout=INTENT_AI_TIMEOUT_SECONDS
+        )
+        _intent_ai_health["consecutive_timeouts"] = 0
         intent = response.strip().lower()
         logger.info(f"AI model response: '{response}' -> parsed intent: '{intent}'")
 
-        # Clean up the response to extract just the intent - CHECK POLICY FIRST to avoid false positives
-        if "hr_policy" in intent:
-            logger.info("AI detected: hr_policy")
-            return "hr_policy"
-        elif "leave_balance" in intent:
-            logger.info("AI detected: leave_balance")
-            return "leave_balance"
-        elif "mark_attendance" in intent:
-            logger.info("AI detected: mark_attendance")
-            return "mark_attendance"
-        elif "apply_leave" in intent:
-            logger.info("AI detected: apply_leave")
-            return "apply_leave"
+        model_answered = True
+
+        # Usually the model answers with the bare intent name - one tuple lookup. Otherwise pull
+        # the name out of the surrounding text, CHECK POLICY FIRST to avoid false positives
+        if intent in _AI_INTENTS:
+            detected_intent = intent
+        else:
+            detected_intent = next((name for name in _AI_INTENTS if name in intent), None)
+
+        if detected_intent:
+            logger.info(f"AI detected: {detected_intent}")
         else:
             # Fallback to enhanced simple detection with fuzzy matching
             logger.info(f"AI intent unclear: '{intent}', falling back to enhanced simple detection")
-            enhanced_intent = detect_hr_intent_enhanced(user_message)
-            if enhanced_intent:
-                return enhanced_intent
+            # get_chat_response reports provider errors as text, which also lands here
+            model_answered = intent == "none"
+            detected_intent = _fallback_intent(user_message)
 
-            # Final fallback: use fuzzy matcher
-            from services.utils.fuzzy_matcher import simple_fuzzy_matcher
-            fuzzy_intent = simple_fuzzy_matcher.detect_intent_from_text(user_message)
-            if fuzzy_intent:
-                logger.info(f"Fuzzy matcher detected intent: {fuzzy_intent}")
-                return fuzzy_intent
-
-            return None
+        # Only cache real answers from the model, never a provider error or the exception path below
+        if model_answered:
+            _cache_intent(cache_key, detected_intent)
+        return detected_intent
 
     except Exception as e:
-        logger.error(f"Error in AI intent detection: {e}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        if isinstance(e, asyncio.TimeoutError):
+            # Expected under provider slowness - a stack trace adds nothing
+            if not cooling_down:
+                _record_intent_ai_timeout()
+            logger.warning(f"AI intent detection timed out: {e}")
+        else:
+            logger.exception(f"Error in AI intent detection: {e}")
         # Fallback to enhanced simple detection with fuzzy matching
         logger.info("Falling back to enhanced simple detection due to error")
-        enhanced_intent = detect_hr_intent_enhanced(user_message)
-        if enhanced_intent:
-            return enhanced_intent
+        return _fallback_intent(user_message)
+
+# Keyword lists and regex groups for detect_hr_intent_enhanced, compiled once at import.
+# Enhanced leave keywords with Hindi/Hinglish and common typos
+_LEAVE_KEYWORDS = (
+    # English
+    "leave", "apply", "take", "request", "book", "vacation", "time off", "absent", "holiday",
+    # Hindi/Hinglish
+    "chutti", "avkash", "छुट्टी", "अवकाश", "lagwa", "lagao", "karna", "chahiye", "leni",
+    # Common typos
+    "leav", "aplly", "requist", "tak", "absen", "vaccation"
+)
+
+# Enhanced attendance keywords
+_ATTENDANCE_KEYWORDS = (
+    # English
+    "attendance", "check in", "check out", "punch", "clock", "present", "haaziri",
+    # Hindi/Hinglish
+    "हाजिरी", "उपस्थिति", "mark", "maar", "lagao", "office", "काम",
+    # Common typos
+    "attendence", "atendance", "puch", "chek", "clok", "attandance"
+)
+
+# Enhanced balance keywords
+_BALANCE_KEYWORDS = (
+    # English
+    "balance", "remaining", "how many", "left", "available", "kitni", "kitna",
+    # Hindi/Hinglish
+    "कितना", "कितनी", "बची", "हिसाब", "dekho", "batao", "check",
+    # Common typos
+    "balanc", "remainig", "avalable", "meny"
+)
+
+# HR policy keywords
+_POLICY_KEYWORDS = (
+    # English
+    "policy", "rule", "rules", "guideline", "guidelines", "benefit", "benefits", "scheme",
+    # Hindi/Hinglish
+    "नीति", "नियम", "guideline", "company", "कंपनी", "फायदे", "लाभ",
+    # Common typos
+    "polcy", "polisy", "benfit", "benifit", "guidelne"
+)
+
+# Date pattern detection (enhanced)
+_INTENT_DATE_PATTERNS = (
+    r'\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{4}',  # 22 aug 2025
+    r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2}\s+\d{4}',  # aug 22 2025
+    r'\d{4}-\d{2}-\d{2}',  # 2025-08-22
+    r'\d{1,2}/\d{1,2}/\d{4}',  # 22/08/2025
+    r'tomorrow|yesterday|today|कल|आज|परसों',  # Natural date expressions
+    r'\d+\s*(?:din|day|days)',  # "2 din", "5 days"
+)
+
+# Special patterns for policy inquiries - more specific patterns
+_POLICY_PATTERNS = (
+    r'(?:leave|chutti)\s+(?:policy|polcy|niti)',  # "leave policy"
+    r'company\s+(?:policy|rules)',                # "company policy"
+    r'(?:what|kya)\s+(?:is|hai|my).*(?:policy|rule)', # "what is policy", "what my policy"
+    r'(?:hr|company)\s+(?:benefits|fayde)',       # "HR benefits"
+    r'(?:policy|नीति)\s+(?:ke|ka)\s+(?:bare|about)', # "policy ke bare"
+    r'my\s+(?:leave\s+)?policy',                  # "my leave policy", "my policy"
+    r'what.*(?:leave\s+)?policy',                 # "what leave policy", "what policy"
+    r'tell.*(?:about|me).*policy',                # "tell me about policy"
+)
+
+# Special patterns for balance inquiry (enhanced)
+_BALANCE_PATTERNS = (
+    r'kitni\s+(?:chutti|leave)\s+bachi',   # "kitni chutti bachi"
+    r'leaves?\s+check\s+kar+o?',           # "leaves check karo"
+    r'balance\s+batao',                    # "balance batao"
+    r'kitna\s+leave\s+hai',                # "kitna leave hai"
+    r'(?:leave|chutti)\s+ka\s+hisab',      # "leave ka hisab"
+    r'(?:leave|chutti)\s+balance\s+dekho', # "leave balance dekho"
+    r'कितनी\s+छुट्टी\s+बची\s+है',           # "कितनी छुट्टी बची है"
+    r'how\s+(?:many|meny)\s+leaves?',      # "how many leaves"
+    r'remainig\s+leaves?',                 # typo: "remainig leaves"
+    r'check.*leave.*balance',              # "check leave balance"
+    r'show.*balance',                      # "show balance"
+)
+
+# Special patterns for attendance
+_ATTENDANCE_PATTERNS = (
+    r'attendance\s+kr+\s+do',           # "attendance kr do"
+    r'punch\s+maar\s+do',               # "punch maar do"
+    r'office\s+(?:mai|me)\s+hu',        # "office mai hu"
+    r'present\s+mark\s+kar+o?',         # "present mark karo"
+    r'haaziri\s+lagao',                 # "haaziri lagao"
+    r'mark.*attendance',                # "mark attendance"
+    r'punch.*in',                       # "punch in"
+    r'check.*in',                       # "check in"
+)
+
+# Special patterns for leave requests - make these more specific
+_LEAVE_PATTERNS = (
+    r'merai?\s+leave\s+apply\s+kr+o?',  # "merai leave apply krro"
+    r'chutti\s+kr+\s+do',               # "chutti kr do"
+    r'leave\s+lagwa\s+do',              # "leave lagwa do"
+    r'absent\s+(?:rahunga|rahuga)',     # "absent rahunga"
+    r'time\s+off\s+chahiye',            # "time off chahiye"
+    r'apply.*leave',                    # "apply leave"
+    r'request.*leave',                  # "request leave"
+    r'take.*leave',                     # "take leave"
+    r'need.*leave',                     # "need leave"
+    r'want.*leave',                     # "want leave"
+)
+
+_LEAVE_ACTION_WORDS = ("apply", "request", "take", "need", "want", "book", "lagwa", "करना", "chahiye")
+
+
+def _compile_any(patterns) -> re.Pattern:
+    """Fold a group of regexes into one alternation so a single scan replaces N searches"""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+_INTENT_DATE_RE = _compile_any(_INTENT_DATE_PATTERNS)
+_POLICY_RE = _compile_any(_POLICY_PATTERNS)
+_BALANCE_RE = _compile_any(_BALANCE_PATTERNS)
+_ATTENDANCE_RE = _compile_any(_ATTENDANCE_PATTERNS)
+_LEAVE_RE = _compile_any(_LEAVE_PATTERNS)
+
+# Keyword buckets found by a single Aho-Corasick scan of the message: the four intents plus
+# the context words the rules below depend on. Matching is by substring, like `word in text`.
+_KEYWORD_BUCKETS = {
+    "hr_policy": _POLICY_KEYWORDS,
+    "leave_balance": _BALANCE_KEYWORDS,
+    "mark_attendance": _ATTENDANCE_KEYWORDS,
+    "apply_leave": _LEAVE_KEYWORDS,
+    "leave_context": ("leave", "chutti", "छुट्टी"),
+    "leave_action": _LEAVE_ACTION_WORDS,
+    "leave_date_context": ("leave", "chutti", "absent"),
+}
+
+
+def _build_keyword_automaton(buckets: Dict[str, tuple]) -> ahocorasick.Automaton:
+    """Automaton mapping every keyword to the frozenset of buckets it belongs to"""
+    owners = {}
+    for bucket, words in buckets.items():
+        for word in words:
+            owners.setdefault(word, set()).add(bucket)
+
+    automaton = ahocorasick.Automaton()
+    for word, word_buckets in owners.items():
+        automaton.add_word(word, frozenset(word_buckets))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton(_KEYWORD_BUCKETS)
+
+
+def _keyword_buckets_in(text: str) -> set:
+    """All keyword buckets with at least one keyword in text, overlapping matches included"""
+    found = set()
+    for _, buckets in _KEYWORD_AUTOMATON.iter(text):
+        found |= buckets
+    return found
+
+
+# Intent rules in priority order: policy first for its more specific patterns, leave last to
+# avoid false positives. An intent matches on its pattern, on a (fuzzy) keyword when its
+# keyword_context bucket also appears, or - for leave only - on a date next to a leave word.
+_ENHANCED_INTENT_RULES = {
+    "hr_policy": {
+        "label": "policy",
+        "pattern": _POLICY_RE,
+        "keywords": _POLICY_KEYWORDS,
+        "keyword_context": None,
+    },
+    "leave_balance": {
+        "label": "balance",
+        "pattern": _BALANCE_RE,
+        "keywords": _BALANCE_KEYWORDS,
+        "keyword_context": "leave_context",
+    },
+    "mark_attendance": {
+        "label": "attendance",
+        "pattern": _ATTENDANCE_RE,
+        "keywords": _ATTENDANCE_KEYWORDS,
+        "keyword_context": None,
+    },
+    "apply_leave": {
+        "label": "leave",
+        "pattern": _LEAVE_RE,
+        "keywords": _LEAVE_KEYWORDS,
+        # Only match leave application if it has specific action words or dates, not just the word "leave"
+        "keyword_context": "leave_action",
+        "date_context": "leave_date_context",
+    },
+}
+
+
+@lru_cache(maxsize=8192)
+def _closest_keyword(word: str, keywords: tuple, threshold: int) -> Optional[tuple]:
+    """
+    Best keyword for a word at or above threshold, or None.
 
-        # Final fallback: use fuzzy matcher
-        from services.simple_fuzzy_matcher import simple_fuzzy_matcher
-        fuzzy_intent = simple_fuzzy_matcher.detect_intent_from_text(user_message)
-        if fuzzy_intent:
-            logger.info(f"Fuzzy matcher detected intent: {fuzzy_intent}")
-            return fuzzy_intent
+    rapidfuzz scores the word against the whole keyword list in C and stops early below
+    the cutoff; chat vocabulary repeats a lot, so results are memoized per word.
+    """
+    return process.extractOne(word, keywords, scorer=fuzz.ratio, score_cutoff=threshold)
+
+
+def _fuzzy_match_keywords(tokens: frozenset, keywords: tuple, threshold: int = 70) -> bool:
+    """Fuzzy match for typos - only reached when no keyword appears verbatim"""
+    for word in tokens:
+        if len(word) > 2:
+            match = _closest_keyword(word, keywords, threshold)
+            if match:
+                logger.info(f"Fuzzy matched '{word}' to '{match[0]}' with score {match[1]}")
+                return True
+    return False
 
-        return None
 
 def detect_hr_intent_enhanced(user_message: str) -> Optional[str]:
     """Enhanced fallback intent detection with fuzzy matching and multilingual support"""
-    from fuzzywuzzy import fuzz
-
     message_lower = user_message.lower().strip()
-
-    # Enhanced leave keywords with Hindi/Hinglish and common typos
-    leave_keywords = [
-        # English
-        "leave", "apply", "take", "request", "book", "vacation", "time off", "absent", "holiday",
-        # Hindi/Hinglish
-        "chutti", "avkash", "छुट्टी", "अवकाश", "lagwa", "lagao", "karna", "chahiye", "leni",
-        # Common typos
-        "leav", "aplly", "requist", "tak", "absen", "vaccation"
-    ]
-
-    # Enhanced attendance keywords
-    attendance_keywords = [
-        # English
-        "attendance", "check in", "check out", "punch", "clock", "present", "haaziri",
-        # Hindi/Hinglish
-        "हाजिरी", "उपस्थिति", "mark", "maar", "lagao", "office", "काम",
-        # Common typos
-        "attendence", "atendance", "puch", "chek", "clok", "attandance"
-    ]
-
-    # Enhanced balance keywords
-    balance_keywords = [
-        # English
-        "balance", "remaining", "how many", "left", "available", "kitni", "kitna",
-        # Hindi/Hinglish
-        "कितना", "कितनी", "बची", "हिसाब", "dekho", "batao", "check",
-        # Common typos
-        "balanc", "remainig", "avalable", "meny"
-    ]
-
-    # HR policy keywords
-    policy_keywords = [
-        # English
-        "policy", "rule", "rules", "guideline", "guidelines", "benefit", "benefits", "scheme",
-        # Hindi/Hinglish
-        "नीति", "नियम", "guideline", "company", "कंपनी", "फायदे", "लाभ",
-        # Common typos
-        "polcy", "polisy", "benfit", "benifit", "guidelne"
-    ]
-
-    # Use fuzzy matching for better detection
-    def fuzzy_match_keywords(text: str, keywords: list, threshold: int = 70) -> bool:
-        for keyword in keywords:
-            if keyword in text:
-                return True
-            # Fuzzy match for typos
-            for word in text.split():
-                if len(word) > 2 and fuzz.ratio(word, keyword) >= threshold:
-                    logger.info(f"Fuzzy matched '{word}' to '{keyword}' with score {fuzz.ratio(word, keyword)}")
-                    return True
-        return False
-
-    # Date pattern detection (enhanced)
-    import re
-    date_patterns = [
-        r'\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{4}',  # 22 aug 2025
-        r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2}\s+\d{4}',  # aug 22 2025
-        r'\d{4}-\d{2}-\d{2}',  # 2025-08-22
-        r'\d{1,2}/\d{1,2}/\d{4}',  # 22/08/2025
-        r'tomorrow|yesterday|today|कल|आज|परसों',  # Natural date expressions
-        r'\d+\s*(?:din|day|days)',  # "2 din", "5 days"
-    ]
-    has_date = any(re.search(pattern, message_lower, re.IGNORECASE) for pattern in date_patterns)
-
-    # HR Policy intent detection (enhanced) - CHECK FIRST for more specific patterns
-    has_policy_keyword = fuzzy_match_keywords(message_lower, policy_keywords, 70)
-
-    # Special patterns for policy inquiries - more specific patterns
-    policy_patterns = [
-        r'(?:leave|chutti)\s+(?:policy|polcy|niti)',  # "leave policy"
-        r'company\s+(?:policy|rules)',                # "company policy"
-        r'(?:what|kya)\s+(?:is|hai|my).*(?:policy|rule)', # "what is policy", "what my policy"
-        r'(?:hr|company)\s+(?:benefits|fayde)',       # "HR benefits"
-        r'(?:policy|नीति)\s+(?:ke|ka)\s+(?:bare|about)', # "policy ke bare"
-        r'my\s+(?:leave\s+)?policy',                  # "my leave policy", "my policy"
-        r'what.*(?:leave\s+)?policy',                 # "what leave policy", "what policy"
-        r'tell.*(?:about|me).*policy',                # "tell me about policy"
-    ]
-
-    has_policy_pattern = any(re.search(pattern, message_lower, re.IGNORECASE) for pattern in policy_patterns)
-
-    if has_policy_keyword or has_policy_pattern:
-        logger.info(f"Enhanced detection found policy intent in: '{user_message}'")
-        return "hr_policy"
-
-    # Balance intent detection (enhanced) - CHECK SECOND for balance-specific patterns
-    has_balance_keyword = fuzzy_match_keywords(message_lower, balance_keywords, 70)
-    has_leave_context = any(word in message_lower for word in ["leave", "chutti", "छुट्टी"])
-
-    # Special patterns for balance inquiry (enhanced)
-    balance_patterns = [
-        r'kitni\s+(?:chutti|leave)\s+bachi',   # "kitni chutti bachi"
-        r'leaves?\s+check\s+kar+o?',           # "leaves check karo"
-        r'balance\s+batao',                    # "balance batao"
-        r'kitna\s+leave\s+hai',                # "kitna leave hai"
-        r'(?:leave|chutti)\s+ka\s+hisab',      # "leave ka hisab"
-        r'(?:leave|chutti)\s+balance\s+dekho', # "leave balance dekho"
-        r'कितनी\s+छुट्टी\s+बची\s+है',           # "कितनी छुट्टी बची है"
-        r'how\s+(?:many|meny)\s+leaves?',      # "how many leaves"
-        r'remainig\s+leaves?',                 # typo: "remainig leaves"
-        r'check.*leave.*balance',              # "check leave balance"
-        r'show.*balance',                      # "show balance"
-    ]
-
-    has_balance_pattern = any(re.search(pattern, message_lower, re.IGNORECASE) for pattern in balance_patterns)
-
-    if (has_balance_keyword and has_leave_context) or has_balance_pattern:
-        logger.info(f"Enhanced detection found balance intent in: '{user_message}'")
-        return "leave_balance"
-
-    # Attendance intent detection (enhanced)
-    has_attendance_keyword = fuzzy_match_keywords(message_lower, attendance_keywords, 70)
-
-    # Special patterns for attendance
-    attendance_patterns = [
-        r'attendance\s+kr+\s+do',           # "attendance kr do"
-        r'punch\s+maar\s+do',               # "punch maar do"
-        r'office\s+(?:mai|me)\s+hu',        # "office mai hu"
-        r'present\s+mark\s+kar+o?',         # "present mark karo"
-        r'haaziri\s+lagao',                 # "haaziri lagao"
-        r'mark.*attendance',                # "mark attendance"
-        r'punch.*in',                       # "punch in"
-        r'check.*in',                       # "check in"
-    ]
-
-    has_attendance_pattern = any(re.search(pattern, message_lower, re.IGNORECASE) for pattern in attendance_patterns)
-
-    if has_attendance_keyword or has_attendance_pattern:
-        logger.info(f"Enhanced detection found attendance intent in: '{user_message}'")
-        return "mark_attendance"
-
-    # Leave intent detection (enhanced) - CHECK LAST to avoid false positives
-    has_leave_keyword = fuzzy_match_keywords(message_lower, leave_keywords, 70)
-
-    # Special patterns for leave requests - make these more specific
-    leave_patterns = [
-        r'merai?\s+leave\s+apply\s+kr+o?',  # "merai leave apply krro"
-        r'chutti\s+kr+\s+do',               # "chutti kr do"
-        r'leave\s+lagwa\s+do',              # "leave lagwa do"
-        r'absent\s+(?:rahunga|rahuga)',     # "absent rahunga"
-        r'time\s+off\s+chahiye',            # "time off chahiye"
-        r'apply.*leave',                    # "apply leave"
-        r'request.*leave',                  # "request leave"
-        r'take.*leave',                     # "take leave"
-        r'need.*leave',                     # "need leave"
-        r'want.*leave',                     # "want leave"
-    ]
-
-    has_leave_pattern = any(re.search(pattern, message_lower, re.IGNORECASE) for pattern in leave_patterns)
-
-    # Only match leave application if it has specific action words or dates, not just the word "leave"
-    leave_action_words = ["apply", "request", "take", "need", "want", "book", "lagwa", "करना", "chahiye"]
-    has_leave_action = any(action in message_lower for action in leave_action_words)
-
-    if (has_leave_pattern or (has_leave_keyword and has_leave_action) or
-        (has_date and any(word in message_lower for word in ["leave", "chutti", "absent"]))):
-        logger.info(f"Enhanced detection found leave intent in: '{user_message}'")
-        return "apply_leave"
+    # Nothing to classify in empty or single-character input
+    if len(message_lower) < 2:
+        return None
+    return _detect_hr_intent_enhanced_cached(message_lower)
+
+
+@lru_cache(maxsize=8192)
+def _detect_hr_intent_enhanced_cached(message_lower: str) -> Optional[str]:
+    """Deterministic in the normalized message, so repeated commands are a cache hit"""
+    tokens = frozenset(message_lower.split())
+    # One linear scan finds every verbatim keyword hit across all intents and contexts
+    found = _keyword_buckets_in(message_lower)
+
+    for intent, rule in _ENHANCED_INTENT_RULES.items():
+        # Cheapest checks first: the compiled pattern, then keyword buckets, fuzzy keywords last
+        context = rule["keyword_context"]
+        date_context = rule.get("date_context")
+        if (rule["pattern"].search(message_lower)
+                or ((context is None or context in found)
+                    and (intent in found or _fuzzy_match_keywords(tokens, rule["keywords"], 70)))
+                or (date_context is not None and date_context in found
+                    and _INTENT_DATE_RE.search(message_lower))):
+            logger.info(f"Enhanced detection found {rule['label']} intent in: '{message_lower}'")
+            return intent
 
     return None
 
+def _fallback_intent(user_message: str) -> Optional[str]:
+    """Non-AI intent cascade: enhanced keyword/regex detection, then the fuzzy matcher"""
+    intent = detect_hr_intent_enhanced(user_message)
+    if intent:
+        return intent
+
+    intent = simple_fuzzy_matcher.detect_intent_from_text(user_message)
+    if intent:
+        logger.info(f"Fuzzy matcher detected intent: {intent}")
+    return intent
+
 def detect_hr_intent_simple(user_message: str) -> Optional[str]:
     """Simple fallback intent detection - now calls enhanced version"""
     return detect_hr_intent_enhanced(user_message)
@@ -957,17 +1254,21 @@ async def process_hr_action(user_id: str, user_message: str, intent: str, conver
 
 # ===================== CONTEXT HANDLER FOR ONGOING CONVERSATIONS =====================
 
+# Date formats accepted while collecting leave details, tried in order
+_CONTINUE_DATE_RES = (
+    re.compile(r'\d{4}-\d{2}-\d{2}'),  # 2025-08-22
+    re.compile(r'(?P<day>\d{1,2})\s+(?P<month>' + _MONTHS_RE + r')\s+(?P<year>\d{4})', re.IGNORECASE),  # 22 aug 2025
+    re.compile(r'(?P<month>' + _MONTHS_RE + r')\s+(?P<day>\d{1,2})\s+(?P<year>\d{4})', re.IGNORECASE),  # aug 22 2025
+)
+
 async def handle_continuing_conversation(user_id: str, user_message: str, context: Dict = None, session_id: str = None) -> Dict[str, Any]:
     """Handle ongoing conversations based on context"""
-    from services.operations.conversation_state import get_conversation_state, update_conversation_state
-
     # Get conversation state from Redis if not provided
     if context is None:
         if session_id:
-            context = get_conversation_state(user_id, session_id) or {}
+            context = await get_conversation_state(user_id, session_id) or {}
         else:
-            from services.operations.conversation_state import get_conversation_state_legacy
-            context = get_conversation_state_legacy(user_id) or {}
+            context = await get_conversation_state_legacy(user_id) or {}
 
     action = context.get("action")
 
@@ -981,8 +1282,6 @@ async def handle_continuing_conversation(user_id: str, user_message: str, contex
         # Extract leave type using fuzzy matching (handles typos and languages)
         if "leave_type_name" not in leave_info:
             available_types = context.get("available_types", [])
-            from services.utils.fuzzy_matcher import simple_fuzzy_matcher
-
             match = simple_fuzzy_matcher.fuzzy_match_leave_type(user_message, available_types)
             if match:
                 matched_leave_type, confidence = match
@@ -991,37 +1290,25 @@ async def handle_continuing_conversation(user_id: str, user_message: str, contex
             else:
                 logger.info(f"❌ No leave type extracted from message: '{user_message}'. Available types: {[lt.get('name') for lt in available_types]}")
 
-        # Extract dates (multiple formats)
-        import re
-        from datetime import datetime
-
-        # Try different date patterns
-        date_patterns = [
-            r'\d{4}-\d{2}-\d{2}',  # 2025-08-22
-            r'\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{4}',  # 22 aug 2025
-            r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\s+\d{1,2}\s+\d{4}',  # aug 22 2025
-        ]
-
-        for pattern in date_patterns:
-            dates = re.findall(pattern, user_message, re.IGNORECASE)
-            if dates:
+        # Extract dates (multiple formats), first format that matches wins
+        for pattern in _CONTINUE_DATE_RES:
+            matches = list(pattern.finditer(user_message))
+            if matches:
                 # Convert to standard format
                 converted_dates = []
-                for date_str in dates:
+                for match in matches:
+                    if match.lastindex is None:
+                        # Already in YYYY-MM-DD format
+                        converted_dates.append(match.group(0))
+                        continue
+                    # Natural language date - month is a 3-letter abbreviation
                     try:
-                        if '-' in date_str:
-                            # Already in YYYY-MM-DD format
-                            converted_dates.append(date_str)
-                        else:
-                            # Parse natural language date
-                            dt = datetime.strptime(date_str.lower(), '%d %b %Y')
-                            converted_dates.append(dt.strftime('%Y-%m-%d'))
+                        converted_dates.append(
+                            date(int(match.group('year')), _MONTH[match.group('month').lower()], int(match.group('day'))).isoformat()
+                        )
                     except ValueError:
-                        try:
-                            dt = datetime.strptime(date_str.lower(), '%b %d %Y')
-                            converted_dates.append(dt.strftime('%Y-%m-%d'))
-                        except ValueError:
-                            continue
+                        # Impossible date (e.g. 31 feb)
+                        continue
 
                 # Always assign dates if found in current message (override cached dates)
                 if converted_dates:
@@ -1038,33 +1325,12 @@ async def handle_continuing_conversation(user_id: str, user_message: str, contex
                 break
 
         # Extract reason (only if it's not a leave type or date-related)
-        available_type_names = [lt.get("name", "").lower() for lt in context.get("available_types", [])]
-
         # More specific check for leave type keywords to avoid false positives
-        is_leave_type = False
-        for type_name in available_type_names:
-            # Check for specific leave type keywords, not generic "leave"
-            leave_keywords = []
-            if "earned" in type_name:
-                leave_keywords.append("earned")
-            elif "sick" in type_name:
-                leave_keywords.append("sick")
-            elif "casual" in type_name:
-                leave_keywords.append("casual")
-            elif "emergency" in type_name:
-                leave_keywords.append("emergency")
-            elif "maternity" in type_name:
-                leave_keywords.append("maternity")
-            elif "paternity" in type_name:
-                leave_keywords.append("paternity")
-            elif "comp" in type_name or "compensatory" in type_name:
-                leave_keywords.extend(["comp", "compensatory"])
-            elif "annual" in type_name:
-                leave_keywords.append("annual")
-
-            if any(keyword in message_lower for keyword in leave_keywords):
-                is_leave_type = True
-                break
+        # (keywords are precomputed when the leave flow starts; older saved states lack them)
+        type_keywords = context.get("leave_type_keywords")
+        if type_keywords is None:
+            type_keywords = _leave_type_keywords(lt.get("name", "") for lt in context.get("available_types", []))
+        is_leave_type = any(keyword in message_lower for keyword in type_keywords)
 
         # Only extract reason if we already have both leave_type and dates
         # This prevents dates or leave types from being misidentified as reasons
@@ -1079,9 +1345,9 @@ async def handle_continuing_conversation(user_id: str, user_message: str, contex
 
         # Update conversation state with extracted info
         if session_id:
-            update_conversation_state(user_id, session_id, {"leave_info": leave_info})
+            await update_conversation_state(user_id, session_id, {"leave_info": leave_info})
         else:
-            update_conversation_state(user_id, "legacy", {"leave_info": leave_info})
+            await update_conversation_state(user_id, "legacy", {"leave_info": leave_info})
 
         # Continue the leave application process
         return await handle_leave_application(user_id, user_message, None, session_id)
@@ -5,10 +5,13 @@ Handles communication with the Node.js Zimyo API server
 
 import httpx
 import logging
+import orjson
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 # Node.js API server configuration
 NODE_API_BASE_URL = "http://localhost:3000/api"
 
@@ -17,28 +20,45 @@ class NodeAPIClient:
 
     def __init__(self, base_url: str = NODE_API_BASE_URL):
         self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared pooled client, created on first use so keep-alive connections are reused across calls"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close pooled connections (called on app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def call_api(self, endpoint: str, method: str = "POST", data: Optional[Dict] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
         """Make API call to Node.js server"""
         try:
-            url = f"{self.base_url}/{endpoint}"
-
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if method.upper() == "POST":
-                    response = await client.post(url, json=data)
-                elif method.upper() == "GET":
-                    response = await client.get(url, params=params)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
-
-                response.raise_for_status()
-                return response.json()
+            # Endpoint is resolved against the client's base_url
+            if method.upper() == "POST":
+                # orjson returns bytes directly, no str round-trip before sending
+                response = await self.client.post(endpoint, content=orjson.dumps(data), headers=_JSON_HEADERS)
+            elif method.upper() == "GET":
+                response = await self.client.get(endpoint, params=params)
+            else:
+                raise ValueError(f"Unsupported HTTP method: {method}")
+
+            response.raise_for_status()
+            return orjson.loads(response.content)
 
         except httpx.HTTPError as e:
             logger.error(f"HTTP error calling Node API {endpoint}: {e}")
             if hasattr(e, 'response') and e.response is not None:
                 try:
-                    return e.response.json()
+                    return orjson.loads(e.response.content)
                 except:
                     pass
             return {"status": "error", "message": f"API call failed: {str(e)}"}
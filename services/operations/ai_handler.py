@@ -19,9 +19,15 @@ Supported Operations:
 Author: Zimyo AI Team
 """
 
+import asyncio
+import hashlib
 import logging
+import re
+from datetime import date
 from typing import Dict, Any, Optional
 
+import orjson
+
 # Import modular HRMS handlers
 from .hrms_handlers import (
     handle_leave_balance,
@@ -33,9 +39,22 @@ from .hrms_handlers import (
     handle_get_salary_slip
 )
 from .hrms_handlers.shared import get_leave_types_cached
+from services.ai.intent_batcher import intent_batcher
+from services.integration.mcp_client import get_http_mcp_client
+from services.operations.conversation_state import get_conversation_state, redis_client, update_conversation_state
 
 logger = logging.getLogger(__name__)
 
+# Shared LLM intent results (cache-aside in Redis, across users and sessions)
+INTENT_RESULT_CACHE_SECONDS = 1800
+INTENT_RESULT_CACHE_MAX_MESSAGE_CHARS = 200
+INTENT_RESULT_LOCK_SECONDS = 10
+INTENT_RESULT_LOCK_WAIT_SECONDS = 2.0
+
+# Short, unambiguous commands answered without the LLM (whole message must match)
+_QUICK_ATTENDANCE_RE = re.compile(r"(?:please |pls )?(?:punch|check)[ -]?(?P<direction>in|out)(?: please| pls)?")
+_QUICK_SALARY_SLIP_RE = re.compile(r"(?:show |get |download )?(?:my )?(?:salary|pay) ?slip")
+
 # ============================================================================
 # MAIN HANDLER - Entry point for all HRMS operations
 # ============================================================================
@@ -75,20 +94,21 @@ async def handle_hrms_with_ai(
         User: "sick"
         → Returns: {"response": "What date?", "sessionId": "..."}
     """
-    # STEP 1: Load previous conversation data (if any)
-    # This enables context accumulation across messages
-    context = _get_conversation_context(user_id, session_id)
-
-    # STEP 2: Get MCP client and leave types (cached for 30 min - performance optimization)
-    from services.integration.mcp_client import get_http_mcp_client
+    # STEP 1 + 2: Load previous conversation data (if any) and leave types together
+    # - Context enables accumulation across messages
+    # - Leave types come from MCP (cached - performance optimization)
+    # Both are I/O, so their latencies overlap
     mcp_client = get_http_mcp_client()
-    available_leave_types = await get_leave_types_cached(user_id, mcp_client)
+    context, available_leave_types = await asyncio.gather(
+        _get_conversation_context(user_id, session_id),
+        get_leave_types_cached(user_id, mcp_client)
+    )
 
     # STEP 3: AI analyzes user message
     # - Detects intent (apply_leave, mark_attendance, etc.)
     # - Extracts data (dates, types, reasons)
     # - Determines if ready to execute or needs more info
-    ai_result = _analyze_with_ai(user_message, context, available_leave_types)
+    ai_result = await _analyze_with_ai(user_message, context, available_leave_types, f"{user_id}:{session_id or 'legacy'}")
 
     # STEP 4: Merge AI output with previous context
     # Example: Previous {date: "22 nov"} + New {type: "sick"} = {date: "22 nov", type: "sick"}
@@ -96,9 +116,7 @@ async def handle_hrms_with_ai(
 
     # STEP 5: CRITICAL - Save merged data back to Redis
     # This ensures next message has accumulated context
-    from services.operations.conversation_state import update_conversation_state
-
-    update_conversation_state(user_id, session_id or "legacy", {
+    await update_conversation_state(user_id, session_id or "legacy", {
         "intent": ai_result.get("intent"),
         "extracted_data": extracted_data,  # Accumulated data!
         "available_leave_types": available_leave_types
@@ -126,7 +144,7 @@ async def handle_hrms_with_ai(
 # HELPER FUNCTIONS - Internal use only
 # ============================================================================
 
-def _get_conversation_context(user_id: str, session_id: Optional[str]) -> Dict:
+async def _get_conversation_context(user_id: str, session_id: Optional[str]) -> Dict:
     """
     📥 Load conversation context from Redis
 
@@ -136,16 +154,15 @@ def _get_conversation_context(user_id: str, session_id: Optional[str]) -> Dict:
     Returns:
         Dict with {intent, extracted_data, available_leave_types} or {}
     """
-    from services.operations.conversation_state import get_conversation_state
-
     # Use "legacy" as default session_id to match the save behavior at line 100
-    return get_conversation_state(user_id, session_id or "legacy") or {}
+    return await get_conversation_state(user_id, session_id or "legacy") or {}
 
 
-def _analyze_with_ai(
+async def _analyze_with_ai(
     user_message: str,
     context: Dict,
-    leave_types: list
+    leave_types: list,
+    batch_key: str
 ) -> Dict[str, Any]:
     """
     🧠 AI analyzes user message and extracts structured data
@@ -167,22 +184,154 @@ def _analyze_with_ai(
             "ready_to_execute": true|false
         }
     """
-    from services.ai.hrms_extractor import detect_intent_and_extract
-
     logger.info(f"🤖 Analyzing: '{user_message[:30]}...'")
 
-    # Call AI model (temperature=0.1 for consistent extraction)
-    result = detect_intent_and_extract(
-        user_message=user_message,
-        user_context=context,
-        available_leave_types=leave_types
-    )
+    quick_result = _quick_intent(user_message, context)
+    if quick_result:
+        logger.info(f"⚡ Quick intent: {quick_result['intent']} (no AI call)")
+        return quick_result
+
+    # Same message + context + leave types → reuse the earlier AI answer
+    cache_key = _intent_result_cache_key(user_message, context, leave_types)
+    has_lock = False
+    if cache_key:
+        cached = await _get_cached_intent_result(cache_key)
+        if cached:
+            logger.info(f"⚡ Intent cache hit: {cached['intent']}")
+            return cached
+
+        # Stampede protection: one request computes, identical concurrent misses wait for it
+        try:
+            has_lock = bool(await redis_client.set(f"{cache_key}:lock", b"1", nx=True, ex=INTENT_RESULT_LOCK_SECONDS))
+        except Exception as e:
+            logger.warning(f"⚠️ Intent cache lock failed: {e}")
+            has_lock = True  # Redis unavailable - just call the model
+        if not has_lock:
+            cached = await _wait_for_intent_result(cache_key)
+            if cached:
+                logger.info(f"⚡ Intent cache hit after wait: {cached['intent']}")
+                return cached
+
+    try:
+        # Call AI model (temperature=0.1 for consistent extraction)
+        # Concurrent messages of the same conversation share one batched model call
+        result = await intent_batcher.submit(user_message, context, leave_types, batch_key)
+
+        if cache_key and _is_cacheable_intent_result(result):
+            try:
+                await redis_client.setex(cache_key, INTENT_RESULT_CACHE_SECONDS, orjson.dumps(result, default=str))
+            except Exception as e:
+                logger.warning(f"⚠️ Intent cache write failed: {e}")
+    finally:
+        if has_lock:
+            try:
+                await redis_client.delete(f"{cache_key}:lock")
+            except Exception:
+                pass
 
     logger.info(f"✅ Intent: {result['intent']} | Ready: {result['ready_to_execute']}")
 
     return result
 
 
+def _quick_intent(user_message: str, context: Dict) -> Optional[Dict[str, Any]]:
+    """
+    Classify bare commands like "punch in" or "salary slip" without the LLM.
+
+    Returns the same shape detect_intent_and_extract would, or None to fall
+    through to AI. Skipped while an on-duty/regularization flow is collecting
+    details, since those flows treat any reply as part of the flow.
+    """
+    if context.get("intent") in ("apply_onduty", "apply_regularization"):
+        return None
+
+    message = " ".join(user_message.lower().split())
+    if len(message) > 40:
+        return None
+
+    attendance_match = _QUICK_ATTENDANCE_RE.fullmatch(message)
+    if attendance_match:
+        intent, extracted_data = "mark_attendance", {"action": f"check_{attendance_match.group('direction')}"}
+    elif _QUICK_SALARY_SLIP_RE.fullmatch(message):
+        today = date.today()
+        intent, extracted_data = "get_salary_slip", {"month": today.month, "year": today.year}
+    else:
+        return None
+
+    return {
+        "intent": intent,
+        "confidence": 1.0,
+        "extracted_data": extracted_data,
+        "missing_fields": [],
+        "next_question": None,
+        "ready_to_execute": True
+    }
+
+
+def _intent_result_cache_key(user_message: str, context: Dict, leave_types: list) -> Optional[str]:
+    """
+    Cache key for an AI intent result, or None if the message shouldn't be cached.
+
+    Covers everything the prompt depends on: normalized message, previous
+    intent/data, leave type names and today's date (relative dates).
+    """
+    message = " ".join(user_message.lower().split())
+    if not message or len(message) > INTENT_RESULT_CACHE_MAX_MESSAGE_CHARS:
+        return None
+
+    fingerprint = orjson.dumps({
+        "message": message,
+        "intent": context.get("intent"),
+        "extracted_data": context.get("extracted_data") or {},
+        "leave_types": sorted(lt.get("name", "") for lt in leave_types),
+        "today": date.today().isoformat()
+    }, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return f"llm_intent:{hashlib.sha1(fingerprint).hexdigest()}"
+
+
+def _is_cacheable_intent_result(result: Dict[str, Any]) -> bool:
+    """Only cache partial extractions - not ready-to-execute actions or AI failures"""
+    return (
+        not result.get("ready_to_execute")
+        and result.get("intent") not in (None, "unknown")
+        and "explanation" not in result
+    )
+
+
+async def _get_cached_intent_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    try:
+        cached_raw = await redis_client.get(cache_key)
+        return orjson.loads(cached_raw) if cached_raw else None
+    except Exception as e:
+        logger.warning(f"⚠️ Intent cache read failed: {e}")
+        return None
+
+
+async def _wait_for_intent_result(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    Poll for the result another request is computing.
+
+    Stops early once that request releases its lock without caching anything
+    (e.g. a ready-to-execute result), and gives up after INTENT_RESULT_LOCK_WAIT_SECONDS.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + INTENT_RESULT_LOCK_WAIT_SECONDS
+    try:
+        while loop.time() < deadline:
+            await asyncio.sleep(0.05)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.get(cache_key)
+                pipe.exists(f"{cache_key}:lock")
+                cached_raw, locked = await pipe.execute()
+            if cached_raw:
+                return orjson.loads(cached_raw)
+            if not locked:
+                return None
+    except Exception as e:
+        logger.warning(f"⚠️ Intent cache wait failed: {e}")
+    return None
+
+
 def _merge_context(old_context: Dict, ai_result: Dict) -> Dict:
     """
     🔄 Merge AI output with previous context (Context Accumulation)
@@ -200,15 +349,50 @@ def _merge_context(old_context: Dict, ai_result: Dict) -> Dict:
         ai_result = {"extracted_data": {"leave_type": "Sick Leave"}}
         → Returns: {"from_date": "2025-11-22", "leave_type": "Sick Leave"}
     """
-    merged = {
-        **old_context.get("extracted_data", {}),  # Previous data
-        **ai_result.get("extracted_data", {})      # New data
-    }
+    previous_data = old_context.get("extracted_data")
+    new_data = ai_result.get("extracted_data") or {}
+    if not previous_data:
+        # Nothing to accumulate yet - still a copy, callers mutate the result
+        merged = dict(new_data)
+    else:
+        merged = previous_data.copy()  # Previous data
+        merged.update(new_data)        # New data
 
     logger.debug(f"📦 Merged fields: {list(merged.keys())}")
     return merged
 
 
+# Intent → handler adapter. Each adapter takes the routing context dict and
+# passes the arguments that handler expects.
+INTENT_HANDLERS = {
+    "check_leave_balance": lambda ctx: handle_leave_balance(
+        ctx["user_id"], ctx["mcp_client"], ctx["session_id"]
+    ),
+    "mark_attendance": lambda ctx: handle_attendance(
+        ctx["user_id"], ctx["extracted_data"], ctx["ready"], ctx["next_question"],
+        ctx["mcp_client"], ctx["session_id"]
+    ),
+    "apply_leave": lambda ctx: handle_apply_leave(
+        ctx["user_id"], ctx["extracted_data"], ctx["ready"], ctx["next_question"],
+        ctx["available_leave_types"], ctx["mcp_client"], ctx["session_id"]
+    ),
+    "apply_regularization": lambda ctx: handle_apply_regularization(
+        ctx["user_id"], ctx["extracted_data"], ctx["ready"], ctx["next_question"],
+        ctx["mcp_client"], ctx["session_id"]
+    ),
+    "apply_onduty": lambda ctx: handle_apply_onduty(
+        ctx["user_id"], ctx["extracted_data"], ctx["ready"], ctx["next_question"],
+        ctx["mcp_client"], ctx["session_id"]
+    ),
+    "get_holidays": lambda ctx: handle_get_holidays(
+        ctx["user_id"], ctx["mcp_client"], ctx["session_id"]
+    ),
+    "get_salary_slip": lambda ctx: handle_get_salary_slip(
+        ctx["user_id"], ctx["mcp_client"], ctx["session_id"], {"values": ctx["extracted_data"]}
+    ),
+}
+
+
 async def _route_to_handler(
     intent: str,
     user_id: str,
@@ -219,63 +403,37 @@ async def _route_to_handler(
     session_id: Optional[str]
 ) -> Optional[Dict[str, Any]]:
     """
-    Route to appropriate handler based on intent.
+    Route to appropriate handler based on intent (see INTENT_HANDLERS).
 
     Returns None for policy questions (handled by chat system).
     """
-    from services.integration.mcp_client import get_http_mcp_client
-    mcp_client = get_http_mcp_client()
-
-    # Route based on intent
-    if intent == "check_leave_balance":
-        return await handle_leave_balance(user_id, mcp_client, session_id)
-
-    elif intent == "mark_attendance":
-        return await handle_attendance(
-            user_id, extracted_data, ready, next_question,
-            mcp_client, session_id
-        )
-
-    elif intent == "apply_leave":
-        return await handle_apply_leave(
-            user_id, extracted_data, ready, next_question,
-            available_leave_types, mcp_client, session_id
-        )
-
-    elif intent == "apply_regularization":
-        return await handle_apply_regularization(
-            user_id, extracted_data, ready, next_question,
-            mcp_client, session_id
-        )
-
-    elif intent == "apply_onduty":
-        return await handle_apply_onduty(
-            user_id, extracted_data, ready, next_question,
-            mcp_client, session_id
-        )
-
-    elif intent == "get_holidays":
-        return await handle_get_holidays(user_id, mcp_client, session_id)
-
-    elif intent == "get_salary_slip":
-        return await handle_get_salary_slip(user_id, mcp_client, session_id, {"values": extracted_data})
-
-    elif intent == "policy_question":
+    handler = INTENT_HANDLERS.get(intent)
+    if handler:
+        return await handler({
+            "user_id": user_id,
+            "extracted_data": extracted_data,
+            "ready": ready,
+            "next_question": next_question,
+            "available_leave_types": available_leave_types,
+            "mcp_client": get_http_mcp_client(),
+            "session_id": session_id
+        })
+
+    if intent == "policy_question":
         # Let regular chat handler process policy questions
         logger.info("📚 Routing to policy chat handler")
         return None
 
-    else:
-        # Unknown intent - DON'T return None, ask clarifying question!
-        logger.warning(f"❓ Unknown intent: {intent}, asking for clarification")
+    # Unknown intent - DON'T return None, ask clarifying question!
+    logger.warning(f"❓ Unknown intent: {intent}, asking for clarification")
 
-        # NO NEED to save here - already saved at line 100!
-        # Saving here would overwrite the correct intent
+    # NO NEED to save here - already saved in handle_hrms_with_ai (STEP 5)!
+    # Saving here would overwrite the correct intent
 
-        return {
-            "response": "मुझे समझ नहीं आया। क्या आप स्पष्ट कर सकते हैं? I didn't understand. Could you please clarify what you want to do? (e.g., apply leave, check attendance, view balance)",
-            "sessionId": session_id
-        }
+    return {
+        "response": "मुझे समझ नहीं आया। क्या आप स्पष्ट कर सकते हैं? I didn't understand. Could you please clarify what you want to do? (e.g., apply leave, check attendance, view balance)",
+        "sessionId": session_id
+    }
 
 
 # ============================================================================
@@ -3,31 +3,91 @@
 Redis-based conversation state management for HR actions
 """
 
-import json
-import redis
+import orjson
 import logging
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Optional, Any, List
 
+from redis.asyncio import BlockingConnectionPool, Redis
+from redis.exceptions import ResponseError, WatchError
+
 logger = logging.getLogger(__name__)
 
-# Redis connection
-redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+# Redis connection - async client over one shared pool so state I/O never blocks the event loop.
+# Values are orjson bytes end to end, so responses are not decoded to str first.
+_redis_pool = BlockingConnectionPool(host="localhost", port=6379, db=0, max_connections=64, decode_responses=False)
+redis_client = Redis(connection_pool=_redis_pool)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize a Redis value; str() anything orjson can't encode natively"""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _is_wrong_type(error: Exception) -> bool:
+    """True for Redis WRONGTYPE errors (a key still holding an older value format)"""
+    return isinstance(error, ResponseError) and "WRONGTYPE" in str(error)
+
+
+async def close_redis():
+    """Close pooled Redis connections (called on app shutdown)"""
+    await redis_client.aclose()
+
+# Conversation state is a HASH of top-level field -> orjson value, so updates can be
+# merged field by field (see _merge_state_fields).
+STATE_SECONDS = 1800  # 30 minutes
+
+
+def _state_to_fields(state: Dict[str, Any]) -> Dict[bytes, bytes]:
+    return {key.encode(): _dumps(value) for key, value in state.items()}
+
+
+def _state_from_fields(state_fields: Dict[bytes, bytes]) -> Dict[str, Any]:
+    return {field.decode(): orjson.loads(value) for field, value in state_fields.items()}
+
+
+# Process-local tier in front of Redis for conversation state reads. Holds the raw field
+# JSON so every hit parses a fresh dict (callers mutate state in place). Writes and clears
+# go through it, so staleness is bounded by STATE_CACHE_SECONDS only across workers.
+_state_cache = {}  # {(user_id, session_id): {"fields": {bytes: bytes}, "expires_at": datetime}}
+STATE_CACHE_SECONDS = 8
+STATE_CACHE_MAX_ENTRIES = 10000
+
+
+def _cache_state_fields(user_id: str, session_id: str, state_fields: Dict[bytes, bytes]) -> None:
+    if len(_state_cache) >= STATE_CACHE_MAX_ENTRIES:
+        # Evict the oldest entry (dicts keep insertion order)
+        _state_cache.pop(next(iter(_state_cache)))
+    _state_cache[(user_id, session_id)] = {
+        "fields": state_fields,
+        "expires_at": datetime.now() + timedelta(seconds=STATE_CACHE_SECONDS)
+    }
+
+
+def _cached_state_fields(user_id: str, session_id: str) -> Optional[Dict[bytes, bytes]]:
+    cache_entry = _state_cache.get((user_id, session_id))
+    if cache_entry and datetime.now() < cache_entry["expires_at"]:
+        return cache_entry["fields"]
+    return None
+
+
+SESSIONS_SECONDS = 86400  # 24 hours
+
 
 def get_conversation_key(user_id: str, session_id: str) -> str:
     """Get Redis key for user's conversation state with session ID"""
     return f"conversation_state:{user_id}:{session_id}"
 
 def get_user_sessions_key(user_id: str) -> str:
-    """Get Redis key for user's session list"""
+    """Get Redis key for user's sessions (a HASH of session_id -> session info JSON)"""
     return f"user_sessions:{user_id}"
 
 def get_chat_history_key(user_id: str, session_id: str) -> str:
     """Get Redis key for chat history"""
     return f"chat_history:{user_id}:{session_id}"
 
-def create_session(user_id: str, session_name: Optional[str] = None) -> str:
+async def create_session(user_id: str, session_name: Optional[str] = None) -> str:
     """Create a new conversation session for user"""
     try:
         session_id = str(uuid.uuid4())[:8]  # Short unique ID
@@ -41,12 +101,9 @@ def create_session(user_id: str, session_name: Optional[str] = None) -> str:
             "status": "active"
         }
 
-        # Add to user's session list
+        # Add to user's sessions (one hash field per session)
         sessions_key = get_user_sessions_key(user_id)
-        sessions_raw = redis_client.get(sessions_key)
-        sessions = json.loads(sessions_raw) if sessions_raw else []
-        sessions.append(session_info)
-        redis_client.setex(sessions_key, 86400, json.dumps(sessions))  # 24 hours
+        await _with_hash(sessions_key, lambda: _add_session(sessions_key, session_id, session_info), _convert_legacy_sessions)
 
         logger.info(f"Created new session {session_id} for user {user_id}")
         return session_id
@@ -54,29 +111,163 @@ def create_session(user_id: str, session_name: Optional[str] = None) -> str:
         logger.error(f"Error creating session for {user_id}: {e}")
         return None
 
-def get_user_sessions(user_id: str) -> List[Dict[str, Any]]:
+async def get_user_sessions(user_id: str) -> List[Dict[str, Any]]:
     """Get all sessions for a user"""
     try:
         sessions_key = get_user_sessions_key(user_id)
-        sessions_raw = redis_client.get(sessions_key)
-
-        if not sessions_raw:
-            return []
+        sessions_raw = await _with_hash(sessions_key, lambda: redis_client.hvals(sessions_key), _convert_legacy_sessions)
 
-        sessions = json.loads(sessions_raw)
+        # Hash fields are unordered - keep the creation order the old list had
+        sessions = [orjson.loads(session_raw) for session_raw in sessions_raw]
+        sessions.sort(key=lambda session: session.get("created_at", ""))
         return sessions
     except Exception as e:
         logger.error(f"Error getting sessions for {user_id}: {e}")
         return []
 
-def save_conversation_state(user_id: str, session_id: str, state: Dict[str, Any]) -> bool:
+async def _add_session(sessions_key: str, session_id: str, session_info: Dict[str, Any]) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(sessions_key, session_id, _dumps(session_info))
+        pipe.expire(sessions_key, SESSIONS_SECONDS)
+        await pipe.execute()
+
+
+async def _convert_legacy_sessions(sessions_key: str) -> None:
+    """Rewrite a session list stored as one JSON array (older format) as a hash"""
+    sessions_raw = await redis_client.get(sessions_key)
+    sessions = orjson.loads(sessions_raw) if sessions_raw else []
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(sessions_key)
+        if sessions:
+            pipe.hset(sessions_key, mapping={session["session_id"]: _dumps(session) for session in sessions})
+            pipe.expire(sessions_key, SESSIONS_SECONDS)
+        await pipe.execute()
+    logger.info(f"Converted {sessions_key} to a Redis hash ({len(sessions)} sessions)")
+
+
+async def _convert_legacy_state(key: str) -> None:
+    """Rewrite a conversation state stored as one JSON blob (older format) as a hash, keeping its TTL"""
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.get(key)
+        pipe.ttl(key)
+        state_raw, ttl = await pipe.execute()
+    state = orjson.loads(state_raw) if state_raw else {}
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        if state:
+            pipe.hset(key, mapping=_state_to_fields(state))
+            pipe.expire(key, ttl if ttl and ttl > 0 else STATE_SECONDS)
+        await pipe.execute()
+    logger.info(f"Converted {key} to a Redis hash")
+
+
+async def _with_hash(key: str, operation, convert_legacy):
+    """Run a hash operation, converting an older JSON value with `convert_legacy` first if Redis reports WRONGTYPE"""
+    try:
+        return await operation()
+    except ResponseError as e:
+        if not _is_wrong_type(e):
+            raise
+        await convert_legacy(key)
+        return await operation()
+
+
+# Set last_active on one session in place (no-op if the user has no such session)
+_TOUCH_SESSION_SCRIPT = redis_client.register_script("""
+local session_raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not session_raw then
+    return 0
+end
+local session = cjson.decode(session_raw)
+session['last_active'] = ARGV[2]
+redis.call('HSET', KEYS[1], ARGV[1], cjson.encode(session))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+""")
+
+
+async def _touch_session(user_id: str, session_id: str, client=None):
+    """Update a session's last_active (pass a pipeline as `client` to batch it with other commands)"""
+    return await _TOUCH_SESSION_SCRIPT(
+        keys=[get_user_sessions_key(user_id)],
+        args=[session_id, datetime.now().isoformat(), SESSIONS_SECONDS],
+        client=client
+    )
+
+
+# Fields whose dict updates keep existing keys the update doesn't mention
+_DEEP_MERGE_FIELDS = ("leave_info", "extracted_data")
+
+
+async def _merge_state_fields(user_id: str, session_id: str, updates: Dict[str, Any]) -> Dict[bytes, bytes]:
+    """
+    Merge field updates into a conversation state hash and return the whole state.
+
+    Deep-merge fields are merged in Python under WATCH, so JSON values round-trip through
+    orjson unchanged (no cjson re-encoding of lists or numbers) and a concurrent update
+    to the same state retries instead of losing fields. The session touch rides in the
+    same MULTI.
+    """
+    key = get_conversation_key(user_id, session_id)
+    deep_fields = [field for field, value in updates.items() if field in _DEEP_MERGE_FIELDS and isinstance(value, dict)]
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        while True:
+            try:
+                await pipe.watch(key)
+                current_raw = await pipe.hmget(key, deep_fields) if deep_fields else []
+
+                state_fields = {field.encode(): _dumps(value) for field, value in updates.items()}
+                for field, raw in zip(deep_fields, current_raw):
+                    current = orjson.loads(raw) if raw else None
+                    # Only object-typed values are merged; anything else is replaced
+                    if isinstance(current, dict):
+                        state_fields[field.encode()] = _dumps({**current, **updates[field]})
+
+                pipe.multi()
+                if state_fields:
+                    pipe.hset(key, mapping=state_fields)
+                pipe.expire(key, STATE_SECONDS)
+                pipe.hgetall(key)
+                await _touch_session(user_id, session_id, client=pipe)
+                *_, state_fields, touch_result = await pipe.execute(raise_on_error=False)
+                break
+            except WatchError:
+                continue  # Someone else changed this state in between - merge again on top of theirs
+
+    if isinstance(state_fields, Exception):
+        raise state_fields  # e.g. WRONGTYPE on an older JSON blob - _with_hash converts it and retries
+    await _retry_touch_if_legacy(user_id, session_id, touch_result)
+    return state_fields
+
+
+async def _retry_touch_if_legacy(user_id: str, session_id: str, touch_result: Any) -> None:
+    """A pipelined touch fails on an old JSON-array session list - convert it and touch again"""
+    if isinstance(touch_result, Exception):
+        if not _is_wrong_type(touch_result):
+            raise touch_result
+        await _convert_legacy_sessions(get_user_sessions_key(user_id))
+        await _touch_session(user_id, session_id)
+
+
+async def save_context_bundle(user_id: str, session_id: str, state: Dict[str, Any]) -> None:
+    """Replace conversation state and touch the session's last_active in a single Redis round-trip"""
+    key = get_conversation_key(user_id, session_id)
+    state_fields = _state_to_fields(state)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        if state_fields:
+            pipe.hset(key, mapping=state_fields)
+            pipe.expire(key, STATE_SECONDS)
+        await _touch_session(user_id, session_id, client=pipe)
+        results = await pipe.execute(raise_on_error=False)
+    _cache_state_fields(user_id, session_id, state_fields)
+    await _retry_touch_if_legacy(user_id, session_id, results[-1])
+
+async def save_conversation_state(user_id: str, session_id: str, state: Dict[str, Any]) -> bool:
     """Save conversation state to Redis with session ID"""
     try:
-        key = get_conversation_key(user_id, session_id)
-        redis_client.setex(key, 1800, json.dumps(state))  # Expire in 30 minutes
-
-        # Update session last_active timestamp
-        update_session_activity(user_id, session_id)
+        await save_context_bundle(user_id, session_id, state)
 
         logger.info(f"Saved conversation state for user {user_id}, session {session_id}")
         return True
@@ -84,18 +275,22 @@ def save_conversation_state(user_id: str, session_id: str, state: Dict[str, Any]
         logger.error(f"Error saving conversation state for {user_id}, session {session_id}: {e}")
         return False
 
-def get_conversation_state(user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+async def get_conversation_state(user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
     """Get conversation state from Redis with session ID"""
     try:
-        key = get_conversation_key(user_id, session_id)
-        logger.info(f"conversation key : {key}")
-        state_raw = redis_client.get(key)
-
-        if not state_raw:
+        state_fields = _cached_state_fields(user_id, session_id)
+        if state_fields is None:
+            key = get_conversation_key(user_id, session_id)
+            logger.info(f"conversation key : {key}")
+            state_fields = await _with_hash(key, lambda: redis_client.hgetall(key), _convert_legacy_state)
+            if state_fields:
+                _cache_state_fields(user_id, session_id, state_fields)
+
+        if not state_fields:
             logger.info(f"No conversation state found for user {user_id}, session {session_id}")
             return None
 
-        state = json.loads(state_raw)
+        state = _state_from_fields(state_fields)
         logger.info(f"Retrieved conversation state for user {user_id}, session {session_id}: {state.get('action', 'unknown')}")
         return state
 
@@ -103,97 +298,111 @@ def get_conversation_state(user_id: str, session_id: str) -> Optional[Dict[str,
         logger.error(f"Error getting conversation state for {user_id}, session {session_id}: {e}")
         return None
 
-def clear_conversation_state(user_id: str, session_id: str) -> bool:
+async def clear_conversation_state(user_id: str, session_id: str) -> bool:
     """Clear conversation state from Redis with session ID"""
     try:
         key = get_conversation_key(user_id, session_id)
-        redis_client.delete(key)
+        _state_cache.pop((user_id, session_id), None)
+        await redis_client.delete(key)
         logger.info(f"Cleared conversation state for user {user_id}, session {session_id}")
         return True
     except Exception as e:
         logger.error(f"Error clearing conversation state for {user_id}, session {session_id}: {e}")
         return False
 
-def update_conversation_state(user_id: str, session_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def update_conversation_state(user_id: str, session_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """Update existing conversation state with new data"""
     try:
-        current_state = get_conversation_state(user_id, session_id) or {}
-
-        # Merge updates into current state
-        for key, value in updates.items():
-            # Deep merge for dictionaries (leave_info AND extracted_data)
-            if key in ["leave_info", "extracted_data"] and isinstance(value, dict) and key in current_state:
-                # Merge dictionaries - new values override old, but keep old values if not in new
-                current_state[key].update(value)
-                logger.debug(f"🔄 Merged {key}: {current_state[key]}")
-            else:
-                current_state[key] = value
-
-        # Save updated state
-        if save_conversation_state(user_id, session_id, current_state):
-            return current_state
-        else:
-            return None
+        key = get_conversation_key(user_id, session_id)
+
+        # Deep merge for dictionaries (leave_info AND extracted_data): new values override old,
+        # but keep old values if not in new. Merge + session touch is one transaction.
+        state_fields = await _with_hash(
+            key, lambda: _merge_state_fields(user_id, session_id, updates), _convert_legacy_state
+        )
+        _cache_state_fields(user_id, session_id, state_fields)
+        logger.info(f"Saved conversation state for user {user_id}, session {session_id}")
+        return _state_from_fields(state_fields)
 
     except Exception as e:
         logger.error(f"Error updating conversation state for {user_id}, session {session_id}: {e}")
         return None
 
-def update_session_activity(user_id: str, session_id: str) -> bool:
+async def update_session_activity(user_id: str, session_id: str) -> bool:
     """Update session's last activity timestamp"""
     try:
         sessions_key = get_user_sessions_key(user_id)
-        sessions_raw = redis_client.get(sessions_key)
-
-        if not sessions_raw:
-            return False
-
-        sessions = json.loads(sessions_raw)
-        for session in sessions:
-            if session.get("session_id") == session_id:
-                session["last_active"] = datetime.now().isoformat()
-                break
-
-        redis_client.setex(sessions_key, 86400, json.dumps(sessions))
-        return True
+        touched = await _with_hash(sessions_key, lambda: _touch_session(user_id, session_id), _convert_legacy_sessions)
+        return bool(touched)
     except Exception as e:
         logger.error(f"Error updating session activity for {user_id}, session {session_id}: {e}")
         return False
 
-def is_conversation_active(user_id: str, session_id: str) -> bool:
+async def is_conversation_active(user_id: str, session_id: str) -> bool:
     """Check if user has an active conversation in specific session"""
-    state = get_conversation_state(user_id, session_id)
+    state = await get_conversation_state(user_id, session_id)
     return state is not None and state.get("action") is not None
 
 # Backward compatibility functions (for existing code)
-def get_conversation_state_legacy(user_id: str) -> Optional[Dict[str, Any]]:
+async def get_conversation_state_legacy(user_id: str) -> Optional[Dict[str, Any]]:
     """Legacy function - gets first active session or None"""
-    sessions = get_user_sessions(user_id)
+    sessions = await get_user_sessions(user_id)
     if sessions:
         # Try to find active conversation in any session
         for session in sessions:
             session_id = session.get("session_id")
-            state = get_conversation_state(user_id, session_id)
+            state = await get_conversation_state(user_id, session_id)
             if state and state.get("action"):
                 return state
     return None
 
 # Chat history management
-def add_message_to_history(user_id: str, session_id: str, role: str, message: str) -> bool:
+# Each session's history is a Redis list of orjson messages: appends are O(1) RPUSH
+# instead of rewriting the whole conversation, capped at CHAT_HISTORY_MAX_MESSAGES.
+CHAT_HISTORY_MAX_MESSAGES = 200
+CHAT_HISTORY_SECONDS = 86400  # 24 hours
+
+
+async def _convert_legacy_history(history_key: str) -> None:
+    """Rewrite a history stored as one JSON array (older format) as a Redis list"""
+    history_raw = await redis_client.get(history_key)
+    history = orjson.loads(history_raw) if history_raw else []
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(history_key)
+        if history:
+            pipe.rpush(history_key, *[_dumps(message_obj) for message_obj in history[-CHAT_HISTORY_MAX_MESSAGES:]])
+            pipe.expire(history_key, CHAT_HISTORY_SECONDS)
+        await pipe.execute()
+    logger.info(f"Converted chat history {history_key} to a Redis list ({len(history)} messages)")
+
+
+async def _append_history(history_key: str, message_raw: bytes) -> None:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.rpush(history_key, message_raw)
+        pipe.ltrim(history_key, -CHAT_HISTORY_MAX_MESSAGES, -1)
+        pipe.expire(history_key, CHAT_HISTORY_SECONDS)
+        await pipe.execute()
+
+
+async def add_message_to_history(user_id: str, session_id: str, role: str, message: str) -> bool:
     """Add a message to chat history"""
     try:
         history_key = get_chat_history_key(user_id, session_id)
-        history_raw = redis_client.get(history_key)
-        history = json.loads(history_raw) if history_raw else []
 
         message_obj = {
             "role": role,  # 'user' or 'assistant'
             "message": message,
             "timestamp": datetime.now().isoformat()
         }
+        message_raw = _dumps(message_obj)
 
-        history.append(message_obj)
-        redis_client.setex(history_key, 86400, json.dumps(history))  # 24 hours
+        try:
+            await _append_history(history_key, message_raw)
+        except ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            await _convert_legacy_history(history_key)
+            await _append_history(history_key, message_raw)
 
         logger.info(f"Added {role} message to history for user {user_id}, session {session_id}")
         return True
@@ -201,19 +410,25 @@ def add_message_to_history(user_id: str, session_id: str, role: str, message: st
         logger.error(f"Error adding message to history for {user_id}, session {session_id}: {e}")
         return False
 
-def get_chat_history(user_id: str, session_id: str) -> List[Dict[str, Any]]:
+async def get_chat_history(user_id: str, session_id: str) -> List[Dict[str, Any]]:
     """Get chat history for a session"""
     try:
         history_key = get_chat_history_key(user_id, session_id)
-        history_raw = redis_client.get(history_key)
+        try:
+            history_raw = await redis_client.lrange(history_key, 0, -1)
+        except ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            await _convert_legacy_history(history_key)
+            history_raw = await redis_client.lrange(history_key, 0, -1)
 
         if not history_raw:
             logger.info(f"No chat history found for user {user_id}, session {session_id}")
             return []
 
-        history = json.loads(history_raw)
+        history = [orjson.loads(message_raw) for message_raw in history_raw]
         logger.info(f"Retrieved {len(history)} messages from history for user {user_id}, session {session_id}")
         return history
     except Exception as e:
         logger.error(f"Error getting chat history for {user_id}, session {session_id}: {e}")
-        return []
\ No newline at end of file
+        return []
@@ -7,8 +7,41 @@ import logging
 import json
 from typing import Dict, Any, Optional
 
+from services.ai.chat import get_chat_response
+from services.ai.embeddings import build_ann_index, get_embedding_model, similarity_search, stack_embeddings, stack_quantized
+from storage.embedding_storage import get_policy_embeddings
+
 logger = logging.getLogger(__name__)
 
+# Stacked policy embedding matrices, rebuilt only when the user's stored data changes
+POLICY_MATRIX_CACHE_MAX_USERS = 1000
+_policy_matrix_cache: Dict[str, Dict[str, Any]] = {}  # {user_id: {"fingerprint": int, "matrix": (matrix, names, ann_index)}}
+
+
+async def _get_policy_matrix(user_id: str, fingerprint: int, user_data: Dict):
+    """Return the cached (matrix, names, ann_index) for a user, building it on first use or after a refresh"""
+    cache_entry = _policy_matrix_cache.get(user_id)
+    if cache_entry and cache_entry["fingerprint"] == fingerprint:
+        return cache_entry["matrix"]
+
+    if "policy_embeddings" in user_data:
+        # Sessions stored before embeddings moved to their own key (plain floats before int8 had no scales)
+        if not user_data["policy_embeddings"]:
+            return {}
+        stacked, names = stack_embeddings(user_data["policy_embeddings"], user_data.get("policy_embedding_scales"))
+    else:
+        stored = await get_policy_embeddings(user_id)
+        if stored is None:
+            return {}
+        vectors, scales, names = stored
+        stacked = stack_quantized(vectors, scales)
+
+    matrix = (stacked, names, build_ann_index(stacked))
+    if user_id not in _policy_matrix_cache and len(_policy_matrix_cache) >= POLICY_MATRIX_CACHE_MAX_USERS:
+        _policy_matrix_cache.pop(next(iter(_policy_matrix_cache)))
+    _policy_matrix_cache[user_id] = {"fingerprint": fingerprint, "matrix": matrix}
+    return matrix
+
 # ===================== SIMPLE OPERATION HANDLERS =====================
 
 async def try_multi_operation_system(redis_client, user_id: str, user_prompt: str, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
@@ -46,24 +79,34 @@ async def try_multi_operation_system(redis_client, user_id: str, user_prompt: st
 # Use: services/operations/ai_handler.handle_hrms_with_ai
 
 
-async def handle_regular_chat(redis_client, user_id: str, user_prompt: str, user_role: str, session_id: Optional[str]) -> Dict[str, Any]:
-    """Handle regular chat with policy search and return relevant document links"""
+async def handle_regular_chat(redis_client, user_id: str, user_prompt: str, user_role: str, session_id: Optional[str],
+                              user_data_raw: Optional[str] = None, user_data: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Handle regular chat with policy search and return relevant document links
+
+    Pass the user data the caller already loaded (raw + parsed) to skip re-reading it from Redis.
+    """
     try:
-        # Get user data from Redis
-        user_data_raw = redis_client.get(user_id)
+        if user_data_raw is None:
+            # Get user data from Redis
+            user_data_raw = redis_client.get(user_id)
+            user_data = None
         if not user_data_raw:
             error_response = {"response": "User session expired. Please login again."}
             if session_id:
                 error_response["sessionId"] = session_id
             return error_response
 
-        user_data = json.loads(user_data_raw)
+        if user_data is None:
+            user_data = json.loads(user_data_raw)
         user_policies = user_data["user_policies"]
-        user_embeddings = user_data["policy_embeddings"]
         user_info = user_data["user_info"]
 
+        # Stacked embedding matrix is reused until login stores new policy data
+        policy_matrix = await _get_policy_matrix(user_id, hash(user_data_raw), user_data)
+
         # Generate response using policy search (now returns response + relevant policies)
-        response, relevant_policies = await generate_policy_response(user_prompt, user_policies, user_embeddings, user_info, user_role)
+        response, relevant_policies = await generate_policy_response(user_prompt, user_policies, policy_matrix, user_info, user_role)
 
         response_data = {"response": response}
 
@@ -95,19 +138,11 @@ async def generate_policy_response(user_prompt: str, user_policies: Dict, user_e
         - relevant_policies_list: List of dicts with policy info for downloading
     """
     try:
-        import numpy as np
-        from services.ai.embeddings import similarity_search
-        from services.ai.chat import get_chat_response
-        from sentence_transformers import SentenceTransformer
-
-        # Load embedding model
-        embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # Shared embedding model (loaded once per process)
+        embedding_model = get_embedding_model()
 
-        # Convert embeddings
-        embeddings_numpy = {k: np.array(v) for k, v in user_embeddings.items()}
-
-        # Find relevant policies
-        most_relevant_policy = similarity_search(embedding_model, user_prompt, embeddings_numpy)
+        # Find relevant policies (user_embeddings may be a {name: vector} dict or the cached stacked matrix)
+        most_relevant_policy = similarity_search(embedding_model, user_prompt, user_embeddings)
 
         # Build prompt
         enriched_prompt = f"EMPLOYEE DETAILS: {user_info}\n\nQUERY: {user_prompt}\n"
@@ -148,10 +183,13 @@ async def generate_policy_response(user_prompt: str, user_policies: Dict, user_e
 
 
 async def handle_user_operation(redis_client, user_id: str, user_prompt: str, user_role: str,
-                               session_id: Optional[str] = None, conversation_context: Optional[Dict] = None) -> Dict[str, Any]:
+                               session_id: Optional[str] = None, conversation_context: Optional[Dict] = None,
+                               user_data_raw: Optional[str] = None, user_data: Optional[Dict] = None) -> Dict[str, Any]:
     """
     Simple main function to handle any user operation
     Now powered by AI for intelligent intent detection and extraction
+
+    user_data_raw/user_data: the user's session data if the caller already loaded it (reused by regular chat)
     """
     try:
         logger.info(f"Handling operation for user {user_id} with role {user_role}")
@@ -172,7 +210,8 @@ async def handle_user_operation(redis_client, user_id: str, user_prompt: str, us
             return result
 
         # Step 3: Regular chat with policy search (for policy questions)
-        return await handle_regular_chat(redis_client, user_id, user_prompt, user_role, session_id)
+        return await handle_regular_chat(redis_client, user_id, user_prompt, user_role, session_id,
+                                         user_data_raw=user_data_raw, user_data=user_data)
 
     except Exception as e:
         logger.error(f"Error in handle_user_operation: {e}")
@@ -8,7 +8,9 @@ Response: Validates, applies leave, and confirms with details
 
 import logging
 from typing import Dict, Any, Optional
-from .shared import RESPONSE_TEMPLATES
+
+from services.operations.conversation_state import clear_conversation_state
+from .shared import ask_user, format_error_generic, format_leave_success, invalidate_leave_types
 
 logger = logging.getLogger(__name__)
 
@@ -63,69 +65,52 @@ async def handle_apply_leave(
     Returns:
         Response dictionary with leave application result
     """
-    from services.operations.conversation_state import clear_conversation_state
-
     # If not ready, ask question (state already saved in handle_hrms_with_ai)
     if not ready_to_execute:
-        logger.info(f"⏳ Leave info incomplete, asking user")
-        return {
-            "response": next_question,
-            "sessionId": session_id
-        }
+        logger.info("⏳ Leave info incomplete, asking user")
+        return ask_user(next_question, session_id)
 
-    # Ready to execute - first validate
-    logger.info(f"🔍 Validating leave request for user {user_id}")
+    # Ready to execute - validate and apply in one call
+    # (single round-trip when the server has validate_and_apply_leave, see MCP_COMBINED_LEAVE_APPLY)
+    logger.info("🔍 Validating and applying leave for user %s", user_id)
 
-    validation_result = await mcp_client.call_tool("validate_leave_request", {
-        "user_id": user_id,
-        "leave_type_name": extracted_data["leave_type"],
-        "from_date": extracted_data["from_date"],
-        "to_date": extracted_data["to_date"]
-    })
+    combined_result = await mcp_client.validate_and_apply_leave(
+        user_id=user_id,
+        leave_type_name=extracted_data["leave_type"],
+        from_date=extracted_data["from_date"],
+        to_date=extracted_data["to_date"],
+        reasons=extracted_data.get("reason", f"{extracted_data['leave_type']} application")
+    )
 
     # Validation failed - show errors (context already saved)
-    if not validation_result.get("is_valid", False):
-        errors = validation_result.get("errors", [])
-        logger.warning(f"❌ Validation failed: {errors}")
+    if not combined_result.get("is_valid", False):
+        errors = combined_result.get("errors", [])
+        logger.warning("❌ Validation failed: %s", errors)
 
         return {
-            "response": RESPONSE_TEMPLATES["error_generic"].format(
-                message='; '.join(errors)
-            ),
+            "response": format_error_generic('; '.join(errors)),
             "sessionId": session_id
         }
 
-    # Validation passed - apply leave
-    logger.info(f"✅ Applying leave for user {user_id}")
-
-    apply_result = await mcp_client.call_tool("apply_leave", {
-        "user_id": user_id,
-        "leave_type_name": extracted_data["leave_type"],
-        "from_date": extracted_data["from_date"],
-        "to_date": extracted_data["to_date"],
-        "reasons": extracted_data.get("reason", f"{extracted_data['leave_type']} application")
-    })
+    apply_result = combined_result.get("apply_result") or {}
+    logger.info("✅ Leave request processed for user %s", user_id)
 
     # Clear conversation state (done!)
-    clear_conversation_state(user_id, session_id or "legacy")
+    await clear_conversation_state(user_id, session_id or "legacy")
 
     # Format success/error response using templates
     if apply_result.get("status") == "success":
-        days = apply_result.get("days_requested", 1)
-        response = RESPONSE_TEMPLATES["leave_success"]
-        response += RESPONSE_TEMPLATES["leave_type"].format(leave_type=extracted_data['leave_type'])
-        response += RESPONSE_TEMPLATES["leave_dates"].format(
-            from_date=extracted_data['from_date'],
-            to_date=extracted_data['to_date'],
-            days=days
-        )
-        response += RESPONSE_TEMPLATES["leave_reason"].format(
-            reason=extracted_data.get('reason', 'Not specified')
+        # Leave data (with balances) changed - don't serve the cached copy next turn
+        await invalidate_leave_types(user_id)
+        response = format_leave_success(
+            extracted_data['leave_type'],
+            extracted_data['from_date'],
+            extracted_data['to_date'],
+            apply_result.get("days_requested", 1),
+            extracted_data.get('reason', 'Not specified')
         )
     else:
-        response = RESPONSE_TEMPLATES["error_generic"].format(
-            message=apply_result.get('message', 'Failed to apply leave')
-        )
+        response = format_error_generic(apply_result.get('message', 'Failed to apply leave'))
 
     return {
         "response": response,
@@ -20,10 +20,15 @@ Author: Zimyo AI Team
 
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime
+
+from services.operations.conversation_state import clear_conversation_state
+from .shared import ask_user
+from .shared_dates import format_total_hours, parse_hm_minutes, parse_ymd, pretty_day_mon_year
 
 logger = logging.getLogger(__name__)
 
+REQUIRED_FIELDS = ("date", "from_time", "to_time", "reason")
+
 
 async def handle_apply_onduty(
     user_id: str,
@@ -71,15 +76,10 @@ async def handle_apply_onduty(
         User: "WFH"
         → Response: "✅ On-duty applied successfully!"
     """
-    from .shared import RESPONSE_TEMPLATES
-
     # STEP 1: Check if ready to execute
     if not ready_to_execute:
-        logger.info(f"🔄 On-duty incomplete, asking: {next_question}")
-        return {
-            "response": next_question,
-            "sessionId": session_id
-        }
+        logger.info("🔄 On-duty incomplete, asking: %s", next_question)
+        return ask_user(next_question, session_id)
 
     # STEP 2: Validate required fields
     # Extract all required fields
@@ -89,18 +89,10 @@ async def handle_apply_onduty(
     reason = extracted_data.get("reason")
 
     # Check for missing fields
-    missing = []
-    if not date:
-        missing.append("date")
-    if not from_time:
-        missing.append("from_time")
-    if not to_time:
-        missing.append("to_time")
-    if not reason:
-        missing.append("reason")
+    missing = [field for field in REQUIRED_FIELDS if not extracted_data.get(field)]
 
     if missing:
-        logger.warning(f"❌ Missing fields: {missing}")
+        logger.warning("❌ Missing fields: %s", missing)
         return {
             "response": f"कुछ जानकारी अधूरी है। Missing information: {', '.join(missing)}",
             "sessionId": session_id
@@ -112,21 +104,27 @@ async def handle_apply_onduty(
         from_datetime = f"{date} {from_time}:00"  # Add seconds
         to_datetime = f"{date} {to_time}:00"
 
-        # Calculate total hours
-        from_dt = datetime.strptime(from_datetime, "%Y-%m-%d %H:%M:%S")
-        to_dt = datetime.strptime(to_datetime, "%Y-%m-%d %H:%M:%S")
-        duration = to_dt - from_dt
-        total_hours = f"{duration.seconds // 3600:02d}:{(duration.seconds % 3600) // 60:02d}:00"
-
-        logger.info(f"📤 Applying on-duty: {date} {from_time}-{to_time} ({total_hours})")
+        # Calculate total hours straight from the HH:MM digits
+        parse_ymd(date)
+        duration_minutes = parse_hm_minutes(to_time) - parse_hm_minutes(from_time)
 
     except ValueError as e:
-        logger.error(f"❌ Date/time parsing error: {e}")
+        logger.error("❌ Date/time parsing error: %s", e)
         return {
             "response": "तारीख या समय गलत है। Invalid date or time format.",
             "sessionId": session_id
         }
 
+    if duration_minutes < 0:
+        logger.warning("❌ On-duty end time %s is before start time %s", to_time, from_time)
+        return {
+            "response": "समाप्ति समय शुरुआत के बाद होना चाहिए। End time must be after start time.",
+            "sessionId": session_id
+        }
+
+    total_hours = format_total_hours(duration_minutes)
+    logger.info("📤 Applying on-duty: %s %s-%s (%s)", date, from_time, to_time, total_hours)
+
     # STEP 4: Apply on-duty via MCP
     try:
         result = await mcp_client.call_tool("apply_onduty", {
@@ -141,11 +139,7 @@ async def handle_apply_onduty(
         # Check if MCP client returned an error
         if isinstance(result, dict) and result.get("status") == "error":
             error_msg = result.get("message", "Unknown error")
-            logger.error(f"❌ MCP error: {error_msg}")
-
-            # Clear conversation state since request failed
-            from services.operations.conversation_state import clear_conversation_state
-            clear_conversation_state(user_id, session_id or "legacy")
+            logger.error("❌ MCP error: %s", error_msg)
 
             return {
                 "response": f"❌ कुछ गड़बड़ हो गई। Something went wrong.\n\nError: {error_msg}",
@@ -159,13 +153,8 @@ async def handle_apply_onduty(
             # SUCCESS: Format success response
             logger.info("✅ On-duty applied successfully")
 
-            # Clear conversation state since request is complete
-            from services.operations.conversation_state import clear_conversation_state
-            clear_conversation_state(user_id, session_id or "legacy")
-
             # Format date for display
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-            formatted_date = date_obj.strftime("%d %b %Y")
+            formatted_date = pretty_day_mon_year(date)
 
             response = (
                 "✅ ऑन-ड्यूटी सफलतापूर्वक लागू हो गई! On-duty applied successfully!\n\n"
@@ -182,11 +171,7 @@ async def handle_apply_onduty(
         else:
             # ERROR from API
             error_msg = result_data.get("message", "Unknown error")
-            logger.error(f"❌ On-duty application failed: {error_msg}")
-
-            # Clear conversation state since request failed
-            from services.operations.conversation_state import clear_conversation_state
-            clear_conversation_state(user_id, session_id or "legacy")
+            logger.error("❌ On-duty application failed: %s", error_msg)
 
             return {
                 "response": f"❌ ऑन-ड्यूटी लागू नहीं हो सकी। On-duty application failed.\n\nकारण। Reason: {error_msg}",
@@ -194,17 +179,17 @@ async def handle_apply_onduty(
             }
 
     except Exception as e:
-        logger.exception(f"❌ On-duty application exception: {e}")
-
-        # Clear conversation state since request failed
-        from services.operations.conversation_state import clear_conversation_state
-        clear_conversation_state(user_id, session_id or "legacy")
+        logger.exception("❌ On-duty application exception: %s", e)
 
         return {
             "response": f"❌ कुछ गड़बड़ हो गई। Something went wrong.\n\nError: {str(e)}",
             "sessionId": session_id
         }
 
+    finally:
+        # Request finished (applied, rejected or failed): clear conversation state once
+        await clear_conversation_state(user_id, session_id or "legacy")
+
 
 # ============================================================================
 # USAGE EXAMPLES (for developers)
@@ -8,8 +8,10 @@ Response: Validates, applies regularization, and confirms with details
 
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime
-from .shared import RESPONSE_TEMPLATES
+
+from services.operations.conversation_state import clear_conversation_state
+from .shared_dates import format_total_hours, parse_hm_minutes
+from .shared import ask_user, format_error_generic
 
 logger = logging.getLogger(__name__)
 
@@ -66,18 +68,13 @@ async def handle_apply_regularization(
     Returns:
         Response dictionary with regularization application result
     """
-    from services.operations.conversation_state import clear_conversation_state
-
     # If not ready, ask question (state already saved in handle_hrms_with_ai)
     if not ready_to_execute:
-        logger.info(f"⏳ Regularization info incomplete, asking user")
-        return {
-            "response": next_question,
-            "sessionId": session_id
-        }
+        logger.info("⏳ Regularization info incomplete, asking user")
+        return ask_user(next_question, session_id)
 
     # Ready to execute
-    logger.info(f"✅ Applying regularization for user {user_id}")
+    logger.info("✅ Applying regularization for user %s", user_id)
 
     # Extract and format date/time
     date = extracted_data.get("date")
@@ -89,17 +86,22 @@ async def handle_apply_regularization(
     from_datetime = f"{date} {from_time}"
     to_datetime = f"{date} {to_time}"
 
-    # Calculate total hours (optional, API has default)
+    # Calculate total hours straight from the HH:MM digits (optional, API has default)
     try:
-        from_dt = datetime.strptime(from_datetime, "%Y-%m-%d %H:%M")
-        to_dt = datetime.strptime(to_datetime, "%Y-%m-%d %H:%M")
-        diff = to_dt - from_dt
-        hours = int(diff.total_seconds() // 3600)
-        minutes = int((diff.total_seconds() % 3600) // 60)
-        total_hours = f"{hours:02d}:{minutes:02d}:00"
+        duration_minutes = parse_hm_minutes(to_time) - parse_hm_minutes(from_time)
     except Exception as e:
-        logger.warning(f"Could not calculate hours: {e}, using default")
-        total_hours = "09:00:00"
+        logger.warning("Could not calculate hours: %s, using default", e)
+        duration_minutes = 9 * 60
+
+    if duration_minutes < 0:
+        logger.warning("❌ Regularization end time %s is before start time %s", to_time, from_time)
+        return {
+            "response": "समाप्ति समय शुरुआत के बाद होना चाहिए। End time must be after start time.",
+            "sessionId": session_id
+        }
+
+    hours, minutes = divmod(duration_minutes, 60)
+    total_hours = format_total_hours(duration_minutes)
 
     # Apply regularization
     result = await mcp_client.call_tool("apply_regularization", {
@@ -111,7 +113,7 @@ async def handle_apply_regularization(
     })
 
     # Clear conversation state (done!)
-    clear_conversation_state(user_id, session_id or "legacy")
+    await clear_conversation_state(user_id, session_id or "legacy")
 
     # Format response
     if result.get("status") == "success":
@@ -120,9 +122,7 @@ async def handle_apply_regularization(
         response += f"🕐 Time: {from_time} to {to_time} ({hours}h {minutes}m)\n"
         response += f"📝 Reason: {reason}"
     else:
-        response = RESPONSE_TEMPLATES["error_generic"].format(
-            message=result.get('message', 'Failed to apply regularization')
-        )
+        response = format_error_generic(result.get('message', 'Failed to apply regularization'))
 
     return {
         "response": response,
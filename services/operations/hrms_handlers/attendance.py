@@ -8,10 +8,14 @@ Response: Marks attendance and confirms action with timestamp
 
 import logging
 from typing import Dict, Any, Optional
-from .shared import RESPONSE_TEMPLATES
+
+from services.operations.conversation_state import clear_conversation_state
+from .shared import RESPONSE_TEMPLATES, format_attendance_success, ask_user
 
 logger = logging.getLogger(__name__)
 
+_ERROR_API = RESPONSE_TEMPLATES["error_api"]
+
 
 async def handle_attendance(
     user_id: str,
@@ -42,17 +46,12 @@ async def handle_attendance(
     Returns:
         Response dictionary with attendance confirmation
     """
-    from services.operations.conversation_state import clear_conversation_state
-
     if not ready_to_execute:
-        logger.info(f"⏳ Attendance info incomplete, asking user")
-        return {
-            "response": next_question,
-            "sessionId": session_id
-        }
+        logger.info("⏳ Attendance info incomplete, asking user")
+        return ask_user(next_question, session_id)
 
     # Ready to execute - mark attendance
-    logger.info(f"✅ Marking attendance for user {user_id}")
+    logger.info("✅ Marking attendance for user %s", user_id)
 
     location = extracted_data.get("location", "")
     result = await mcp_client.call_tool("mark_attendance", {
@@ -60,18 +59,17 @@ async def handle_attendance(
         "location": location
     })
 
-    clear_conversation_state(user_id, session_id or "legacy")
+    await clear_conversation_state(user_id, session_id or "legacy")
 
     # Format response
     if result.get("status") == "success":
-        response = RESPONSE_TEMPLATES["attendance_success"].format(
-            action=result.get("action", "").upper(),
-            time=result.get("time", "")
+        response = format_attendance_success(
+            result.get("action", "").upper(),
+            result.get("time", ""),
+            location
         )
-        if location:
-            response += RESPONSE_TEMPLATES["attendance_location"].format(location=location)
     else:
-        response = RESPONSE_TEMPLATES["error_api"].format(
+        response = _ERROR_API.format(
             resource="attendance",
             message=result.get('message', 'Failed to mark attendance')
         )
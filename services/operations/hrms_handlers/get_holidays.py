@@ -14,13 +14,26 @@ This is a simple read-only query with no complex flow.
 Author: Zimyo AI Team
 """
 
+import io
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from .shared_dates import WEEKDAY_NAMES, parse_ymd, pretty_day_mon_year
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=512)
+def _format_holiday_date(date_str: str) -> Optional[Tuple[str, str]]:
+    """Display date and weekday for YYYY-MM-DD, e.g. ("12 Nov 2025", "Wed"), or None if unparseable"""
+    try:
+        date_obj = parse_ymd(date_str)
+    except ValueError as e:
+        logger.warning("Date parsing error: %s", e)
+        return None
+    return pretty_day_mon_year(date_str), WEEKDAY_NAMES[date_obj.weekday()]
+
+
 async def handle_get_holidays(
     user_id: str,
     mcp_client,
@@ -58,7 +71,7 @@ async def handle_get_holidays(
         📅 26 Jan 2026 (Mon) - Republic Day"
     """
     try:
-        logger.info(f"📤 Fetching holidays for user: {user_id}")
+        logger.info("📤 Fetching holidays for user: %s", user_id)
 
         # STEP 1: Get holidays from MCP
         result = await mcp_client.call_tool("get_upcoming_holidays", {
@@ -67,28 +80,26 @@ async def handle_get_holidays(
 
         # STEP 2: Parse MCP response
         # MCP client already parses the response, so result is the actual data dict
-        import json
-
-        # Check if result is a string (error case) or dict
-        if isinstance(result, str):
-            logger.error(f"❌ MCP returned string error: {result}")
+        # (anything else is an error string)
+        if not isinstance(result, dict):
+            logger.error("❌ MCP returned string error: %s", result)
             return {
                 "response": f"❌ छुट्टियों की जानकारी नहीं मिल सकी। Could not fetch holidays.\n\nError: {result}",
                 "sessionId": session_id
             }
 
-        if isinstance(result, dict) and result.get("status") == "error":
+        status = result.get("status")
+
+        if status == "error":
             error_msg = result.get("message", "Unknown error")
-            logger.error(f"❌ MCP error: {error_msg}")
+            logger.error("❌ MCP error: %s", error_msg)
             return {
                 "response": f"❌ छुट्टियों की जानकारी नहीं मिल सकी। Could not fetch holidays.\n\nError: {error_msg}",
                 "sessionId": session_id
             }
 
-        result_data = result
-
-        if result_data.get("status") == "success":
-            holidays = result_data.get("holidays", [])
+        if status == "success":
+            holidays = result.get("holidays", [])
 
             if not holidays or len(holidays) == 0:
                 # No upcoming holidays
@@ -99,34 +110,25 @@ async def handle_get_holidays(
                 }
 
             # STEP 3: Format holidays list
-            logger.info(f"✅ Found {len(holidays)} upcoming holidays")
+            logger.info("✅ Found %s upcoming holidays", len(holidays))
 
-            response_lines = ["🎉 आगामी छुट्टियां। Upcoming Holidays:\n"]
+            # Written straight into one buffer: no per-line list to grow and join
+            buffer = io.StringIO()
+            buffer.write("🎉 आगामी छुट्टियां। Upcoming Holidays:\n")
 
             for holiday in holidays[:10]:  # Show max 10 holidays
-                # Extract holiday data
                 # API returns uppercase field names
                 name = holiday.get("NAME", "Holiday")
                 date_str = holiday.get("HOLIDAY_DATE", "")
-                holiday_type = holiday.get("HOLIDAY_TYPE_NAME", "")
-
-                # Format date for display
-                try:
-                    if date_str:
-                        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-                        formatted_date = date_obj.strftime("%d %b %Y")
-                        day_short = date_obj.strftime("%a")  # Mon, Tue, etc.
-
-                        # Format: 📅 12 Nov 2025 (Wed) - Diwali
-                        response_lines.append(f"📅 {formatted_date} ({day_short}) - {name}")
-                    else:
-                        response_lines.append(f"📅 {name}")
-                except Exception as e:
-                    logger.warning(f"Date parsing error: {e}")
-                    response_lines.append(f"📅 {name}")
-
-            # Join all lines
-            response = "\n".join(response_lines)
+
+                # Format: 📅 12 Nov 2025 (Wed) - Diwali
+                display_date = _format_holiday_date(date_str) if date_str else None
+                if display_date:
+                    buffer.write(f"\n📅 {display_date[0]} ({display_date[1]}) - {name}")
+                else:
+                    buffer.write(f"\n📅 {name}")
+
+            response = buffer.getvalue()
 
             return {
                 "response": response,
@@ -135,8 +137,8 @@ async def handle_get_holidays(
 
         else:
             # Error from API
-            error_msg = result_data.get("message", "Unknown error")
-            logger.error(f"❌ Holiday fetch failed: {error_msg}")
+            error_msg = result.get("message", "Unknown error")
+            logger.error("❌ Holiday fetch failed: %s", error_msg)
 
             return {
                 "response": f"❌ छुट्टियों की जानकारी नहीं मिल सकी। Could not fetch holiday information.\n\nकारण। Reason: {error_msg}",
@@ -144,7 +146,7 @@ async def handle_get_holidays(
             }
 
     except Exception as e:
-        logger.exception(f"❌ Holiday fetch exception: {e}")
+        logger.exception("❌ Holiday fetch exception: %s", e)
         return {
             "response": f"❌ कुछ गड़बड़ हो गई। Something went wrong.\n\nError: {str(e)}",
             "sessionId": session_id
@@ -15,13 +15,44 @@ This is a simple read-only query with no complex flow.
 Author: Zimyo AI Team
 """
 
+import io
 import logging
 from typing import Dict, Any, Optional
-from datetime import datetime
-import base64
+from datetime import datetime, timedelta
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
+_MONTH_NAMES = (
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+)
+_HEAD_FIELDS = itemgetter("head_name", "amount")
+
+# Slips for past periods never change, so their MCP results are reused. Entries
+# carry the PDF buffer, hence the small cap; the current month is never cached
+_slip_cache = {}  # {(user_id, month, year): {"data": {...}, "expires_at": datetime}}
+SLIP_CACHE_SECONDS = 24 * 3600
+SLIP_CACHE_MAX_ENTRIES = 256
+
+
+def _cache_slip(cache_key: tuple, result: Dict[str, Any]) -> None:
+    if len(_slip_cache) >= SLIP_CACHE_MAX_ENTRIES:
+        # Evict the oldest entry (dicts keep insertion order)
+        _slip_cache.pop(next(iter(_slip_cache)))
+    _slip_cache[cache_key] = {
+        "data": result,
+        "expires_at": datetime.now() + timedelta(seconds=SLIP_CACHE_SECONDS)
+    }
+
+
+def _format_rupees(amount) -> str:
+    """Amount as ₹ with thousands separators and two decimals"""
+    if isinstance(amount, int):
+        # Whole rupees (the usual case) skip the float formatter
+        return f"₹{amount:,}.00"
+    return f"₹{amount:,.2f}"
+
 
 async def handle_get_salary_slip(
     user_id: str,
@@ -81,17 +112,28 @@ async def handle_get_salary_slip(
 
         logger.info(f"📤 Fetching salary slip for user: {user_id}, Month: {month}, Year: {year}")
 
-        # STEP 2: Get salary slip from MCP
-        result = await mcp_client.call_tool("get_salary_slip", {
-            "user_id": user_id,
-            "month": month,
-            "year": year
-        })
+        # STEP 2: Get salary slip (from cache for past periods, otherwise MCP)
+        cache_key = (user_id, month, year)
+        # The model may hand back month/year as text - only cache well-formed periods
+        is_past_period = (
+            isinstance(month, int) and isinstance(year, int)
+            and (year, month) < (current_date.year, current_date.month)
+        )
+        cache_entry = _slip_cache.get(cache_key) if is_past_period else None
+        if cache_entry and current_date < cache_entry["expires_at"]:
+            logger.info(f"✅ Using cached salary slip for {user_id} ({month}/{year})")
+            result = cache_entry["data"]
+        else:
+            result = await mcp_client.call_tool("get_salary_slip", {
+                "user_id": user_id,
+                "month": month,
+                "year": year
+            })
+            if is_past_period and isinstance(result, dict) and result.get("status") == "success":
+                _cache_slip(cache_key, result)
 
         # STEP 3: Parse MCP response
         # MCP client already parses the response, so result is the actual data dict
-        import json
-
         # Check if result is a string (error case) or dict
         if isinstance(result, str):
             logger.error(f"❌ MCP returned string error: {result}")
@@ -116,58 +158,62 @@ async def handle_get_salary_slip(
 
             # STEP 4: Format salary slip details
             logger.info(f"✅ Salary slip fetched successfully")
-            logger.debug(f"📦 API Response keys: {list(result_data.keys())}")
-            logger.debug(f"📦 Salary slip buffer present: {bool(salary_slip_buffer)}")
-            logger.debug(f"📦 Salary slip buffer length: {len(salary_slip_buffer) if salary_slip_buffer else 0}")
+            if logger.isEnabledFor(logging.DEBUG):
+                # Diagnostics only - skip building them (and touching the PDF buffer) otherwise
+                logger.debug(f"📦 API Response keys: {list(result_data.keys())}")
+                logger.debug(f"📦 Salary slip buffer length: {len(salary_slip_buffer) if salary_slip_buffer else 0}")
 
             # Get month name
             month_name = salary_details.get("month_name", "")
             if not month_name:
-                month_names = [
-                    "January", "February", "March", "April", "May", "June",
-                    "July", "August", "September", "October", "November", "December"
-                ]
-                month_name = month_names[month - 1] if 1 <= month <= 12 else str(month)
+                month_name = _MONTH_NAMES[month - 1] if 1 <= month <= 12 else str(month)
 
-            response_lines = [f"💰 वेतन पर्ची। Salary Slip - {month_name} {year}\\n"]
+            # Lines are separated by a literal "\\n" (what the chat frontend renders)
+            buf = io.StringIO()
+            buf.write(f"💰 वेतन पर्ची। Salary Slip - {month_name} {year}\\n")
 
             # Add salary details
-            response_lines.append("📊 विवरण। Details:")
+            buf.write("\\n📊 विवरण। Details:")
 
             gross_salary = salary_details.get("gross_salary", 0)
             net_salary = salary_details.get("net_salary", 0)
             deductions = salary_details.get("deductions", 0)
             ctc = salary_details.get("ctc", 0)
 
-            # Format amounts with Indian numbering system
-            response_lines.append(f"• सकल वेतन। Gross Salary: ₹{gross_salary:,.2f}")
-            response_lines.append(f"• शुद्ध वेतन। Net Salary: ₹{net_salary:,.2f}")
-            response_lines.append(f"• कटौती। Deductions: ₹{deductions:,.2f}")
-            response_lines.append(f"• CTC: ₹{ctc:,.2f}")
+            # Format amounts with Indian numbering system - rows the API left at 0 are skipped
+            if gross_salary:
+                buf.write(f"\\n• सकल वेतन। Gross Salary: {_format_rupees(gross_salary)}")
+            if net_salary:
+                buf.write(f"\\n• शुद्ध वेतन। Net Salary: {_format_rupees(net_salary)}")
+            if deductions:
+                buf.write(f"\\n• कटौती। Deductions: {_format_rupees(deductions)}")
+            if ctc:
+                buf.write(f"\\n• CTC: {_format_rupees(ctc)}")
 
             # Add head-wise breakdown if available
             head_details = salary_details.get("head_details", [])
-            if head_details and len(head_details) > 0:
-                response_lines.append("\\n💼 विवरण। Breakdown:")
-
-                for head in head_details[:10]:  # Show max 10 items
-                    head_name = head.get("head_name", "")
-                    amount = head.get("amount", 0)
-
-                    if head_name and amount:
-                        response_lines.append(f"  • {head_name}: ₹{amount:,.2f}")
+            if head_details:
+                buf.write("\\n\\n💼 विवरण। Breakdown:")
+                # Show max 10 items
+                heads = (
+                    _HEAD_FIELDS(head) for head in head_details[:10]
+                    if "head_name" in head and "amount" in head
+                )
+                buf.write("".join(
+                    f"\\n  • {head_name}: {_format_rupees(amount)}"
+                    for head_name, amount in heads
+                    if head_name and amount
+                ))
 
             # Add download link
             if salary_slip_buffer:
-                # Create a data URL for the PDF
-                response_lines.append(f"\\n📥 डाउनलोड करें। Download:")
-                response_lines.append(f"PDF available for download (base64 encoded)")
-                response_lines.append(f"\\n[Note: PDF buffer available. Implement download mechanism in frontend.]")
+                buf.write("\\n\\n📥 डाउनलोड करें। Download:")
+                buf.write("\\nPDF available for download (base64 encoded)")
+                buf.write("\\n\\n[Note: PDF buffer available. Implement download mechanism in frontend.]")
             else:
-                response_lines.append(f"\\n⚠️ PDF डाउनलोड उपलब्ध नहीं है। PDF download not available.")
+                buf.write("\\n\\n⚠️ PDF डाउनलोड उपलब्ध नहीं है। PDF download not available.")
 
-            # Join all lines
-            response = "\\n".join(response_lines)
+            response = buf.getvalue()
 
             return {
                 "response": response,
@@ -6,12 +6,20 @@ User asks: "what is my leave balance"
 Response: Shows list of all leave types with remaining days
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, Optional
-from .shared import RESPONSE_TEMPLATES
+from .shared import RESPONSE_TEMPLATES, get_leave_types_result_cached
 
 logger = logging.getLogger(__name__)
 
+_ERROR_API = RESPONSE_TEMPLATES["error_api"]
+_BALANCE_EMPTY = RESPONSE_TEMPLATES["balance_empty"]
+_BALANCE_HEADER = RESPONSE_TEMPLATES["balance_header"]
+# "• {leave_type}: {days} days" split around its fields so each row is a single f-string
+_BALANCE_ITEM_PREFIX, _BALANCE_ITEM_REST = RESPONSE_TEMPLATES["balance_item"].split("{leave_type}")
+_BALANCE_ITEM_MIDDLE, _BALANCE_ITEM_SUFFIX = _BALANCE_ITEM_REST.split("{days}")
+
 
 async def handle_leave_balance(
     user_id: str,
@@ -40,28 +48,25 @@ async def handle_leave_balance(
     """
     logger.info(f"💼 Fetching leave balance for user {user_id}")
 
-    # Get leave types first (for validation)
-    policy_result = await mcp_client.call_tool("get_leave_types", {
-        "user_id": user_id
-    })
+    # Leave types (for validation) and the actual balance are independent - fetch both at once
+    # (leave types come from the shared cache, so after warm-up only the balance hits MCP)
+    policy_result, balance_result = await asyncio.gather(
+        get_leave_types_result_cached(user_id, mcp_client),
+        mcp_client.call_tool("get_leave_balance", {"user_id": user_id})
+    )
 
     if policy_result.get("status") != "success":
         return {
-            "response": RESPONSE_TEMPLATES["error_api"].format(
+            "response": _ERROR_API.format(
                 resource="leave information",
                 message=policy_result.get('message', 'Unknown error')
             ),
             "sessionId": session_id
         }
 
-    # Get actual balance
-    balance_result = await mcp_client.call_tool("get_leave_balance", {
-        "user_id": user_id
-    })
-
     if balance_result.get("status") != "success":
         return {
-            "response": RESPONSE_TEMPLATES["error_api"].format(
+            "response": _ERROR_API.format(
                 resource="leave balance",
                 message=balance_result.get('message', 'Unknown error')
             ),
@@ -73,17 +78,15 @@ async def handle_leave_balance(
 
     if not leave_balance:
         return {
-            "response": RESPONSE_TEMPLATES["balance_empty"],
+            "response": _BALANCE_EMPTY,
             "sessionId": session_id
         }
 
     # Build formatted list using template
-    balance_lines = [
-        RESPONSE_TEMPLATES["balance_item"].format(leave_type=lt, days=d)
+    response = _BALANCE_HEADER + "\n".join(
+        f"{_BALANCE_ITEM_PREFIX}{lt}{_BALANCE_ITEM_MIDDLE}{d}{_BALANCE_ITEM_SUFFIX}"
         for lt, d in leave_balance.items()
-    ]
-
-    response = RESPONSE_TEMPLATES["balance_header"] + "\n".join(balance_lines)
+    )
 
     return {
         "response": response,
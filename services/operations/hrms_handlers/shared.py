@@ -7,23 +7,140 @@ Contains:
 - Common helper functions
 """
 
+import asyncio
+import functools
 import logging
+import types
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
+import orjson
+
+from services.operations.conversation_state import redis_client
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # CACHING - Avoid repeated MCP calls for leave types
 # ============================================================================
+# Two tiers: a short process-local cache in front of a Redis copy shared by
+# all workers (and kept across restarts). This is the only cache of the
+# get_leave_types result (leave types + balance); every path that applies a
+# leave calls invalidate_leave_types() afterwards.
+
+_leave_types_cache = {}  # {user_id: {"data": {...}, "expires_at": datetime}}
+CACHE_DURATION_MINUTES = 30  # Shared Redis copy
+LOCAL_CACHE_SECONDS = 30  # Process-local copy
+LOCAL_CACHE_MAX_USERS = 10000  # Bound on the process-local copy
+LEAVE_TYPES_LOCK_SECONDS = 10
+LEAVE_TYPES_LOCK_WAIT_SECONDS = 2.0
+
+
+def _leave_types_key(user_id: str) -> str:
+    return f"leave_types_result:{user_id}"
+
+
+def _cache_leave_types_locally(user_id: str, result: Dict[str, Any]) -> None:
+    if user_id not in _leave_types_cache and len(_leave_types_cache) >= LOCAL_CACHE_MAX_USERS:
+        # Full: sweep expired entries, then fall back to evicting the oldest insert
+        now = datetime.now()
+        for expired_user_id in [uid for uid, entry in _leave_types_cache.items() if now >= entry["expires_at"]]:
+            del _leave_types_cache[expired_user_id]
+        if len(_leave_types_cache) >= LOCAL_CACHE_MAX_USERS:
+            _leave_types_cache.pop(next(iter(_leave_types_cache)))
+    _leave_types_cache[user_id] = {
+        "data": result,
+        "expires_at": datetime.now() + timedelta(seconds=LOCAL_CACHE_SECONDS)
+    }
+
+
+async def _get_shared_leave_types(user_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        cached_raw = await redis_client.get(_leave_types_key(user_id))
+        return orjson.loads(cached_raw) if cached_raw else None
+    except Exception as e:
+        logger.warning(f"⚠️ Leave types cache read failed for {user_id}: {e}")
+        return None
+
+
+async def invalidate_leave_types(user_id: str) -> None:
+    """Drop both cached copies after a write that changes the user's leave data (e.g. a leave applied)"""
+    _leave_types_cache.pop(user_id, None)
+    try:
+        await redis_client.delete(_leave_types_key(user_id))
+    except Exception as e:
+        logger.warning(f"⚠️ Leave types cache invalidation failed for {user_id}: {e}")
+
+
+async def get_leave_types_result_cached(user_id: str, mcp_client) -> Dict[str, Any]:
+    """
+    Get the get_leave_types tool result (leave types + balance) with caching
+    (30 seconds in-process, 30 minutes in Redis).
 
-_leave_types_cache = {}  # {user_id: {"data": [...], "expires_at": datetime}}
-CACHE_DURATION_MINUTES = 30  # Cache for 30 minutes
+    Args:
+        user_id: Employee ID
+        mcp_client: MCP client instance (anything with call_tool)
+
+    Returns:
+        The tool result; errors are returned as-is and never cached
+    """
+    # Tier 1: process-local
+    cache_entry = _leave_types_cache.get(user_id)
+    if cache_entry and datetime.now() < cache_entry["expires_at"]:
+        logger.debug(f"📦 Using cached leave types for {user_id}")
+        return cache_entry["data"]
+
+    # Tier 2: Redis (shared across workers)
+    result = await _get_shared_leave_types(user_id)
+    if result is not None:
+        logger.debug(f"📦 Using Redis-cached leave types for {user_id}")
+        _cache_leave_types_locally(user_id, result)
+        return result
+
+    # Stampede protection: one request fetches, concurrent misses wait for its result
+    lock_key = f"leave_types_lock:{user_id}"
+    try:
+        has_lock = bool(await redis_client.set(lock_key, b"1", nx=True, ex=LEAVE_TYPES_LOCK_SECONDS))
+    except Exception as e:
+        logger.warning(f"⚠️ Leave types lock failed for {user_id}: {e}")
+        has_lock = False
+        lock_key = None  # Redis unavailable - just fetch
+
+    if lock_key and not has_lock:
+        deadline = datetime.now() + timedelta(seconds=LEAVE_TYPES_LOCK_WAIT_SECONDS)
+        while datetime.now() < deadline:
+            await asyncio.sleep(0.05)
+            result = await _get_shared_leave_types(user_id)
+            if result is not None:
+                _cache_leave_types_locally(user_id, result)
+                return result
+
+    try:
+        # Cache miss - fetch from MCP
+        logger.debug(f"🔄 Fetching leave types from MCP for {user_id}")
+        result = await mcp_client.call_tool("get_leave_types", {"user_id": user_id})
+
+        # Only cache successful responses so errors are retried on the next turn
+        if result.get("status") == "success":
+            # Update both tiers
+            _cache_leave_types_locally(user_id, result)
+            try:
+                await redis_client.setex(_leave_types_key(user_id), CACHE_DURATION_MINUTES * 60, orjson.dumps(result, default=str))
+            except Exception as e:
+                logger.warning(f"⚠️ Leave types cache write failed for {user_id}: {e}")
+
+        return result
+    finally:
+        if has_lock:
+            try:
+                await redis_client.delete(lock_key)
+            except Exception:
+                pass
 
 
 async def get_leave_types_cached(user_id: str, mcp_client) -> list:
     """
-    Get leave types with caching (30 minutes).
+    Get leave types with caching (see get_leave_types_result_cached).
 
     Args:
         user_id: Employee ID
@@ -32,38 +149,18 @@ async def get_leave_types_cached(user_id: str, mcp_client) -> list:
     Returns:
         List of leave types or empty list if error
     """
-    now = datetime.now()
-
-    # Check cache first
-    if user_id in _leave_types_cache:
-        cache_entry = _leave_types_cache[user_id]
-        if now < cache_entry["expires_at"]:
-            logger.debug(f"📦 Using cached leave types for {user_id}")
-            return cache_entry["data"]
-
-    # Cache miss - fetch from MCP
-    logger.debug(f"🔄 Fetching leave types from MCP for {user_id}")
-    result = await mcp_client.call_tool("get_leave_types", {"user_id": user_id})
-
+    result = await get_leave_types_result_cached(user_id, mcp_client)
     if result.get("status") == "success":
-        leave_types = result.get("leave_types", [])
-
-        # Update cache
-        _leave_types_cache[user_id] = {
-            "data": leave_types,
-            "expires_at": now + timedelta(minutes=CACHE_DURATION_MINUTES)
-        }
-
-        return leave_types
-
+        return result.get("leave_types", [])
     return []
 
 
 # ============================================================================
 # RESPONSE TEMPLATES - Pre-formatted strings
 # ============================================================================
+# Read-only; handler modules bind the templates they use to module constants.
 
-RESPONSE_TEMPLATES = {
+RESPONSE_TEMPLATES = types.MappingProxyType({
     "balance_header": "📊 आपका वर्तमान छुट्टी शेष। Your current leave balance:\n",
     "balance_item": "• {leave_type}: {days} days",
     "balance_empty": "❌ No leave balance information found.",
@@ -85,4 +182,49 @@ RESPONSE_TEMPLATES = {
     "question_dates": "कब से कब तक? 📅 Which dates?",
     "question_reason": "छुट्टी का कारण? 📝 Reason for leave?",
     "question_action": "क्या करना है? What would you like to do? (check-in / check-out)",
-}
+})
+
+# Single-field templates pre-split around their placeholder: filled by concatenation, no format() parse
+ERROR_GENERIC_PREFIX, ERROR_GENERIC_SUFFIX = RESPONSE_TEMPLATES["error_generic"].split("{message}")
+_ATTENDANCE_PREFIX, _ATTENDANCE_REST = RESPONSE_TEMPLATES["attendance_success"].split("{action}")
+_ATTENDANCE_MIDDLE, _ATTENDANCE_SUFFIX = _ATTENDANCE_REST.split("{time}")
+
+
+def format_error_generic(message) -> str:
+    """RESPONSE_TEMPLATES["error_generic"] filled with message"""
+    return ERROR_GENERIC_PREFIX + str(message) + ERROR_GENERIC_SUFFIX
+
+
+# Whole leave confirmation as one format string (one format pass per response)
+LEAVE_SUCCESS_FMT = (
+    RESPONSE_TEMPLATES["leave_success"]
+    + RESPONSE_TEMPLATES["leave_type"]
+    + RESPONSE_TEMPLATES["leave_dates"]
+    + RESPONSE_TEMPLATES["leave_reason"]
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _leave_success_fmt_for(leave_type: str) -> str:
+    """LEAVE_SUCCESS_FMT with leave_type already inlined (braces escaped), leaving only dates/days/reason"""
+    return LEAVE_SUCCESS_FMT.replace("{leave_type}", str(leave_type).replace("{", "{{").replace("}", "}}"))
+
+
+def format_leave_success(leave_type: str, from_date: str, to_date: str, days, reason: str) -> str:
+    """Leave-applied confirmation, from the per-leave-type template"""
+    return _leave_success_fmt_for(leave_type).format(
+        from_date=from_date, to_date=to_date, days=days, reason=reason
+    )
+
+
+def format_attendance_success(action: str, time: str, location: str = "") -> str:
+    """Attendance-marked confirmation, with the location line when one was given"""
+    response = _ATTENDANCE_PREFIX + str(action) + _ATTENDANCE_MIDDLE + str(time) + _ATTENDANCE_SUFFIX
+    if location:
+        response += RESPONSE_TEMPLATES["attendance_location"].format(location=location)
+    return response
+
+
+def ask_user(next_question: str, session_id: Optional[str]) -> Dict[str, Any]:
+    """Response asking the user for the next missing detail (every handler's not-ready branch)"""
+    return {"response": next_question, "sessionId": session_id}
@@ -0,0 +1,74 @@
+"""
+Date parsing helpers for HRMS handlers
+
+Dates from the extractor and the HRMS APIs are fixed-width ("YYYY-MM-DD",
+"HH:MM"), so these slice the digits directly instead of running strptime's
+format parser on every request. Anything that isn't the exact shape falls back
+to strptime, which keeps its validation and ValueError behaviour.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+
+# C-locale names, as strftime("%b") / ("%a") give
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def _is_fixed_width(value: str, separators: dict) -> bool:
+    """Separators at their positions and ASCII digits everywhere else"""
+    return all(
+        char == separators[index] if index in separators else char in "0123456789"
+        for index, char in enumerate(value)
+    )
+
+
+_YMD_SEPARATORS = {4: "-", 7: "-"}
+_YMD_HM_SEPARATORS = {**_YMD_SEPARATORS, 10: " ", 13: ":"}
+_YMD_HMS_SEPARATORS = {**_YMD_HM_SEPARATORS, 16: ":"}
+
+
+def parse_ymd(value: str) -> datetime:
+    """Parse "YYYY-MM-DD" (midnight)"""
+    if len(value) == 10 and _is_fixed_width(value, _YMD_SEPARATORS):
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]))
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def parse_ymd_hm(value: str) -> datetime:
+    """Parse "YYYY-MM-DD HH:MM" """
+    if len(value) == 16 and _is_fixed_width(value, _YMD_HM_SEPARATORS):
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]))
+    return datetime.strptime(value, "%Y-%m-%d %H:%M")
+
+
+def parse_ymd_hms(value: str) -> datetime:
+    """Parse "YYYY-MM-DD HH:MM:SS" """
+    if len(value) == 19 and _is_fixed_width(value, _YMD_HMS_SEPARATORS):
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+
+
+def parse_hm_minutes(value: str) -> int:
+    """Minutes since midnight for "HH:MM" (or "H:MM"), without building a datetime"""
+    hours, separator, minutes = value.partition(":")
+    if not separator or not hours.isdigit() or not minutes.isdigit() or len(minutes) != 2:
+        raise ValueError(f"time '{value}' does not match format 'HH:MM'")
+    hours, minutes = int(hours), int(minutes)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"time '{value}' is out of range")
+    return hours * 60 + minutes
+
+
+def format_total_hours(minutes: int) -> str:
+    """Duration in minutes as the "HH:MM:00" total_hours string the HRMS APIs expect"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+@lru_cache(maxsize=512)
+def pretty_day_mon_year(date_str: str) -> str:
+    """YYYY-MM-DD as "DD Mon YYYY", e.g. "12 Nov 2025" (requested dates cluster around today)"""
+    date_obj = parse_ymd(date_str)
+    return f"{date_obj.day:02d} {MONTH_NAMES[date_obj.month - 1]} {date_obj.year}"
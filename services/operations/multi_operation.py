@@ -3,27 +3,63 @@ Multi-Operation AI System for HRMS
 Advanced command processing with role-based access control and operation routing
 """
 
-import json
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List, Set
+import re
+import string
+from typing import Dict, Any, FrozenSet, Optional, List, Tuple
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from enum import Enum
+
+import ahocorasick
+import orjson
+
 from services.assistants.hrms_assistant import Intent, Role, OperationType, HRMSAIAssistant
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+_MONTH_NAMES = ("january", "february", "march", "april", "may", "june",
+                "july", "august", "september", "october", "november", "december")
+_LETTERS = frozenset(string.ascii_lowercase)
+
+
+def _build_month_automaton() -> ahocorasick.Automaton:
+    """Automaton over the lowercase month names, each mapped to its title-cased form"""
+    automaton = ahocorasick.Automaton()
+    for month in _MONTH_NAMES:
+        automaton.add_word(month, month.title())
+    automaton.make_automaton()
+    return automaton
+
+
+_MONTH_AUTOMATON = _build_month_automaton()
+
+# Intent lookup by value without Intent()'s ValueError on a miss
+_INTENT_BY_VALUE: Dict[str, Intent] = {intent.value: intent for intent in Intent}
+
+# Role/team context rarely changes within a session, so reuse it across commands
+USER_CONTEXT_CACHE_SECONDS = 30
+USER_CONTEXT_CACHE_MAX_USERS = 10000
+
+_EMP_CODE_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'\b(emp|employee)\s*(code\s*)?([a-z0-9]+)\b',
+    r'\b([a-z]{3}\d{3,})\b',
+    r'\bcode\s+([a-z0-9]+)\b'
+))
+
+
+@dataclass(slots=True, frozen=True)
 class OperationConfig:
     """Configuration for each operation"""
     intent: Intent
     operation_type: OperationType
-    required_roles: Set[Role]
+    required_roles: FrozenSet[Role]
     confirmation_required: bool = False
-    parameters_required: List[str] = None
+    parameters_required: Tuple[str, ...] = ()
     estimated_time: str = "1-2 minutes"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class OperationResult:
     """Result of operation execution"""
     success: bool
@@ -40,7 +76,23 @@ class MultiOperationAI:
         self.redis_client = redis_client
         self.ai_assistant = HRMSAIAssistant(redis_client)
         self.operation_configs = self._initialize_operation_configs()
+        self._access_table = self._build_access_table()
         self.active_operations = {}  # Track running operations
+        self._user_ctx_cache: Dict[str, Dict[str, Any]] = {}  # {user_id: {"data": {...}, "expires_at": datetime}}
+
+        # Intent -> handler, built once instead of on every routed command
+        self._handler_map = {
+            # Employee operations (route to existing systems)
+            Intent.POLICY_QUERY: self._handle_employee_operation,  # Generic policy queries
+            Intent.APPLY_LEAVE: self._handle_employee_operation,
+            Intent.MARK_ATTENDANCE: self._handle_employee_operation,
+            Intent.CHECK_LEAVE_BALANCE: self._handle_employee_operation,
+
+            # Admin operations (new handlers)
+            Intent.SEND_OFFER_LETTER: self._handle_send_offer_letter,
+            Intent.APPROVE_LEAVE: self._handle_approve_leave,
+            Intent.GENERATE_ATTENDANCE_REPORT: self._handle_generate_attendance_report,
+        }
 
     def _initialize_operation_configs(self) -> Dict[Intent, OperationConfig]:
         """Initialize operation configurations with role-based access control"""
@@ -49,46 +101,46 @@ class MultiOperationAI:
             Intent.POLICY_QUERY: OperationConfig(
                 intent=Intent.POLICY_QUERY,
                 operation_type=OperationType.QUERY,
-                required_roles={Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN}
+                required_roles=frozenset({Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN})
             ),
             Intent.APPLY_LEAVE: OperationConfig(
                 intent=Intent.APPLY_LEAVE,
                 operation_type=OperationType.ACTION,
-                required_roles={Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN},
-                parameters_required=["dates", "leave_type"]
+                required_roles=frozenset({Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN}),
+                parameters_required=("dates", "leave_type")
             ),
             Intent.MARK_ATTENDANCE: OperationConfig(
                 intent=Intent.MARK_ATTENDANCE,
                 operation_type=OperationType.ACTION,
-                required_roles={Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN}
+                required_roles=frozenset({Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN})
             ),
             Intent.CHECK_LEAVE_BALANCE: OperationConfig(
                 intent=Intent.CHECK_LEAVE_BALANCE,
                 operation_type=OperationType.QUERY,
-                required_roles={Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN}
+                required_roles=frozenset({Role.EMPLOYEE, Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN})
             ),
 
             # Admin Operations - Employee Management
             Intent.SEND_OFFER_LETTER: OperationConfig(
                 intent=Intent.SEND_OFFER_LETTER,
                 operation_type=OperationType.ADMIN_ACTION,
-                required_roles={Role.HR_ADMIN, Role.SUPER_ADMIN},
-                parameters_required=["employee_code", "position"],
+                required_roles=frozenset({Role.HR_ADMIN, Role.SUPER_ADMIN}),
+                parameters_required=("employee_code", "position"),
                 estimated_time="2-3 minutes"
             ),
             Intent.APPROVE_LEAVE: OperationConfig(
                 intent=Intent.APPROVE_LEAVE,
                 operation_type=OperationType.ADMIN_ACTION,
-                required_roles={Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN},
-                parameters_required=["leave_request_id"]
+                required_roles=frozenset({Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN}),
+                parameters_required=("leave_request_id",)
             ),
 
             # Admin Operations - Reports & Analytics
             Intent.GENERATE_ATTENDANCE_REPORT: OperationConfig(
                 intent=Intent.GENERATE_ATTENDANCE_REPORT,
                 operation_type=OperationType.QUERY,
-                required_roles={Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN},
-                parameters_required=["month", "year"],
+                required_roles=frozenset({Role.MANAGER, Role.HR_ADMIN, Role.SUPER_ADMIN}),
+                parameters_required=("month", "year"),
                 estimated_time="3-5 minutes"
             ),
         }
@@ -113,9 +165,8 @@ class MultiOperationAI:
 
             # Get intent and check access
             intent_str = ai_result.get("intent")
-            try:
-                intent = Intent(intent_str)
-            except ValueError:
+            intent = _INTENT_BY_VALUE.get(intent_str)
+            if intent is None:
                 return {"error": f"Unknown intent: {intent_str}"}
 
             # Check role-based access
@@ -134,26 +185,32 @@ class MultiOperationAI:
             logger.error(f"Error processing command: {e}")
             return {"error": "Failed to process command. Please try again."}
 
-    def _check_access(self, user_role: str, intent: Intent) -> Dict[str, Any]:
-        """Check if user has access to perform the operation"""
-        try:
-            user_role_enum = Role(user_role.lower())
-        except ValueError:
-            return {"allowed": False, "message": f"Invalid user role: {user_role}"}
-
-        operation_config = self.operation_configs.get(intent)
-        if not operation_config:
-            return {"allowed": False, "message": f"Operation not configured: {intent.value}"}
-
-        if user_role_enum in operation_config.required_roles:
-            return {"allowed": True}
-        else:
+    def _build_access_table(self) -> Dict[Tuple[str, Intent], Dict[str, Any]]:
+        """Access decision for every (role value, intent) pair - roles and configs are static"""
+        access_table = {}
+        for intent, operation_config in self.operation_configs.items():
             required_roles = [role.value for role in operation_config.required_roles]
-            return {
+            denied = {
                 "allowed": False,
                 "message": f"Insufficient permissions. Required roles: {required_roles}",
                 "required_roles": required_roles
             }
+            for role in Role:
+                access_table[(role.value, intent)] = {"allowed": True} if role in operation_config.required_roles else denied
+        return access_table
+
+    def _check_access(self, user_role: str, intent: Intent) -> Dict[str, Any]:
+        """Check if user has access to perform the operation"""
+        access = self._access_table.get((user_role.lower(), intent))
+        if access is not None:
+            return access
+
+        # Not in the table: either the role or the operation is unknown
+        try:
+            Role(user_role.lower())
+        except ValueError:
+            return {"allowed": False, "message": f"Invalid user role: {user_role}"}
+        return {"allowed": False, "message": f"Operation not configured: {intent.value}"}
 
     async def _route_operation(self, intent: Intent, ai_result: Dict[str, Any], user_context: Dict[str, Any],
                               command: str, session_id: Optional[str]) -> Dict[str, Any]:
@@ -166,20 +223,7 @@ class MultiOperationAI:
             return await self._request_confirmation(intent, ai_result, operation_config)
 
         # Route to specific handlers
-        handler_map = {
-            # Employee operations (route to existing systems)
-            Intent.POLICY_QUERY: self._handle_employee_operation,  # Generic policy queries
-            Intent.APPLY_LEAVE: self._handle_employee_operation,
-            Intent.MARK_ATTENDANCE: self._handle_employee_operation,
-            Intent.CHECK_LEAVE_BALANCE: self._handle_employee_operation,
-
-            # Admin operations (new handlers)
-            Intent.SEND_OFFER_LETTER: self._handle_send_offer_letter,
-            Intent.APPROVE_LEAVE: self._handle_approve_leave,
-            Intent.GENERATE_ATTENDANCE_REPORT: self._handle_generate_attendance_report,
-        }
-
-        handler = handler_map.get(intent)
+        handler = self._handler_map.get(intent)
         if handler:
             return await handler(ai_result, user_context, command, session_id)
         else:
@@ -254,12 +298,26 @@ class MultiOperationAI:
         }
 
     async def _get_user_context(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user context from Redis"""
+        """Get user context from Redis, cached briefly per user"""
+        now = datetime.now()
+        cache_entry = self._user_ctx_cache.get(user_id)
+        if cache_entry and now < cache_entry["expires_at"]:
+            return cache_entry["data"]
+
         try:
-            user_data_raw = self.redis_client.get(user_id)
-            if user_data_raw:
-                return json.loads(user_data_raw)
-            return None
+            # Sync Redis client - keep the round-trip off the event loop
+            user_data_raw = await asyncio.to_thread(self.redis_client.get, user_id)
+            if not user_data_raw:
+                return None
+            user_context = orjson.loads(user_data_raw)
+            if len(self._user_ctx_cache) >= USER_CONTEXT_CACHE_MAX_USERS:
+                # Evict the oldest entry (dicts keep insertion order)
+                self._user_ctx_cache.pop(next(iter(self._user_ctx_cache)))
+            self._user_ctx_cache[user_id] = {
+                "data": user_context,
+                "expires_at": now + timedelta(seconds=USER_CONTEXT_CACHE_SECONDS)
+            }
+            return user_context
         except Exception as e:
             logger.error(f"Error getting user context: {e}")
             return None
@@ -269,32 +327,41 @@ class MultiOperationAI:
 
     def _extract_month_from_command(self, command: str) -> Optional[str]:
         """Extract month from command text - for future use"""
-        months = ["january", "february", "march", "april", "may", "june",
-                 "july", "august", "september", "october", "november", "december"]
+        # One automaton pass finds every month; keep the first that is a whole word
         command_lower = command.lower()
-        for month in months:
-            if month in command_lower:
-                return month.title()
+        for end, month in _MONTH_AUTOMATON.iter(command_lower):
+            start = end - len(month) + 1
+            if (start == 0 or command_lower[start - 1] not in _LETTERS) and \
+                    (end + 1 == len(command_lower) or command_lower[end + 1] not in _LETTERS):
+                return month
         return None
 
     def _extract_employee_code_from_command(self, command: str) -> Optional[str]:
         """Extract employee code from command text - for future use"""
-        import re
-        patterns = [
-            r'\b(emp|employee)\s*(code\s*)?([a-z0-9]+)\b',
-            r'\b([a-z]{3}\d{3,})\b',
-            r'\bcode\s+([a-z0-9]+)\b'
-        ]
         command_lower = command.lower()
-        for pattern in patterns:
-            match = re.search(pattern, command_lower)
+        for pattern in _EMP_CODE_PATTERNS:
+            match = pattern.search(command_lower)
             if match:
                 return match.groups()[-1].upper()
         return None
 
+# One MultiOperationAI per Redis client: the assistant, its pattern tables and the
+# operation configs are stateless across requests, so they are built once
+_multi_op_systems: Dict[int, MultiOperationAI] = {}  # {id(redis_client): MultiOperationAI}
+
+
+def get_multi_operation_system(redis_client) -> MultiOperationAI:
+    """Get (or create) the shared MultiOperationAI for this Redis client"""
+    multi_op_system = _multi_op_systems.get(id(redis_client))
+    if multi_op_system is None or multi_op_system.redis_client is not redis_client:
+        multi_op_system = MultiOperationAI(redis_client)
+        _multi_op_systems[id(redis_client)] = multi_op_system
+    return multi_op_system
+
+
 # Convenience function for easy integration
 async def process_multi_operation_command(redis_client, user_id: str, command: str,
                                         session_id: Optional[str] = None) -> Dict[str, Any]:
     """Convenience function for processing multi-operation commands"""
-    multi_op_system = MultiOperationAI(redis_client)
+    multi_op_system = get_multi_operation_system(redis_client)
     return await multi_op_system.process_command(user_id, command, session_id)
\ No newline at end of file
@@ -3,166 +3,230 @@ Simple fuzzy matching service for leave types - focused on spelling mistakes and
 """
 
 import logging
+import re
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process
+
+import ahocorasick
 
 logger = logging.getLogger(__name__)
 
+# Leave-related patterns
+_LEAVE_PATTERNS = (
+    'apply leave', 'take leave', 'need leave', 'request leave',
+    'apply my leave', 'will be absent', 'need time off',
+    'book leave', 'vacation', 'holiday'
+)
+
+# Attendance-related patterns
+_ATTENDANCE_PATTERNS = (
+    'mark attendance', 'punch in', 'punch out', 'check in', 'check out',
+    'mark present', 'in office', 'clock in', 'clock out'
+)
+
+# Balance inquiry patterns (enhanced)
+_BALANCE_PATTERNS = (
+    'leave balance', 'check leaves', 'how many leaves', 'remaining leaves',
+    'tell balance', 'how much leave', 'available leaves', 'leave policy',
+    'kitni chutti bachi', 'kitna leave hai', 'chutti ka hisab',
+    'leaves check karo', 'balance dekho', 'कितनी छुट्टी बची है'
+)
+
+# The word every leave type name shares ("Sick Leave", "Casual Leave", ...)
+_GENERIC_LEAVE_WORD_RE = re.compile(r"\bleaves?\b")
+
+# One alternation per intent, so each intent costs a single regex scan
+_INTENT_PATTERN_RES = tuple(
+    (intent, re.compile("|".join(map(re.escape, patterns))))
+    for intent, patterns in (
+        ("apply_leave", _LEAVE_PATTERNS),
+        ("mark_attendance", _ATTENDANCE_PATTERNS),
+        ("leave_balance", _BALANCE_PATTERNS),
+    )
+)
+
+
+@lru_cache(maxsize=1024)
+def _prepare_leave_name(name: str) -> Tuple[str, Tuple[str, ...]]:
+    """Normalized leave name and its distinctive words - the same few names come back on every call"""
+    leave_name = name.lower().strip()
+    return leave_name, tuple(word for word in leave_name.split() if len(word) > 3 and word != 'leave')
+
+
+# Comprehensive translations for common words and phrases
+_TRANSLATIONS = {
+    # Hindi/Hinglish leave-related terms
+    'छुट्टी': 'leave',
+    'अवकाश': 'leave',
+    'बीमारी': 'sick',
+    'बीमार': 'sick',
+    'chutti': 'leave',
+    'avkash': 'leave',
+    'bimari': 'sick',
+    'bimar': 'sick',
+    'lagwa': 'apply',
+    'lagao': 'apply',
+    'karna': 'do',
+    'karni': 'do',
+    'chahiye': 'need',
+    'leni': 'take',
+    'lena': 'take',
+
+    # Hindi/Hinglish attendance terms
+    'हाजिरी': 'attendance',
+    'उपस्थिति': 'attendance',
+    'haaziri': 'attendance',
+    'upsthiti': 'attendance',
+    'mark': 'mark',
+    'maar': 'mark',
+    'punch': 'punch',
+
+    # Hindi/Hinglish balance inquiry terms
+    'कितना': 'how much',
+    'कितनी': 'how many',
+    'बची': 'remaining',
+    'हिसाब': 'balance',
+    'kitna': 'how much',
+    'kitni': 'how many',
+    'bachi': 'remaining',
+    'hisab': 'balance',
+    'dekho': 'check',
+    'batao': 'tell',
+
+    # Common typos and variations
+    'leav': 'leave',
+    'aplly': 'apply',
+    'requist': 'request',
+    'attendence': 'attendance',
+    'atendance': 'attendance',
+    'balanc': 'balance',
+    'remainig': 'remaining',
+
+    # Spanish
+    'enfermedad': 'sick',
+    'vacaciones': 'vacation',
+
+    # French
+    'maladie': 'sick',
+    'congé': 'leave',
+
+    # German
+    'krankheit': 'sick',
+    'urlaub': 'leave',
+
+    # Polish
+    'chorobowy': 'sick',
+    'urlop': 'leave',
+}
+
+# Common Hinglish phrases and patterns
+_HINGLISH_PHRASES = {
+    # Leave application phrases
+    'merai leave apply krro': 'apply my leave',
+    'meri chutti lagwa do': 'apply my leave',
+    'chutti kr do': 'apply leave',
+    'leave lagwa do': 'apply leave',
+    'time off chahiye': 'need time off',
+    'absent rahunga': 'will be absent',
+    'chutti leni hai': 'need to take leave',
+    'leave apply karna hai': 'need to apply leave',
+
+    # Attendance phrases
+    'attendance kr do': 'mark attendance',
+    'punch maar do': 'punch in',
+    'office mai hu': 'in office',
+    'haaziri lagao': 'mark attendance',
+    'present mark karo': 'mark present',
+    'check in kr do': 'check in',
+
+    # Balance inquiry phrases
+    'kitni chutti bachi hai': 'how many leaves remaining',
+    'leave balance dekho': 'check leave balance',
+    'kitna leave hai': 'how much leave available',
+    'chutti ka hisab': 'leave balance',
+    'leaves check karo': 'check leaves',
+    'balance batao': 'tell balance',
+}
+
+
+def _build_translation_automaton() -> ahocorasick.Automaton:
+    """One automaton over every phrase and word, each mapped to (length, is_word, replacement)"""
+    automaton = ahocorasick.Automaton()
+    for is_word, table in ((False, _HINGLISH_PHRASES), (True, _TRANSLATIONS)):
+        for source, replacement in table.items():
+            if source not in automaton:  # a phrase wins over an identical word key
+                automaton.add_word(source, (len(source), is_word, replacement))
+    automaton.make_automaton()
+    return automaton
+
+
+# Built once at import and shared by every matcher
+_TRANSLATION_AUTOMATON = _build_translation_automaton()
+
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    """True when text[start:end] is not glued to a letter or digit on either side"""
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+# Employees send the same few messages over and over; translation depends only on the text
+@lru_cache(maxsize=4096)
+def _translate(text_lower: str) -> str:
+    """Translate already lowercased, stripped text"""
+    # Single pass over the text finds every phrase and word occurrence; single words
+    # only count as whole words ('leav' inside 'leave', 'mark' inside 'remark' don't)
+    found = [
+        (end - length + 1, end + 1, is_word, replacement)
+        for end, (length, is_word, replacement) in _TRANSLATION_AUTOMATON.iter(text_lower)
+        if not is_word or _is_whole_word(text_lower, end - length + 1, end + 1)
+    ]
+    if not found:
+        return text_lower
+
+    # Complete phrases take precedence over individual words, then leftmost-longest
+    found.sort(key=lambda match: (match[2], match[0], match[0] - match[1]))
+    chosen = []
+    for start, end, _, replacement in found:
+        if all(end <= kept_start or start >= kept_end for kept_start, kept_end, _ in chosen):
+            chosen.append((start, end, replacement))
+    chosen.sort()
+
+    # Splice all replacements in one go instead of a str.replace copy per hit
+    parts = []
+    position = 0
+    for start, end, replacement in chosen:
+        parts.append(text_lower[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text_lower[position:])
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def _detect_intent(text_lower: str) -> Optional[str]:
+    """Intent for translated text - checked in priority order, first intent with any pattern present wins"""
+    for intent, pattern_re in _INTENT_PATTERN_RES:
+        if pattern_re.search(text_lower):
+            return intent
+    return None
+
+
 class SimpleFuzzyMatcher:
     """Simple fuzzy matcher focused on practical use cases"""
 
     def __init__(self):
-        # Comprehensive translations for common words and phrases
-        self.translations = {
-            # Hindi/Hinglish leave-related terms
-            'छुट्टी': 'leave',
-            'अवकाश': 'leave',
-            'बीमारी': 'sick',
-            'बीमार': 'sick',
-            'chutti': 'leave',
-            'avkash': 'leave',
-            'bimari': 'sick',
-            'bimar': 'sick',
-            'lagwa': 'apply',
-            'lagao': 'apply',
-            'karna': 'do',
-            'karni': 'do',
-            'chahiye': 'need',
-            'leni': 'take',
-            'lena': 'take',
-
-            # Hindi/Hinglish attendance terms
-            'हाजिरी': 'attendance',
-            'उपस्थिति': 'attendance',
-            'haaziri': 'attendance',
-            'upsthiti': 'attendance',
-            'mark': 'mark',
-            'maar': 'mark',
-            'punch': 'punch',
-
-            # Hindi/Hinglish balance inquiry terms
-            'कितना': 'how much',
-            'कितनी': 'how many',
-            'बची': 'remaining',
-            'हिसाब': 'balance',
-            'kitna': 'how much',
-            'kitni': 'how many',
-            'bachi': 'remaining',
-            'hisab': 'balance',
-            'dekho': 'check',
-            'batao': 'tell',
-
-            # Common typos and variations
-            'leav': 'leave',
-            'aplly': 'apply',
-            'requist': 'request',
-            'attendence': 'attendance',
-            'atendance': 'attendance',
-            'balanc': 'balance',
-            'remainig': 'remaining',
-
-            # Spanish
-            'enfermedad': 'sick',
-            'vacaciones': 'vacation',
-
-            # French
-            'maladie': 'sick',
-            'congé': 'leave',
-
-            # German
-            'krankheit': 'sick',
-            'urlaub': 'leave',
-
-            # Polish
-            'chorobowy': 'sick',
-            'urlop': 'leave',
-        }
-
-        # Common Hinglish phrases and patterns
-        self.hinglish_phrases = {
-            # Leave application phrases
-            'merai leave apply krro': 'apply my leave',
-            'meri chutti lagwa do': 'apply my leave',
-            'chutti kr do': 'apply leave',
-            'leave lagwa do': 'apply leave',
-            'time off chahiye': 'need time off',
-            'absent rahunga': 'will be absent',
-            'chutti leni hai': 'need to take leave',
-            'leave apply karna hai': 'need to apply leave',
-
-            # Attendance phrases
-            'attendance kr do': 'mark attendance',
-            'punch maar do': 'punch in',
-            'office mai hu': 'in office',
-            'haaziri lagao': 'mark attendance',
-            'present mark karo': 'mark present',
-            'check in kr do': 'check in',
-
-            # Balance inquiry phrases
-            'kitni chutti bachi hai': 'how many leaves remaining',
-            'leave balance dekho': 'check leave balance',
-            'kitna leave hai': 'how much leave available',
-            'chutti ka hisab': 'leave balance',
-            'leaves check karo': 'check leaves',
-            'balance batao': 'tell balance',
-        }
+        # Shared module-level tables (kept as attributes for callers that inspect them)
+        self.translations = _TRANSLATIONS
+        self.hinglish_phrases = _HINGLISH_PHRASES
 
     def translate_text(self, text: str) -> str:
-        """Enhanced translation of common terms and phrases"""
-        text_lower = text.lower().strip()
-
-        # First check for complete phrase translations
-        for hinglish_phrase, english_phrase in self.hinglish_phrases.items():
-            if hinglish_phrase in text_lower:
-                text_lower = text_lower.replace(hinglish_phrase, english_phrase)
-
-        # Then check for individual word translations
-        for foreign_word, english_word in self.translations.items():
-            if foreign_word in text_lower:
-                text_lower = text_lower.replace(foreign_word, english_word)
-
-        return text_lower
+        """Enhanced translation of common terms and phrases - returns lowercased, stripped text"""
+        return _translate(text.lower().strip())
 
     def detect_intent_from_text(self, text: str) -> Optional[str]:
         """Detect HR intent from text with enhanced multilingual support"""
-        translated_text = self.translate_text(text)
-        text_lower = translated_text.lower()
-
-        # Leave-related patterns
-        leave_patterns = [
-            'apply leave', 'take leave', 'need leave', 'request leave',
-            'apply my leave', 'will be absent', 'need time off',
-            'book leave', 'vacation', 'holiday'
-        ]
-
-        # Attendance-related patterns
-        attendance_patterns = [
-            'mark attendance', 'punch in', 'punch out', 'check in', 'check out',
-            'mark present', 'in office', 'clock in', 'clock out'
-        ]
-
-        # Balance inquiry patterns (enhanced)
-        balance_patterns = [
-            'leave balance', 'check leaves', 'how many leaves', 'remaining leaves',
-            'tell balance', 'how much leave', 'available leaves', 'leave policy',
-            'kitni chutti bachi', 'kitna leave hai', 'chutti ka hisab',
-            'leaves check karo', 'balance dekho', 'कितनी छुट्टी बची है'
-        ]
-
-        # Check patterns
-        for pattern in leave_patterns:
-            if pattern in text_lower:
-                return "apply_leave"
-
-        for pattern in attendance_patterns:
-            if pattern in text_lower:
-                return "mark_attendance"
-
-        for pattern in balance_patterns:
-            if pattern in text_lower:
-                return "leave_balance"
-
-        return None
+        return _detect_intent(self.translate_text(text))
 
     def fuzzy_match_leave_type(self, user_input: str, available_leave_types: List[Dict]) -> Optional[Tuple[Dict, int]]:
         """
@@ -178,9 +242,41 @@ class SimpleFuzzyMatcher:
         if not user_input or not available_leave_types:
             return None
 
-        # Translate basic terms first
-        translated_input = self.translate_text(user_input)
-        user_input_lower = translated_input.lower().strip()
+        # Translate basic terms first (already lowercased and stripped)
+        best_match, best_score = self._best_leave_type(self.translate_text(user_input), available_leave_types)
+
+        # Validation: avoid generic matches
+        if best_match and best_score >= 70:
+            # Extra validation for very short or generic inputs
+            if self._is_generic_input(user_input):
+                if best_score < 95:  # Require very high confidence for generic inputs
+                    return None
+
+            # rapidfuzz scores are floats, callers expect fuzzywuzzy-style integer confidence
+            best_score = int(round(best_score))
+            logger.info(f"Fuzzy matched '{user_input}' to '{best_match.get('name')}' with score {best_score}")
+            return best_match, best_score
+
+        return None
+
+    @staticmethod
+    def _is_generic_input(user_input: str) -> bool:
+        """Very short or placeholder inputs that need a near-exact match"""
+        return (len(user_input.strip()) <= 3 or
+                user_input.lower().strip() in ['xyz', 'abc', 'test', 'xyz leave'])
+
+    def _best_leave_type(self, user_input_lower: str, available_leave_types: List[Dict],
+                         stop_at: float = 100) -> Tuple[Optional[Dict], float]:
+        """
+        Best scoring leave type for translated input, as (leave_type, raw score)
+
+        Scanning stops as soon as a leave type reaches stop_at, so callers that only
+        need "some type scores at least X" don't pay for finding the exact best.
+        """
+        input_words = user_input_lower.split()
+        input_is_multi_word = len(input_words) > 1
+        user_words = tuple(word for word in input_words if len(word) > 2)
+        key_term_hits: Dict[str, bool] = {}  # leave word -> close to some user word
 
         best_match = None
         best_score = 0
@@ -189,58 +285,75 @@ class SimpleFuzzyMatcher:
             if not isinstance(leave_type, dict):
                 continue
 
-            leave_name = leave_type.get('name', '').lower().strip()
+            leave_name, leave_words = _prepare_leave_name(leave_type.get('name', ''))
             if not leave_name:
                 continue
 
+            # Only a score above the current best matters, so every scorer gets it as
+            # score_cutoff and rapidfuzz abandons comparisons that can't beat it
+            cutoff = best_score
+
             # Strategy 1: Direct fuzzy matching with full leave name
-            score1 = fuzz.ratio(user_input_lower, leave_name)
-            score2 = fuzz.partial_ratio(user_input_lower, leave_name)
-            score3 = fuzz.token_sort_ratio(user_input_lower, leave_name)
-            score4 = fuzz.token_set_ratio(user_input_lower, leave_name)
+            max_score = max(
+                fuzz.ratio(user_input_lower, leave_name, score_cutoff=cutoff),
+                fuzz.partial_ratio(user_input_lower, leave_name, score_cutoff=cutoff)
+            )
+            # Token scorers equal plain ratio when both sides are a single word
+            if input_is_multi_word or len(leave_name.split()) > 1:
+                max_score = max(
+                    max_score,
+                    fuzz.token_sort_ratio(user_input_lower, leave_name, score_cutoff=cutoff),
+                    fuzz.token_set_ratio(user_input_lower, leave_name, score_cutoff=cutoff)
+                )
 
             # Strategy 2: Match against individual distinctive words
-            leave_words = [word for word in leave_name.split() if len(word) > 3 and word != 'leave']
-            word_scores = []
-
             for word in leave_words:
-                word_scores.append(fuzz.ratio(user_input_lower, word))
+                max_score = max(max_score, fuzz.ratio(user_input_lower, word, score_cutoff=cutoff))
                 # Check if word is contained in user input
                 if word in user_input_lower or user_input_lower in word:
-                    word_scores.append(85)
+                    max_score = max(max_score, 85)
 
-            # Strategy 3: Check if user input contains key terms
-            user_words = [word for word in user_input_lower.split() if len(word) > 2]
-            for user_word in user_words:
+            # Strategy 3: Check if user input contains key terms (worth 90, skip if already there)
+            if max_score < 90 and user_words:
                 for leave_word in leave_words:
-                    if fuzz.ratio(user_word, leave_word) > 80:
-                        word_scores.append(90)
-
-            # Combine all scores
-            all_scores = [score1, score2, score3, score4] + word_scores
-            max_score = max(all_scores) if all_scores else 0
+                    hit = key_term_hits.get(leave_word)
+                    if hit is None:
+                        # One C-level scan of the user's words per distinct leave word, shared
+                        # by every leave type containing it (e.g. "casual", "paid")
+                        match = process.extractOne(leave_word, user_words, scorer=fuzz.ratio, score_cutoff=80)
+                        hit = key_term_hits[leave_word] = match is not None and match[1] > 80
+                    if hit:
+                        max_score = 90
+                        break
 
             if max_score > best_score:
                 best_score = max_score
                 best_match = leave_type
+                if best_score >= stop_at:
+                    break  # Good enough for the caller (at 100 nothing can beat it anyway)
 
-        # Validation: avoid generic matches
-        if best_match and best_score >= 70:
-            # Extra validation for very short or generic inputs
-            if (len(user_input.strip()) <= 3 or
-                user_input.lower().strip() in ['xyz', 'abc', 'test', 'xyz leave']):
-                if best_score < 95:  # Require very high confidence for generic inputs
-                    return None
-
-            logger.info(f"Fuzzy matched '{user_input}' to '{best_match.get('name')}' with score {best_score}")
-            return best_match, best_score
-
-        return None
+        return best_match, best_score
 
     def is_leave_type_mention(self, user_input: str, available_leave_types: List[Dict]) -> bool:
         """Check if user input mentions any leave type"""
-        match = self.fuzzy_match_leave_type(user_input, available_leave_types)
-        return match is not None and match[1] >= 75
+        if not user_input or not available_leave_types:
+            return False
+
+        # Every leave type name shares "leave", so on its own it mentions no particular type
+        # ("chutti leni hai" -> "need to take leave" must not pass as "sick leave")
+        user_input_lower = " ".join(_GENERIC_LEAVE_WORD_RE.sub(" ", self.translate_text(user_input)).split())
+        if not user_input_lower:
+            return False
+
+        # Same bar as fuzzy_match_leave_type scoring >= 75, but stops at the first
+        # leave type that clears it instead of searching for the best one
+        is_generic = self._is_generic_input(user_input)
+        best_match, best_score = self._best_leave_type(
+            user_input_lower, available_leave_types, stop_at=95 if is_generic else 75
+        )
+        if best_match is None or (is_generic and best_score < 95):
+            return False
+        return int(round(best_score)) >= 75
 
 
 # Global instance
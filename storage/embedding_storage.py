@@ -0,0 +1,43 @@
+# storage/embedding_storage.py
+import msgpack
+import numpy as np
+from redis.asyncio import Redis
+from storage.session_storage import create_redis_pool
+
+# Raw bytes client: embeddings are stored as packed binary, not text.
+# Same pool settings (socket, size) as the session client, async so chat never blocks on it.
+redis_client = Redis(connection_pool=create_redis_pool(decode_responses=False))
+
+# Refreshed on every read, so embeddings of users who stopped chatting age out
+POLICY_EMBEDDINGS_SECONDS = 7 * 86400
+
+def _embeddings_key(user_id: str) -> str:
+    return f"policy_embeddings:{user_id}"
+
+async def set_policy_embeddings(user_id: str, embeddings: dict, scales: dict):
+    """Store int8 {name: vector} embeddings as one msgpack record of raw int8/float32 buffers"""
+    names = list(embeddings)
+    if not names:
+        await redis_client.delete(_embeddings_key(user_id))
+        return
+    payload = msgpack.packb({
+        "names": names,
+        "vectors": np.asarray([embeddings[name] for name in names], dtype=np.int8).tobytes(),
+        "scales": np.asarray([scales[name] for name in names], dtype=np.float32).tobytes(),
+    }, use_bin_type=True)
+    await redis_client.setex(_embeddings_key(user_id), POLICY_EMBEDDINGS_SECONDS, payload)
+
+async def get_policy_embeddings(user_id: str):
+    """Return (int8 (N, D) matrix, float32 scales, names) without parsing any floats, or None"""
+    val = await redis_client.getex(_embeddings_key(user_id), ex=POLICY_EMBEDDINGS_SECONDS)
+    if not val:
+        return None
+    data = msgpack.unpackb(val, raw=False)
+    names = data["names"]
+    vectors = np.frombuffer(data["vectors"], dtype=np.int8).reshape(len(names), -1)
+    scales = np.frombuffer(data["scales"], dtype=np.float32)
+    return vectors, scales, names
+
+async def close_embedding_storage():
+    """Close pooled Redis connections (called on app shutdown)"""
+    await redis_client.aclose()
@@ -1,21 +1,31 @@
 # storage/session_storage.py
-import json
-import redis
-from config import REDIS_HOST, REDIS_PORT, REDIS_DB
+import orjson
+from redis.asyncio import BlockingConnectionPool, Redis, UnixDomainSocketConnection
+from config import REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_UNIX_SOCKET, REDIS_POOL_SIZE
 
-# decode_responses=True -> returns str instead of bytes
-redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB, decode_responses=True)
+def create_redis_pool(decode_responses: bool = True) -> BlockingConnectionPool:
+    # Bounded pool: callers wait for a free connection instead of opening unlimited sockets
+    # decode_responses=True -> returns str instead of bytes
+    options = dict(db=REDIS_DB, max_connections=REDIS_POOL_SIZE, health_check_interval=30, decode_responses=decode_responses)
+    if REDIS_UNIX_SOCKET:
+        return BlockingConnectionPool(
+            connection_class=UnixDomainSocketConnection, path=REDIS_UNIX_SOCKET, **options
+        )
+    return BlockingConnectionPool(host=REDIS_HOST, port=REDIS_PORT, socket_keepalive=True, **options)
 
-def set_session(user_id: str, data: dict, expire_seconds: int = None):
-    payload = json.dumps(data)
+# Async client over one shared pool so session I/O never blocks the event loop
+redis_client = Redis(connection_pool=create_redis_pool())
+
+async def set_session(user_id: str, data: dict, expire_seconds: int = None):
+    payload = orjson.dumps(data)
     if expire_seconds:
-        redis_client.setex(user_id, expire_seconds, payload)
+        await redis_client.setex(user_id, expire_seconds, payload)
     else:
-        redis_client.set(user_id, payload)
+        await redis_client.set(user_id, payload)
 
-def get_session(user_id: str):
-    val = redis_client.get(user_id)
-    return json.loads(val) if val else None
+async def get_session(user_id: str):
+    val = await redis_client.get(user_id)
+    return orjson.loads(val) if val else None
 
-def delete_session(user_id: str):
-    redis_client.delete(user_id)
+async def delete_session(user_id: str):
+    await redis_client.delete(user_id)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test Redis conversation storage: older JSON-blob values are converted in place,
+and conversation state updates merge field by field
+Needs the local Redis the app uses (localhost:6379)
+"""
+
+import asyncio
+import sys
+
+import orjson
+
+from services.operations.conversation_state import (
+    redis_client,
+    _state_cache,
+    add_message_to_history,
+    create_session,
+    get_chat_history,
+    get_chat_history_key,
+    get_conversation_key,
+    get_conversation_state,
+    get_user_sessions,
+    get_user_sessions_key,
+    update_conversation_state,
+    update_session_activity,
+)
+
+TEST_USER = "test_conversation_state"
+TEST_SESSION = "test_sess"
+
+
+async def _reset():
+    """Remove every key these tests write"""
+    keys = [key async for key in redis_client.scan_iter(match=f"*{TEST_USER}*")]
+    if keys:
+        await redis_client.delete(*keys)
+    _state_cache.clear()
+
+
+def _check(failures: list, label: str, ok: bool, detail=""):
+    if ok:
+        print(f"   ✅ PASS - {label}")
+    else:
+        print(f"   ❌ FAIL - {label} {detail}")
+        failures.append(label)
+
+
+async def test_legacy_history_conversion():
+    """A chat history stored as one JSON array becomes a list, keeping old messages first"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Legacy Chat History Conversion")
+    print("="*70)
+    await _reset()
+
+    old_messages = [
+        {"role": "user", "message": "apply leave", "timestamp": "2025-01-01T10:00:00"},
+        {"role": "assistant", "message": "Which type?", "timestamp": "2025-01-01T10:00:01"},
+    ]
+    await redis_client.set(get_chat_history_key(TEST_USER, TEST_SESSION), orjson.dumps(old_messages))
+
+    failures = []
+    _check(failures, "append to legacy history", await add_message_to_history(TEST_USER, TEST_SESSION, "user", "sick leave"))
+    history = await get_chat_history(TEST_USER, TEST_SESSION)
+    _check(failures, "old messages kept in order", history[:2] == old_messages, history)
+    _check(failures, "new message appended last", len(history) == 3 and history[2]["message"] == "sick leave", history)
+
+    assert not failures, failures
+
+
+async def test_legacy_sessions_conversion():
+    """A session list stored as one JSON array becomes a hash of session_id -> session info"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Legacy Sessions Conversion")
+    print("="*70)
+    await _reset()
+
+    old_sessions = [
+        {"session_id": "first", "session_name": "First", "created_at": "2025-01-01T10:00:00",
+         "last_active": "2025-01-01T10:00:00", "status": "active"},
+        {"session_id": "second", "session_name": "Second", "created_at": "2025-01-02T10:00:00",
+         "last_active": "2025-01-02T10:00:00", "status": "active"},
+    ]
+    await redis_client.set(get_user_sessions_key(TEST_USER), orjson.dumps(old_sessions))
+
+    failures = []
+    _check(failures, "touch a session in a legacy list", await update_session_activity(TEST_USER, "first"))
+    sessions = await get_user_sessions(TEST_USER)
+    _check(failures, "sessions kept in creation order", [s["session_id"] for s in sessions] == ["first", "second"], sessions)
+    _check(failures, "last_active updated", sessions[0]["last_active"] != "2025-01-01T10:00:00", sessions[0])
+
+    new_session_id = await create_session(TEST_USER, "Third")
+    sessions = await get_user_sessions(TEST_USER)
+    _check(failures, "new session added", [s["session_id"] for s in sessions][-1] == new_session_id, sessions)
+
+    assert not failures, failures
+
+
+async def test_legacy_state_conversion():
+    """A conversation state stored as one JSON blob is read and updated as a hash"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Legacy Conversation State Conversion")
+    print("="*70)
+    await _reset()
+
+    old_state = {"action": "applying_leave", "leave_info": {"leave_type_name": "Sick Leave"}}
+    await redis_client.set(get_conversation_key(TEST_USER, TEST_SESSION), orjson.dumps(old_state))
+
+    failures = []
+    _check(failures, "legacy state readable", await get_conversation_state(TEST_USER, TEST_SESSION) == old_state)
+
+    await redis_client.set(get_conversation_key(TEST_USER, TEST_SESSION), orjson.dumps(old_state))
+    _state_cache.clear()
+    state = await update_conversation_state(TEST_USER, TEST_SESSION, {"leave_info": {"from_date": "2025-11-22"}})
+    expected = {"action": "applying_leave", "leave_info": {"leave_type_name": "Sick Leave", "from_date": "2025-11-22"}}
+    _check(failures, "legacy state updated and merged", state == expected, state)
+    key_type = await redis_client.type(get_conversation_key(TEST_USER, TEST_SESSION))
+    _check(failures, "stored as a hash now", key_type == b"hash", key_type)
+
+    assert not failures, failures
+
+
+async def test_state_field_merge():
+    """leave_info/extracted_data dicts merge key by key; values round-trip unchanged"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Conversation State Field Merge")
+    print("="*70)
+    await _reset()
+
+    failures = []
+    await update_conversation_state(TEST_USER, TEST_SESSION, {
+        "intent": "apply_leave",
+        "extracted_data": {"missing_fields": [], "employee_ref": 12345678901234567},
+    })
+    state = await update_conversation_state(TEST_USER, TEST_SESSION, {
+        "intent": "mark_attendance",
+        "extracted_data": {"leave_type": "Sick Leave"},
+        "history": [],
+    })
+
+    _check(failures, "other fields replaced", state.get("intent") == "mark_attendance", state)
+    _check(failures, "dict keys accumulated", state["extracted_data"].get("leave_type") == "Sick Leave"
+           and "employee_ref" in state["extracted_data"], state)
+    _check(failures, "empty list stays a list", state["extracted_data"]["missing_fields"] == [] and state["history"] == [], state)
+    _check(failures, "large integers keep every digit", state["extracted_data"]["employee_ref"] == 12345678901234567, state)
+
+    # Concurrent updates of the same state must not lose each other's keys
+    await asyncio.gather(*(
+        update_conversation_state(TEST_USER, TEST_SESSION, {"extracted_data": {f"field_{i}": i}})
+        for i in range(10)
+    ))
+    _state_cache.clear()
+    state = await get_conversation_state(TEST_USER, TEST_SESSION)
+    _check(failures, "no concurrent update lost", all(f"field_{i}" in state["extracted_data"] for i in range(10)), state)
+
+    assert not failures, failures
+
+
+async def main():
+    failed = 0
+    try:
+        for test in (test_legacy_history_conversion, test_legacy_sessions_conversion,
+                     test_legacy_state_conversion, test_state_field_merge):
+            try:
+                await test()
+            except AssertionError as e:
+                print(f"\n❌ {test.__name__}: {e}")
+                failed += 1
+    finally:
+        await _reset()
+
+    print("\n" + "="*70)
+    print("🏁 ALL TESTS COMPLETED" if not failed else f"❌ {failed} TEST(S) FAILED")
+    print("="*70)
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main()) else 0)
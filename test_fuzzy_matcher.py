@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test fuzzy matcher translations and leave type mention detection
+"""
+
+import sys
+
+from services.utils.fuzzy_matcher import simple_fuzzy_matcher
+
+LEAVE_TYPES = [
+    {"name": "Sick Leave"},
+    {"name": "Casual Leave"},
+    {"name": "Earned Leave"},
+    {"name": "Privilege Leave"},
+    {"name": "Leave Without Pay"},
+]
+
+
+def test_translate_text():
+    """Phrases and whole words are translated, words inside other words are left alone"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Translation Rewrites")
+    print("="*70)
+
+    cases = [
+        ("apply leave", "apply leave"),                   # 'leav' inside 'leave' is not a typo
+        ("check leaves", "check leaves"),                 # ... nor inside 'leaves'
+        ("please add a remark", "please add a remark"),   # 'mark' inside 'remark'
+        ("leav chahiye", "leave need"),
+        ("chutti leni hai", "need to take leave"),        # phrase wins over its words
+        ("bimar hu, chutti lagao", "sick hu, leave apply"),
+        ("kitni chutti bachi hai", "how many leaves remaining"),
+        ("Urlaub", "leave"),
+    ]
+
+    failures = []
+    for text, expected in cases:
+        translated = simple_fuzzy_matcher.translate_text(text)
+        if translated == expected:
+            print(f"   ✅ PASS - \"{text}\" → \"{translated}\"")
+        else:
+            print(f"   ❌ FAIL - \"{text}\" → \"{translated}\" (expected \"{expected}\")")
+            failures.append(text)
+
+    assert not failures, f"Unexpected translations: {failures}"
+
+
+def test_is_leave_type_mention():
+    """Only messages naming a particular leave type count as a mention"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Leave Type Mentions")
+    print("="*70)
+
+    cases = [
+        ("sick leave", True),
+        ("sik leave", True),
+        ("casual", True),
+        ("bimar hu, chutti lagao", True),
+        ("leave without pay", True),
+        ("chutti leni hai", False),
+        ("apply leave", False),
+        ("leave", False),
+        ("xyz", False),
+    ]
+
+    failures = []
+    for text, expected in cases:
+        mentioned = simple_fuzzy_matcher.is_leave_type_mention(text, LEAVE_TYPES)
+        if mentioned == expected:
+            print(f"   ✅ PASS - \"{text}\" → {mentioned}")
+        else:
+            print(f"   ❌ FAIL - \"{text}\" → {mentioned} (expected {expected})")
+            failures.append(text)
+
+    assert not failures, f"Wrong mention verdicts: {failures}"
+
+
+def main():
+    failed = 0
+    for test in (test_translate_text, test_is_leave_type_mention):
+        try:
+            test()
+        except AssertionError as e:
+            print(f"\n❌ {test.__name__}: {e}")
+            failed += 1
+
+    print("\n" + "="*70)
+    print("🏁 ALL TESTS COMPLETED" if not failed else f"❌ {failed} TEST(S) FAILED")
+    print("="*70)
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test leave reason extraction from keywords ("reason", "because", "for", "due to")
+"""
+
+import sys
+
+from services.integration.mcp_integration import _extract_keyword_reason
+
+
+def test_reason_keyword_priority():
+    """Keywords are tried in priority order, each taking the text after its last occurrence"""
+    print("\n" + "="*70)
+    print("🧪 TEST: Leave Reason Keyword Priority")
+    print("="*70)
+
+    cases = [
+        ("reason: family function", "family function"),
+        ("reason is doctor visit for checkup", "doctor visit for checkup"),   # "reason" beats a later "for"
+        ("leave for 2 days because i have fever", "i have fever"),            # "because" beats an earlier "for"
+        ("leave on 22 nov for wedding because sister's marriage", "sister's marriage"),
+        ("leave for fever", "fever"),
+        ("leave due to a family emergency", "a family emergency"),
+        ("apply leave for 22 nov", None),                                     # a date is not a reason
+        ("leave from 22 nov to 23 nov", None),
+        ("sick leave", None),
+    ]
+
+    failures = []
+    for message, expected in cases:
+        reason = _extract_keyword_reason(message)
+        if reason == expected:
+            print(f"   ✅ PASS - \"{message}\" → {reason!r}")
+        else:
+            print(f"   ❌ FAIL - \"{message}\" → {reason!r} (expected {expected!r})")
+            failures.append(message)
+
+    assert not failures, f"Wrong reasons: {failures}"
+
+
+def main():
+    failed = 0
+    try:
+        test_reason_keyword_priority()
+    except AssertionError as e:
+        print(f"\n❌ test_reason_keyword_priority: {e}")
+        failed += 1
+
+    print("\n" + "="*70)
+    print("🏁 ALL TESTS COMPLETED" if not failed else f"❌ {failed} TEST(S) FAILED")
+    print("="*70)
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)